@@ -0,0 +1,263 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from rich.console import Console
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+import cache_tool
+import clone_engine
+import module_store
+import build_matrix
+
+# Progress goes to stderr so stdout stays machine-readable.
+console = Console(stderr=True)
+
+SOURCE_FOLDER = "./core"
+CACHE_TOOL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_tool.py")
+PROVISION_LOG = "provision.log"
+DEFAULT_JOBS = 4
+PARSE_ERRORS = (ValueError, yaml.YAMLError) if yaml else (ValueError,)
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_INVALID = 2
+
+class ManifestError(Exception):
+    pass
+
+##################################
+# Manifest
+##################################
+
+def load_manifest(path: str) -> dict:
+    """
+    Reads a batch manifest (JSON, or YAML when PyYAML is installed):
+
+        source: ./core            # optional
+        jobs: 4                   # projects provisioned at the same time
+        defaults:                 # merged into every project
+          settings: {remoteUrl: https://hyperfy.bitmato.dev}
+          targets: [win32/x64]
+        projects:
+          - name: BrandA          # also the appName
+            dest: ./clients/BrandA  # optional, default ./<name>
+            settings: {windowSize: {width: 1280, height: 720}}
+            targets: [win32/x64, linux/x64]
+            build_workers: 2      # targets of this project built at the same time (default 1)
+            seed: {manifest: assets.json}  # optional: bundle a pre-warmed cache
+            build: true
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ManifestError("YAML manifests need PyYAML (pip install pyyaml); or use JSON")
+            data = yaml.safe_load(text)
+        else:
+            data = json.loads(text)
+    except PARSE_ERRORS as e:
+        raise ManifestError(f"Can't parse {path}: {e}")
+    if not isinstance(data, dict) or not isinstance(data.get("projects"), list):
+        raise ManifestError("The manifest needs a 'projects' list")
+    return data
+
+def merge(base: dict, override: dict) -> dict:
+    """Recursive dict merge; values in `override` win."""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def resolve_projects(manifest: dict, base_dir: str) -> list:
+    """Applies `defaults` and validates every project up front, so nothing starts on a bad manifest."""
+    defaults = manifest.get("defaults") or {}
+    projects, names, errors = [], set(), []
+    for index, entry in enumerate(manifest["projects"]):
+        if not isinstance(entry, dict) or not entry.get("name"):
+            errors.append(f"projects[{index}]: 'name' is required")
+            continue
+        project = merge(defaults, entry)
+        name = str(project["name"])
+        if name in names:
+            errors.append(f"{name}: duplicate project name")
+        names.add(name)
+        if not isinstance(project.get("settings", {}), dict):
+            errors.append(f"{name}: 'settings' must be a mapping")
+        try:
+            targets = project.get("targets") or []
+            project["targets"] = build_matrix.parse_targets(targets)
+        except (ValueError, AttributeError, TypeError) as e:
+            errors.append(f"{name}: {e}")
+        if project.get("build", True) and not project.get("targets"):
+            errors.append(f"{name}: no build targets (set 'targets' or 'build: false')")
+        seed = project.get("seed") or False
+        if isinstance(seed, dict) and seed.get("manifest"):
+            seed["manifest"] = os.path.join(base_dir, seed["manifest"])
+        project["seed"] = seed
+        project["dest"] = os.path.join(base_dir, project.get("dest") or name)
+        projects.append(project)
+    if errors:
+        raise ManifestError("\n".join(errors))
+    return projects
+
+##################################
+# Provisioning
+##################################
+
+def write_settings(project_dest: str, name: str, settings: dict):
+    """settings.json for the project (the app fills in defaults) and its package.json name."""
+    with open(os.path.join(project_dest, "settings.json"), "w", encoding="utf-8") as f:
+        json.dump({"appName": name, **settings}, f, indent=4)
+    package_json = os.path.join(project_dest, "package.json")
+    with open(package_json, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data["name"] = name
+    with open(package_json, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+
+class BatchProvisioner:
+    """
+    Clones, installs and builds every project of a manifest, `jobs` projects at
+    a time. Each project's npm and cache_tool output goes to
+    `<dest>/build-logs/provision.log`, and its electron-builder runs to the
+    usual per-target logs. Projects sharing a lockfile install it into the
+    module store once (see ModuleStore.install); the others wait for it and
+    link it.
+    """
+
+    def __init__(self, source: str = SOURCE_FOLDER, jobs: int = DEFAULT_JOBS,
+                 store: Optional[module_store.ModuleStore] = None, incremental: bool = True):
+        self.source = source
+        self.jobs = max(1, jobs)
+        self.store = store or module_store.ModuleStore()
+        self.incremental = incremental
+
+    def provision(self, project: dict) -> dict:
+        name, dest = str(project["name"]), project["dest"]
+        log_path = os.path.join(dest, build_matrix.LOG_DIR, PROVISION_LOG)
+        result = {"name": name, "dest": dest, "status": "ok", "error": None, "log": log_path, "steps": {}}
+        step, started = "clone", time.time()
+        console.print(f"[cyan]▶ {name}[/cyan] provisioning into '{dest}'")
+
+        def done(value):
+            nonlocal started
+            result["steps"][step] = {"seconds": round(time.time() - started, 3), **value}
+            started = time.time()
+
+        try:
+            counts = clone_engine.clone_tree(self.source, dest)
+            write_settings(dest, name, project.get("settings") or {})
+            done(counts)
+
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            with open(log_path, "w", encoding="utf-8") as log:
+                def run(cmd, cwd):
+                    log.write(f"$ {' '.join(cmd)}\n")
+                    log.flush()
+                    subprocess.check_call(cmd, cwd=cwd, stdout=log, stderr=subprocess.STDOUT,
+                                          stdin=subprocess.DEVNULL)
+
+                step = "install"
+                installed = self.store.install(dest, run=run)
+                done({"store": installed["store"], "installed": installed["installed"]})
+
+                step = "seed"
+                seed = project["seed"]
+                if seed:
+                    cmd = [sys.executable, CACHE_TOOL, "seed", os.path.abspath(dest)]
+                    if isinstance(seed, dict) and seed.get("manifest"):
+                        cmd += ["--manifest", os.path.abspath(seed["manifest"])]
+                    run(cmd, dest)
+                    done({"bundled": True})
+                else:
+                    cache_tool.set_seed_resource(dest, False)
+
+            if project.get("build", True):
+                step = "build"
+                workers = int(project.get("build_workers", 1))
+                targets = build_matrix.BuildMatrix(dest, project["targets"], workers,
+                                                   incremental=self.incremental).run()
+                done({"targets": [{**r.report(), "error": r.error} for r in targets]})
+                if not all(r.ok for r in targets):
+                    result["status"] = "failed"
+                    result["error"] = "build failed: " + ", ".join(r.name for r in targets if not r.ok)
+        except subprocess.CalledProcessError as e:
+            result.update(status="failed", error=f"{step}: '{' '.join(e.cmd)}' exited with {e.returncode}")
+        except Exception as e:
+            result.update(status="failed", error=f"{step}: {e}")
+
+        colour = "green" if result["status"] == "ok" else "red"
+        console.print(f"[{colour}]■ {name}[/{colour}] {result['status']}" +
+                      (f": {result['error']}" if result["error"] else ""))
+        return result
+
+    def run(self, projects: list) -> list:
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            return list(pool.map(self.provision, projects))
+
+##################################
+# Entry point
+##################################
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Clone, install and build many Hyperfy client projects from a manifest, without prompts."
+    )
+    parser.add_argument("manifest", help="Batch manifest (JSON, or YAML with PyYAML installed)")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help=f"Projects provisioned at the same time (default: the manifest's 'jobs' or {DEFAULT_JOBS})")
+    parser.add_argument("--source", default=None, help=f"Project template (default: the manifest's 'source' or {SOURCE_FOLDER})")
+    parser.add_argument("--output", "-o", help="Write the JSON results here instead of to stdout")
+    parser.add_argument("--force", action="store_true", help="Rebuild targets even if their inputs are unchanged")
+    args = parser.parse_args(argv)
+
+    base_dir = os.path.dirname(os.path.abspath(args.manifest))
+    try:
+        manifest = load_manifest(args.manifest)
+        projects = resolve_projects(manifest, base_dir)
+    except (OSError, ManifestError) as e:
+        console.print(f"[red]Invalid manifest:\n{e}[/red]")
+        sys.exit(EXIT_INVALID)
+    source = args.source or (os.path.join(base_dir, manifest["source"]) if manifest.get("source") else SOURCE_FOLDER)
+    if not os.path.isdir(source):
+        console.print(f"[red]Error: Source '{source}' does not exist.[/red]")
+        sys.exit(EXIT_INVALID)
+
+    started = time.time()
+    provisioner = BatchProvisioner(source, args.jobs or int(manifest.get("jobs", DEFAULT_JOBS)),
+                                   incremental=not args.force)
+    results = provisioner.run(projects)
+    failed = [r for r in results if r["status"] != "ok"]
+    report = {
+        "ok": not failed,
+        "seconds": round(time.time() - started, 3),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "projects": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    console.print(f"[{'red' if failed else 'green'}]{report['succeeded']} of {len(results)} projects provisioned.[/]")
+    sys.exit(EXIT_FAILED if failed else EXIT_OK)
+
+if __name__ == "__main__":
+    main()
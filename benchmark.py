@@ -0,0 +1,516 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import signal
+import hashlib
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler, BaseHTTPRequestHandler
+from functools import partial
+from typing import Callable, Optional
+from rich.console import Console
+from rich.table import Table
+
+import tui
+import jobs
+import clone_engine
+import module_store
+import build_matrix
+
+console = Console()
+
+SOURCE_FOLDER = "./core"
+RESULTS_DIR = "benchmarks"
+SUITES = ("settings", "clone", "npm", "build", "startup")
+DEFAULT_RUNS = 3
+SETTINGS_CALLS = 200  # create_settings_file calls per sample; one call is too quick to time
+UPSTREAM_REGISTRY = "https://registry.npmjs.org/"
+DEFAULT_REGISTRY_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "bitmato-hyperfy", "registry")
+STARTUP_TIMEOUT = 60
+# After the trace appears: time for the cache to finish writing what the page just loaded,
+# then for Electron to run will-quit (which saves the cache index) and exit.
+SETTLE_SECONDS = 1
+QUIT_TIMEOUT = 30
+# Stand-in world: one page, a script, and binary "assets" the page loads like a Hyperfy world would.
+SITE_ASSETS = 24
+SITE_ASSET_BYTES = 512 * 1024
+
+##################################
+# Results
+##################################
+
+class Results:
+    """Samples per metric (seconds, unless a metric says otherwise), plus notes on skipped suites."""
+
+    def __init__(self, runs: int):
+        self.started = time.time()
+        self.runs = runs
+        self.metrics = {}
+        self.details = {}
+        self.skipped = {}
+
+    def add(self, name: str, value: float, unit: str = "s"):
+        self.metrics.setdefault(name, {"unit": unit, "samples": []})["samples"].append(round(value, 4))
+
+    def measure(self, name: str, fn: Callable, runs: Optional[int] = None, setup: Optional[Callable] = None):
+        """Times `fn()` `runs` times; `setup()` runs untimed before each sample."""
+        for _ in range(runs or self.runs):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            fn()
+            self.add(name, time.perf_counter() - started)
+
+    def skip(self, suite: str, reason: str):
+        self.skipped[suite] = reason
+        console.print(f"[yellow]Skipping {suite}: {reason}[/yellow]")
+
+    def report(self) -> dict:
+        metrics = {}
+        for name, metric in self.metrics.items():
+            samples = metric["samples"]
+            metrics[name] = {**metric, "median": round(statistics.median(samples), 4),
+                             "min": min(samples), "max": max(samples)}
+        return {
+            "startedAt": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+            "seconds": round(time.time() - self.started, 3),
+            "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+            "commit": git_commit(),
+            "runs": self.runs,
+            "metrics": metrics,
+            "details": self.details,
+            "skipped": self.skipped,
+        }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)), text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def write_results(report: dict, results_dir: str) -> str:
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(results_dir, f"bench-{stamp}.json")
+    suffix = 1
+    while os.path.exists(path):  # Two runs in the same second
+        suffix += 1
+        path = os.path.join(results_dir, f"bench-{stamp}-{suffix}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    return path
+
+def previous_results(results_dir: str, current: str) -> Optional[str]:
+    if not os.path.isdir(results_dir):
+        return None
+    runs = [os.path.join(results_dir, name) for name in os.listdir(results_dir)
+            if name.startswith("bench-") and name.endswith(".json")]
+    runs = [path for path in runs if path != current]
+    return max(runs, key=os.path.getmtime) if runs else None
+
+def format_value(value: float, unit: str) -> str:
+    return f"{value:.4g}{unit}"
+
+def comparison_table(previous: dict, current: dict, previous_name: str) -> Table:
+    """Medians of both runs; lower is better for every metric."""
+    table = Table(title=f"Compared with {previous_name}")
+    table.add_column("Metric")
+    table.add_column("Before", justify="right")
+    table.add_column("After", justify="right")
+    table.add_column("Change", justify="right")
+    for name, metric in current["metrics"].items():
+        before = previous.get("metrics", {}).get(name)
+        after = metric["median"]
+        unit = metric["unit"]
+        if not before:
+            table.add_row(name, "–", format_value(after, unit), "new")
+            continue
+        change = (after - before["median"]) / before["median"] if before["median"] else 0.0
+        colour = "green" if change < -0.05 else "red" if change > 0.05 else "white"
+        table.add_row(name, format_value(before["median"], unit), format_value(after, unit),
+                      f"[{colour}]{change:+.1%}[/{colour}]")
+    return table
+
+##################################
+# Stand-in servers
+##################################
+
+class RegistryHandler(BaseHTTPRequestHandler):
+    """
+    Serves npm registry requests from a disk cache, fetching misses from the
+    real registry once. Metadata is stored as received and its tarball URLs
+    point back at this server when served, so installs never leave it.
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        accept = self.headers.get("Accept", "")
+        key = hashlib.sha256(f"{self.path}\n{accept}".encode("utf-8")).hexdigest()
+        body_path = os.path.join(server.cache_dir, key)
+        type_path = body_path + ".type"
+        if not os.path.exists(body_path):
+            if server.offline:
+                self.send_error(404, "not in the registry stand-in's cache")
+                return
+            try:
+                request = urllib.request.Request(server.upstream + self.path.lstrip("/"), headers={"Accept": accept or "*/*"})
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    body, content_type = response.read(), response.headers.get("Content-Type", "")
+            except urllib.error.HTTPError as e:
+                self.send_error(e.code)
+                return
+            except (OSError, urllib.error.URLError) as e:
+                self.send_error(502, str(e))
+                return
+            os.makedirs(server.cache_dir, exist_ok=True)
+            with open(type_path, "w", encoding="utf-8") as f:
+                f.write(content_type)
+            tmp_path = f"{body_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, body_path)
+        with open(body_path, "rb") as f:
+            body = f.read()
+        with open(type_path, "r", encoding="utf-8") as f:
+            content_type = f.read()
+        if "json" in content_type:
+            body = body.replace(server.upstream.encode("utf-8"), server.url.encode("utf-8"))
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_server(server: ThreadingHTTPServer) -> ThreadingHTTPServer:
+    server.daemon_threads = True
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def start_registry(cache_dir: str, offline: bool) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RegistryHandler)
+    server.cache_dir, server.offline, server.upstream = cache_dir, offline, UPSTREAM_REGISTRY
+    return start_server(server)
+
+def write_site(site_dir: str):
+    """A static stand-in for a Hyperfy world: the same bytes on every run (fixed seed)."""
+    os.makedirs(site_dir, exist_ok=True)
+    rng = random.Random(1)
+    images = []
+    for i in range(SITE_ASSETS):
+        with open(os.path.join(site_dir, f"asset-{i}.png"), "wb") as f:
+            f.write(rng.randbytes(SITE_ASSET_BYTES))
+        images.append(f'<img src="asset-{i}.png" width="1" height="1">')
+    with open(os.path.join(site_dir, "world.js"), "w", encoding="utf-8") as f:
+        f.write("// " + "x" * 200_000 + "\ndocument.title = 'world';\n")
+    with open(os.path.join(site_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(f"<!doctype html><html><body><script src=\"world.js\"></script>{''.join(images)}</body></html>\n")
+
+class SiteHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+def start_site(site_dir: str) -> ThreadingHTTPServer:
+    return start_server(ThreadingHTTPServer(("127.0.0.1", 0), partial(SiteHandler, directory=site_dir)))
+
+##################################
+# Suites
+##################################
+
+def make_project(work: str, name: str, remote_url: str = "http://127.0.0.1/") -> str:
+    project = os.path.join(work, name)
+    clone_engine.clone_tree(SOURCE_FOLDER, project)
+    create_settings(project, remote_url)
+    return project
+
+def create_settings(project: str, remote_url: str):
+    tui.create_settings_file(project, "bench-project", remote_url, "800", "600", "24",
+                             False, False, False, False, False, True, "")
+
+def bench_settings(results: Results, work: str):
+    project = make_project(work, "settings")
+
+    def calls():
+        for _ in range(SETTINGS_CALLS):
+            create_settings(project, "http://127.0.0.1/")
+
+    for _ in range(results.runs):
+        started = time.perf_counter()
+        calls()
+        results.add("settings.create_settings_file", (time.perf_counter() - started) / SETTINGS_CALLS * 1000, "ms")
+
+def bench_clone(results: Results, work: str):
+    dest = os.path.join(work, "clone")
+    results.measure("clone.cold", lambda: clone_engine.clone_tree(SOURCE_FOLDER, dest),
+                    setup=lambda: shutil.rmtree(dest, ignore_errors=True))
+    results.measure("clone.resync", lambda: clone_engine.clone_tree(SOURCE_FOLDER, dest))
+
+def work_store(work: str) -> module_store.ModuleStore:
+    """A module store inside the work directory: runs never touch (or depend on) the user's own store."""
+    return module_store.ModuleStore(os.path.join(work, "store"))
+
+def stand_in_npm(registry_url: str) -> Callable:
+    """Runs the store's npm commands quietly, against the registry stand-in."""
+    return lambda cmd, cwd: subprocess.check_call(
+        cmd + ["--registry", registry_url], cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def bench_npm(results: Results, work: str, registry_url: str):
+    if not shutil.which("npm"):
+        return results.skip("npm", "npm is not on PATH")
+    if not module_store.lock_hash(SOURCE_FOLDER):
+        return results.skip("npm", f"{SOURCE_FOLDER} has no {module_store.LOCK_FILE}")
+    project = os.path.join(work, "npm")
+    npm_cache = os.path.join(work, "npm-cache")
+
+    def fresh():
+        shutil.rmtree(project, ignore_errors=True)
+        shutil.rmtree(npm_cache, ignore_errors=True)
+        make_project(work, "npm")
+
+    # npm's own cache is emptied every run, so each install downloads every tarball (from the stand-in).
+    results.measure("npm.ci", lambda: subprocess.check_call(
+        ["npm", "ci", "--no-audit", "--no-fund", "--registry", registry_url, "--cache", npm_cache],
+        cwd=project, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    ), setup=fresh)
+
+    store = work_store(work)
+    store.install(project, run=stand_in_npm(registry_url))
+    results.measure("npm.store-hit", lambda: store.install(project),
+                    setup=lambda: shutil.rmtree(os.path.join(project, "node_modules"), ignore_errors=True))
+
+def installed_project(work: str, name: str, remote_url: str, registry_url: str) -> Optional[str]:
+    """A project with node_modules from the benchmark's store, or None if npm isn't available."""
+    if not shutil.which("npm"):
+        return None
+    project = make_project(work, name, remote_url)
+    work_store(work).install(project, run=stand_in_npm(registry_url))
+    return project
+
+def bench_build(results: Results, work: str, registry_url: str):
+    if not sys.platform.startswith("linux"):
+        return results.skip("build", "the linux target is only benchmarked on Linux")
+    project = installed_project(work, "build", "http://127.0.0.1/", registry_url)
+    if not project or not os.path.exists(os.path.join(project, "node_modules", ".bin", "electron-builder")):
+        return results.skip("build", "electron-builder isn't installed (needs npm)")
+    target = [("linux", "x64")]
+
+    def build(name: str, incremental: bool):
+        matrix = build_matrix.BuildMatrix(project, target, workers=1, incremental=incremental)
+        result = matrix.run()[0]
+        if not result.ok:
+            raise RuntimeError(f"{name}: electron-builder {result.status}, see {result.log_path}")
+        results.add(name, result.seconds)
+        results.details.setdefault(name, []).append(result.report()["phases"])
+
+    for run in range(results.runs):
+        build("build.full", incremental=False)
+        build("build.cached", incremental=True)
+        create_settings(project, f"http://127.0.0.1/?run={run}")  # A settings-only change
+        build("build.repack", incremental=True)
+
+def display_prefix() -> Optional[list]:
+    """[] with a display, ["xvfb-run", "-a"] without one, None if neither is available."""
+    if sys.platform != "linux" or os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"):
+        return []
+    return ["xvfb-run", "-a"] if shutil.which("xvfb-run") else None
+
+def electron_pids(pid: int) -> list:
+    """`pid` and its descendants that are Electron (the CLI wrapper or the app), from /proc."""
+    children = {}
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r", encoding="utf-8") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    found, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/cmdline", "rb") as f:
+                args = f.read().split(b"\0")
+        except OSError:
+            continue
+        # The program itself, or the script node runs; wrappers only have Electron among their arguments.
+        program = os.path.basename(args[0])
+        if b"electron" in program or (program.startswith(b"node") and len(args) > 1 and b"electron" in args[1]):
+            found.append(current)
+    return found
+
+def quit_app(process: subprocess.Popen):
+    """
+    Quits Electron the way a user would, so will-quit saves the cache index and
+    the next (warm) launch starts from a complete cache. Electron handles
+    SIGTERM like app.quit(); xvfb-run (or whatever else wraps it) must not get
+    it, or the display goes away first. Falls back to kill_tree.
+    """
+    time.sleep(SETTLE_SECONDS)
+    if sys.platform != "win32" and process.poll() is None:
+        for pid in electron_pids(process.pid) or [process.pid]:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        try:
+            process.wait(QUIT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            pass
+    jobs.kill_tree(process)
+
+def launch(project: str, config_home: str, prefix: list, log_path: str) -> dict:
+    """Starts the app, waits for this launch's entry in startup-trace.json, then quits it."""
+    electron = os.path.join(project, "node_modules", ".bin", "electron")
+    cmd = prefix + [electron, "."]
+    if hasattr(os, "geteuid") and os.geteuid() == 0:
+        cmd.append("--no-sandbox")  # Chromium refuses to run as root otherwise (CI containers)
+    # userData lives under XDG_CONFIG_HOME (Linux) / HOME, so each benchmark gets its own.
+    env = {**os.environ, "XDG_CONFIG_HOME": config_home, "HOME": config_home}
+    previous = latest_trace(config_home)
+    with open(log_path, "a", encoding="utf-8") as log:
+        process = jobs.start_process(cmd, project, stdout=log, stderr=subprocess.STDOUT, env=env)
+        try:
+            deadline = time.time() + STARTUP_TIMEOUT
+            while time.time() < deadline:
+                entry = latest_trace(config_home)
+                if entry and entry != previous:
+                    return {mark["name"]: mark["ms"] for mark in entry["marks"]}
+                if process.poll() is not None:
+                    raise RuntimeError(f"Electron exited with {process.returncode}; see {log_path}")
+                time.sleep(0.1)
+            raise RuntimeError(f"No startup trace after {STARTUP_TIMEOUT}s; see {log_path}")
+        finally:
+            quit_app(process)
+
+def latest_trace(config_home: str) -> Optional[dict]:
+    for root, _, names in os.walk(config_home):
+        if "startup-trace.json" in names:
+            try:
+                with open(os.path.join(root, "startup-trace.json"), "r", encoding="utf-8") as f:
+                    return json.load(f)["launches"][0]
+            except (OSError, ValueError, KeyError, IndexError):
+                return None
+    return None
+
+def bench_startup(results: Results, work: str, registry_url: str):
+    prefix = display_prefix()
+    if prefix is None:
+        return results.skip("startup", "no display and no xvfb-run (install Xvfb)")
+    site_dir = os.path.join(work, "site")
+    write_site(site_dir)
+    site = start_site(site_dir)
+    try:
+        project = installed_project(work, "startup", site.url, registry_url)
+        if not project or not os.path.exists(os.path.join(project, "node_modules", ".bin", "electron")):
+            return results.skip("startup", "Electron isn't installed (needs npm)")
+        log_path = os.path.join(work, "electron.log")
+        for _ in range(results.runs):
+            # Cold: empty asset cache and userData. Warm: the same again, everything on disk.
+            config_home = tempfile.mkdtemp(dir=work, prefix="config-")
+            shutil.rmtree(os.path.join(project, "cache"), ignore_errors=True)
+            for kind in ("cold", "warm"):
+                marks = launch(project, config_home, prefix, log_path)
+                load = marks.get("did-finish-load")
+                if load is None:
+                    raise RuntimeError(f"The stand-in page failed to load; see {log_path}")
+                results.add(f"startup.{kind}.did-finish-load", load, "ms")
+                if "first-paint" in marks:
+                    results.add(f"startup.{kind}.first-paint", marks["first-paint"], "ms")
+                results.details.setdefault(f"startup.{kind}", []).append(marks)
+    finally:
+        site.shutdown()
+
+##################################
+# Entry point
+##################################
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the clone → install → build → first-load pipeline and compare with earlier runs."
+    )
+    parser.add_argument("--only", default=",".join(SUITES),
+                        help=f"Comma-separated suites to run (default: all of {', '.join(SUITES)})")
+    parser.add_argument("--runs", "-n", type=int, default=DEFAULT_RUNS, help=f"Samples per metric (default: {DEFAULT_RUNS})")
+    parser.add_argument("--results", default=RESULTS_DIR, help=f"Results directory (default: {RESULTS_DIR})")
+    parser.add_argument("--compare", help="Results file to compare with (default: the previous run in --results)")
+    parser.add_argument("--registry-cache", default=DEFAULT_REGISTRY_CACHE,
+                        help="Where the npm registry stand-in keeps packages (filled from the real registry once)")
+    parser.add_argument("--offline", action="store_true", help="Never let the registry stand-in use the network")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary work directory")
+    args = parser.parse_args(argv)
+
+    suites = [s.strip() for s in args.only.split(",") if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        console.print(f"[red]Unknown suites: {', '.join(sorted(unknown))}[/red]")
+        sys.exit(2)
+    if not os.path.isdir(SOURCE_FOLDER):
+        console.print(f"[red]Error: Source '{SOURCE_FOLDER}' does not exist (run from the repository root).[/red]")
+        sys.exit(1)
+
+    results = Results(max(1, args.runs))
+    work = tempfile.mkdtemp(prefix="bitmato-bench-")
+    # Every suite that installs packages gets them from the stand-in.
+    registry = start_registry(args.registry_cache, args.offline) if {"npm", "build", "startup"} & set(suites) else None
+    failed = False
+    try:
+        for suite in suites:
+            console.print(f"[bold cyan]▶ {suite}[/bold cyan]")
+            try:
+                if suite == "settings":
+                    bench_settings(results, work)
+                elif suite == "clone":
+                    bench_clone(results, work)
+                elif suite == "npm":
+                    bench_npm(results, work, registry.url)
+                elif suite == "build":
+                    bench_build(results, work, registry.url)
+                else:
+                    bench_startup(results, work, registry.url)
+            except (OSError, RuntimeError, subprocess.CalledProcessError) as e:
+                failed = True
+                results.skipped[suite] = f"failed: {e}"
+                console.print(f"[red]{suite} failed: {e}[/red]")
+    finally:
+        if registry:
+            registry.shutdown()
+        if args.keep:
+            console.print(f"Work directory kept: {work}")
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+    report = results.report()
+    path = write_results(report, args.results)
+    console.print(f"[green]Results:[/green] {path}")
+
+    previous_path = args.compare or previous_results(args.results, path)
+    if previous_path:
+        with open(previous_path, "r", encoding="utf-8") as f:
+            console.print(comparison_table(json.load(f), report, os.path.basename(previous_path)))
+    else:
+        table = Table(title="Results (medians)")
+        table.add_column("Metric")
+        table.add_column("Median", justify="right")
+        for name, metric in report["metrics"].items():
+            table.add_row(name, format_value(metric["median"], metric["unit"]))
+        console.print(table)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import os
+import json
+import glob
+import shutil
+import hashlib
+from typing import Optional
+
+import clone_engine
+
+FINGERPRINT_FILE = ".build-fingerprint.json"
+# Never inputs of a build: outputs, logs, installed packages and the runtime cache.
+IGNORED = clone_engine.DEFAULT_EXCLUDES | {"build-logs", FINGERPRINT_FILE}
+# Tool versions that change the output even when the project doesn't.
+TOOL_PACKAGES = ("electron", "electron-builder")
+
+##################################
+# Fingerprints
+##################################
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def combined_hash(items) -> str:
+    digest = hashlib.sha256()
+    for item in items:
+        digest.update(json.dumps(item, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+def extra_resources(project_folder: str) -> list:
+    """`(from, to)` pairs of package.json's build.extraResources."""
+    try:
+        with open(os.path.join(project_folder, "package.json"), "r", encoding="utf-8") as f:
+            resources = json.load(f).get("build", {}).get("extraResources", [])
+    except (OSError, ValueError):
+        return []
+    if isinstance(resources, (dict, str)):
+        resources = [resources]
+    pairs = []
+    for resource in resources:
+        if isinstance(resource, str):
+            pairs.append((resource, resource))
+        elif isinstance(resource, dict) and resource.get("from"):
+            pairs.append((resource["from"], resource.get("to", resource["from"])))
+    return pairs
+
+def hash_tree(root: str, rel: str, skip=()) -> dict:
+    """`{relative path: sha256}` for `rel` under `root` (a file or a directory)."""
+    path = os.path.join(root, rel)
+    if os.path.isfile(path):
+        return {os.path.normpath(rel): file_hash(path)}
+    hashes = {}
+    for current, dirs, names in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED and os.path.normpath(os.path.relpath(os.path.join(current, d), root)) not in skip)
+        for name in sorted(names):
+            file_rel = os.path.normpath(os.path.relpath(os.path.join(current, name), root))
+            if name not in IGNORED and file_rel not in skip:
+                hashes[file_rel] = file_hash(os.path.join(current, name))
+    return hashes
+
+def tool_versions(project_folder: str) -> dict:
+    versions = {}
+    for package in TOOL_PACKAGES:
+        try:
+            with open(os.path.join(project_folder, "node_modules", package, "package.json"), "r", encoding="utf-8") as f:
+                versions[package] = json.load(f).get("version")
+        except (OSError, ValueError):
+            versions[package] = None
+    return versions
+
+def package_hash(project_folder: str) -> Optional[str]:
+    """package.json without build.extraResources, which the resources fingerprint covers."""
+    try:
+        with open(os.path.join(project_folder, "package.json"), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    data.get("build", {}).pop("extraResources", None)
+    return combined_hash([data])
+
+def fingerprint(project_folder: str, platform: str, arch: str) -> dict:
+    """
+    Fingerprints a build in two parts. `resources` covers the files copied by
+    build.extraResources (settings.json, a bundled seed cache); `app` covers
+    everything else: the sources, package.json, the lockfile, the installed
+    Electron and electron-builder versions and the target.
+    """
+    resources = extra_resources(project_folder)
+    resource_paths = {os.path.normpath(src) for src, _ in resources}
+    resource_files = {}
+    for src, _ in resources:
+        if os.path.exists(os.path.join(project_folder, src)):
+            resource_files.update(hash_tree(project_folder, src))
+    app_files = hash_tree(project_folder, ".", skip=resource_paths | set(resource_files))
+    # A settings or seed change edits build.extraResources; that alone only needs a repack.
+    # (Toggling the seed also edits build.files, which changes app.asar: a full build.)
+    if "package.json" in app_files:
+        app_files["package.json"] = package_hash(project_folder) or app_files["package.json"]
+    return {
+        "target": f"{platform}-{arch}",
+        "app": combined_hash([platform, arch, tool_versions(project_folder), sorted(app_files.items())]),
+        "resources": combined_hash([sorted(resources), sorted(resource_files.items())]),
+    }
+
+##################################
+# Cached builds
+##################################
+
+class BuildCache:
+    """
+    Compares a target's current fingerprint with the one recorded next to its
+    last successful build (`<output dir>/.build-fingerprint.json`):
+
+    - "cached": nothing changed; the artifacts in the output dir are reused.
+    - "resources": only extraResources changed; they are copied into the
+      unpacked app left by the last build, and electron-builder repackages it
+      with --prepackaged instead of rebuilding the app.
+    - "full": anything else.
+    """
+
+    def __init__(self, project_folder: str, output_dir: str):
+        self.project_folder = project_folder
+        self.output_dir = output_dir
+        self.record_path = os.path.join(output_dir, FINGERPRINT_FILE)
+
+    def recorded(self) -> Optional[dict]:
+        try:
+            with open(self.record_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def plan(self, current: dict) -> str:
+        previous = self.recorded()
+        if not previous or previous.get("target") != current["target"] or previous.get("app") != current["app"]:
+            return "full"
+        if previous.get("resources") != current["resources"]:
+            return "resources" if self.unpacked_dir() else "full"
+        return "cached"
+
+    def record(self, current: dict):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(self.record_path, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=4)
+
+    def invalidate(self):
+        if os.path.exists(self.record_path):
+            os.remove(self.record_path)
+
+    def unpacked_dir(self) -> Optional[str]:
+        """The unpacked app electron-builder left in the output dir (win-unpacked, linux-arm64-unpacked, mac/…)."""
+        for pattern in ("*-unpacked", "mac*"):
+            for path in sorted(glob.glob(os.path.join(self.output_dir, pattern))):
+                if os.path.isdir(path):
+                    return path
+        return None
+
+    def resources_dir(self, unpacked: str) -> str:
+        apps = glob.glob(os.path.join(unpacked, "*.app"))
+        return os.path.join(apps[0], "Contents", "Resources") if apps else os.path.join(unpacked, "resources")
+
+    def refresh_resources(self) -> str:
+        """Copies the current extraResources into the unpacked app; returns its path."""
+        unpacked = self.unpacked_dir()
+        resources_dir = self.resources_dir(unpacked)
+        for src, dst in extra_resources(self.project_folder):
+            source = os.path.join(self.project_folder, src)
+            target = os.path.join(resources_dir, dst)
+            if os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target)
+            elif os.path.lexists(target):
+                os.remove(target)
+            if os.path.isdir(source):
+                clone_engine.clone_tree(source, target, excludes=())
+            elif os.path.exists(source):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(source, target)
+        return unpacked
@@ -0,0 +1,335 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from rich.console import Console
+from rich.table import Table
+from rich.progress import Progress, BarColumn, TextColumn, TimeElapsedColumn
+
+import jobs
+import build_cache
+import build_profile
+
+console = Console()
+
+PLATFORMS = ["win32", "linux", "darwin"]
+ARCHS = ["x64", "arm64", "ia32", "armv7l"]
+
+# electron-builder's CLI flags for the platform/arch names used by the TUI and GUI.
+PLATFORM_FLAGS = {"win32": "--win", "linux": "--linux", "darwin": "--mac", "macos": "--mac"}
+ARCH_FLAGS = {"x64": "--x64", "arm64": "--arm64", "ia32": "--ia32", "armv7l": "--armv7l", "arm7l": "--armv7l"}
+
+LOG_DIR = "build-logs"
+OUTPUT_DIR = "dist"
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
+##################################
+# Targets
+##################################
+
+def parse_target(spec: str):
+    """'linux/x64' (or 'linux-x64') → ('linux', 'x64')."""
+    platform, sep, arch = spec.strip().replace("-", "/").partition("/")
+    if not sep or platform not in PLATFORM_FLAGS or arch not in ARCH_FLAGS:
+        raise ValueError(f"Invalid build target '{spec}' (expected platform/arch, e.g. linux/x64)")
+    return platform, arch
+
+def parse_targets(specs) -> list:
+    """Parses a list of targets (or one comma-separated string), dropping duplicates."""
+    if isinstance(specs, str):
+        specs = specs.split(",")
+    targets = []
+    for spec in specs:
+        if spec.strip():
+            target = parse_target(spec)
+            if target not in targets:
+                targets.append(target)
+    return targets
+
+def target_name(platform: str, arch: str) -> str:
+    return f"{platform}-{arch}"
+
+def output_dir(platform: str, arch: str) -> str:
+    return f"{OUTPUT_DIR}/{target_name(platform, arch)}"
+
+def builder_command(platform: str, arch: str) -> list:
+    """electron-builder invocation for one target, with its own output directory."""
+    return [
+        "npx", "electron-builder",
+        PLATFORM_FLAGS[platform], ARCH_FLAGS[arch],
+        # Parallel targets would otherwise share dist/ and its *-unpacked folders.
+        f"-c.directories.output={output_dir(platform, arch)}",
+    ]
+
+##################################
+# Scheduler
+##################################
+
+class BuildResult:
+    def __init__(self, platform: str, arch: str, log_path: str):
+        self.platform = platform
+        self.arch = arch
+        self.log_path = log_path
+        self.status = "queued"  # queued → running → ok / cached / failed / error / cancelled
+        self.mode: Optional[str] = None  # full, resources (repack only) or cached
+        self.returncode: Optional[int] = None
+        self.started: Optional[float] = None
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.profile = build_profile.PhaseTracker("electron-builder")
+
+    @property
+    def name(self) -> str:
+        return target_name(self.platform, self.arch)
+
+    @property
+    def phase(self) -> str:
+        return self.profile.phase if self.status == "running" else self.status
+
+    @property
+    def progress(self) -> float:
+        """Share of this target that's done, inferred from electron-builder's phase markers."""
+        if self.status == "queued":
+            return 0.0
+        if self.status != "running":
+            return 1.0
+        return self.profile.progress or 0.0
+
+    def report(self) -> dict:
+        return {
+            "target": self.name, "status": self.status, "mode": self.mode, "returncode": self.returncode,
+            "seconds": None if self.seconds is None else round(self.seconds, 3),
+            "phases": self.profile.report() if self.returncode is not None else [],
+            "log": self.log_path,
+        }
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ("ok", "cached")
+
+class BuildMatrix:
+    """
+    Runs one electron-builder process per target, at most `workers` at a time.
+    Each target's stdout and stderr go to `<project>/build-logs/<platform>-<arch>.log`
+    and its output to `dist/<platform>-<arch>/`. `on_update(result)` is called
+    from worker threads whenever a target starts, enters a new electron-builder
+    phase or finishes; `run` then writes a timing report of every target's
+    phases to `build-logs/profile-build-<timestamp>.json` (`report_path`).
+
+    With `incremental`, targets whose inputs match their last successful build
+    are skipped, and targets where only settings.json or the seed cache changed
+    are repackaged from their unpacked app (see build_cache.BuildCache).
+
+    `cancel()` (from any thread) kills the running electron-builder process
+    trees and skips the targets that haven't started.
+    """
+
+    def __init__(self, project_folder: str, targets: list, workers: int = DEFAULT_WORKERS,
+                 on_update: Optional[Callable] = None, command: Callable = builder_command,
+                 incremental: bool = True):
+        self.project_folder = project_folder
+        self.workers = max(1, workers)
+        self.on_update = on_update
+        self.command = command
+        self.incremental = incremental
+        self.cancelled = threading.Event()
+        self.processes = set()
+        self.process_lock = threading.Lock()
+        self.report_path: Optional[str] = None
+        log_dir = os.path.join(project_folder, LOG_DIR)
+        self.results = [BuildResult(platform, arch, os.path.join(log_dir, f"{target_name(platform, arch)}.log"))
+                        for platform, arch in targets]
+        self.lock = threading.Lock()
+
+    def notify(self, result: BuildResult):
+        if self.on_update:
+            with self.lock:
+                self.on_update(result)
+
+    def cancel(self):
+        with self.process_lock:
+            self.cancelled.set()
+            processes = list(self.processes)
+        for process in processes:
+            jobs.kill_tree(process)
+
+    def build(self, result: BuildResult) -> BuildResult:
+        if self.cancelled.is_set():
+            result.status = "cancelled"
+            result.seconds = 0.0
+            self.notify(result)
+            return result
+        result.status = "running"
+        result.started = time.time()
+        result.profile = build_profile.PhaseTracker("electron-builder")
+        self.notify(result)
+        cache = build_cache.BuildCache(self.project_folder,
+                                       os.path.join(self.project_folder, output_dir(result.platform, result.arch)))
+        try:
+            current = build_cache.fingerprint(self.project_folder, result.platform, result.arch)
+            result.mode = cache.plan(current) if self.incremental else "full"
+            if result.mode == "cached":
+                result.status = "cached"
+                result.seconds = time.time() - result.started
+                self.notify(result)
+                return result
+
+            cmd = self.command(result.platform, result.arch)
+            if result.mode == "resources":
+                cmd += ["--prepackaged", os.path.relpath(cache.refresh_resources(), self.project_folder)]
+            else:
+                cache.invalidate()
+            os.makedirs(os.path.dirname(result.log_path), exist_ok=True)
+            with open(result.log_path, "w", encoding="utf-8") as log:
+                log.write(f"$ {' '.join(cmd)}\n")
+                log.flush()
+                process = jobs.start_process(
+                    cmd, self.project_folder, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    stdin=subprocess.DEVNULL, text=True, errors="replace",
+                )
+                with self.process_lock:
+                    self.processes.add(process)
+                if self.cancelled.is_set():
+                    jobs.kill_tree(process)
+                # stderr is merged into stdout, so one reader can't deadlock on the other pipe.
+                for line in process.stdout:
+                    log.write(line)
+                    if result.profile.feed(line):
+                        self.notify(result)
+                process.stdout.close()
+                result.returncode = process.wait()
+                result.profile.finish()
+                with self.process_lock:
+                    self.processes.discard(process)
+            if self.cancelled.is_set():
+                result.status = "cancelled"
+            else:
+                result.status = "ok" if result.returncode == 0 else "failed"
+            if result.ok:
+                cache.record(current)
+            else:
+                # A failed repack may have left the unpacked app half-updated.
+                cache.invalidate()
+        except OSError as e:
+            result.status = "error"
+            result.error = str(e)
+        result.seconds = time.time() - result.started
+        self.notify(result)
+        return result
+
+    def run(self) -> list:
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                list(pool.map(self.build, self.results))
+            except KeyboardInterrupt:
+                # Builds run in their own process groups, so Ctrl+C doesn't reach them by itself.
+                self.cancel()
+                raise
+        self.write_report(started)
+        return self.results
+
+    def write_report(self, started: float):
+        try:
+            self.report_path = build_profile.write_report(
+                os.path.join(self.project_folder, LOG_DIR), "build", started,
+                [r.report() for r in self.results],
+                versions=build_cache.tool_versions(self.project_folder),
+            )
+        except OSError:
+            self.report_path = None  # The builds themselves are done; a missing report isn't worth failing them
+
+BUILD_MODES = {"full": "full", "resources": "repack", "cached": "reused"}
+
+def summary_table(results: list) -> Table:
+    table = Table(title="Build summary")
+    table.add_column("Target")
+    table.add_column("Status")
+    table.add_column("Build")
+    table.add_column("Exit", justify="right")
+    table.add_column("Time", justify="right")
+    table.add_column("Slowest phase")
+    table.add_column("Log")
+    for r in results:
+        status = {"ok": "[green]ok[/green]", "cached": "[green]cached[/green]",
+                  "failed": "[red]failed[/red]"}.get(r.status, f"[red]{r.error or r.status}[/red]")
+        table.add_row(
+            r.name, status, BUILD_MODES.get(r.mode, ""),
+            "" if r.returncode is None else str(r.returncode),
+            "" if r.seconds is None else f"{r.seconds:.1f}s",
+            slowest_phase(r),
+            r.log_path,
+        )
+    return table
+
+def slowest_phase(result: BuildResult) -> str:
+    phases = result.report()["phases"]
+    if not phases:
+        return ""
+    slowest = max(phases, key=lambda p: p["seconds"])
+    return f"{slowest['name']} ({slowest['seconds']:.1f}s)"
+
+def run_matrix_cli(project_folder: str, targets: list, workers: int, incremental: bool = True) -> list:
+    """Runs the matrix with a progress bar per target and a summary table on the console."""
+    console.print(f"[bold green]Building[/bold green] {len(targets)} targets in '{project_folder}' "
+                  f"with {workers} workers...")
+    with Progress(
+        TextColumn("{task.fields[target]:<14}"),
+        BarColumn(),
+        TextColumn("{task.percentage:>3.0f}%"),
+        TimeElapsedColumn(),
+        TextColumn("{task.description}"),
+        console=console,
+    ) as progress:
+        tasks = {target_name(*target): progress.add_task("queued", total=1.0, target=target_name(*target), start=False)
+                 for target in targets}
+
+        def on_update(result: BuildResult):
+            task = tasks[result.name]
+            if result.status == "running" and result.phase == "startup":
+                progress.start_task(task)
+            elif result.status != "running":
+                colour = "green" if result.ok else "red"
+                progress.console.print(
+                    f"[{colour}]■ {result.name}[/{colour}] {result.status} in {result.seconds:.1f}s"
+                    + (" (resources repacked)" if result.mode == "resources" and result.ok else "")
+                )
+                progress.stop_task(task)
+            progress.update(task, completed=result.progress, description=result.phase)
+
+        matrix = BuildMatrix(project_folder, targets, workers, on_update=on_update, incremental=incremental)
+        results = matrix.run()
+    console.print(summary_table(results))
+    if matrix.report_path:
+        console.print(f"Timing report: {matrix.report_path}")
+    return results
+
+##################################
+# Entry point
+##################################
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a Hyperfy client for several platforms/architectures in parallel.")
+    parser.add_argument("project_folder", help="Electron project folder")
+    parser.add_argument("--target", "-t", action="append", required=True,
+                        help="platform/arch, e.g. linux/x64 (repeatable or comma-separated)")
+    parser.add_argument("--workers", "-w", type=int, default=DEFAULT_WORKERS,
+                        help=f"Targets built at the same time (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild every target even if its inputs are unchanged")
+    args = parser.parse_args(argv)
+
+    try:
+        targets = parse_targets([spec for value in args.target for spec in value.split(",")])
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(2)
+    results = run_matrix_cli(args.project_folder, targets, args.workers, incremental=not args.force)
+    sys.exit(0 if all(r.ok for r in results) else 1)
+
+if __name__ == "__main__":
+    main()
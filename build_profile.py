@@ -0,0 +1,145 @@
+import os
+import re
+import json
+import time
+import platform
+import subprocess
+from typing import Callable, Optional
+
+# Terminal colours electron-builder adds when it thinks it's on a TTY.
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+# Phase markers, in the order the phases normally run. Time before the first
+# marker is counted as "startup" (npx resolving electron-builder, npm reading the lockfile).
+PHASES = {
+    "electron-builder": [
+        ("config", re.compile(r"•\s+(electron-builder\s+version=|loaded configuration|writing effective config)")),
+        ("native dependencies", re.compile(r"•\s+(rebuilding|installing) (native|production) dependencies|•\s+preparing\s+moduleName=")),
+        ("packaging", re.compile(r"•\s+packaging\s")),
+        # Only Electron itself; tool downloads (nsis, winCodeSign, appimage) belong to the phase that needs them.
+        ("downloading electron", re.compile(r"•\s+download(ing|ed)\s.*url=\S*/electron-v")),
+        ("asar", re.compile(r"•\s+(asar\b|updating asar integrity)")),
+        ("signing", re.compile(r"•\s+(signing|signed|notariz|skipped macOS application code signing)")),
+        ("writing targets", re.compile(r"•\s+building\s+(target=|block map)")),
+    ],
+    "npm": [
+        ("fetching", re.compile(r"^npm (http fetch|sill fetch|timing reify)")),
+        ("scripts", re.compile(r"^> \S+@\S+ (pre|post)?install")),
+        ("summary", re.compile(r"^(added|removed|changed|up to date)\b")),
+    ],
+}
+
+# Share of an electron-builder run that's done when each phase starts. npm
+# prints nothing until it's almost finished, so its progress isn't inferred.
+PROGRESS = {
+    "electron-builder": {"startup": 0.0, "config": 0.05, "native dependencies": 0.1, "packaging": 0.2,
+                         "downloading electron": 0.25, "asar": 0.55, "signing": 0.65, "writing targets": 0.75},
+}
+
+REPORT_PREFIX = "profile"
+
+##################################
+# Phase tracking
+##################################
+
+class PhaseTracker:
+    """
+    Splits a tool's output into phases by their marker lines and times them.
+    A phase runs from its first marker to the next phase's marker; markers of
+    a phase that has already run (a second `building target=`) don't start a
+    new one. `progress` is the inferred share done, or None for tools whose
+    output doesn't say.
+    """
+
+    def __init__(self, tool: str, clock: Callable = time.time):
+        self.tool = tool
+        self.clock = clock
+        self.started = clock()
+        self.finished: Optional[float] = None
+        self.phases = [{"name": "startup", "start": self.started, "end": None, "lines": 0}]
+        self.weights = PROGRESS.get(tool)
+        self.done_share = 0.0
+
+    @property
+    def phase(self) -> str:
+        return self.phases[-1]["name"]
+
+    @property
+    def progress(self) -> Optional[float]:
+        if self.finished is not None:
+            return 1.0
+        return self.done_share if self.weights else None
+
+    def feed(self, line: str) -> bool:
+        """Counts `line` towards the current phase; returns True if it starts a new one."""
+        line = ANSI_ESCAPE.sub("", line).strip()
+        started = False
+        for name, pattern in PHASES.get(self.tool, ()):
+            if pattern.search(line) and not any(p["name"] == name for p in self.phases):
+                now = self.clock()
+                self.phases[-1]["end"] = now
+                self.phases.append({"name": name, "start": now, "end": None, "lines": 0})
+                if self.weights:
+                    self.done_share = max(self.done_share, self.weights.get(name, self.done_share))
+                started = True
+                break
+        self.phases[-1]["lines"] += 1
+        return started
+
+    def finish(self):
+        if self.finished is None:
+            self.finished = self.clock()
+            self.phases[-1]["end"] = self.finished
+
+    def report(self) -> list:
+        """`[{"name", "offset", "seconds", "lines"}]`, offsets relative to the start."""
+        now = self.finished or self.clock()
+        return [{
+            "name": p["name"],
+            "offset": round(p["start"] - self.started, 3),
+            "seconds": round((p["end"] or now) - p["start"], 3),
+            "lines": p["lines"],
+        } for p in self.phases]
+
+def run_tracked(cmd, cwd, tracker: PhaseTracker, on_line: Optional[Callable] = None,
+                on_phase: Optional[Callable] = None):
+    """Runs `cmd` with stderr merged into stdout, feeding each line to `tracker`; raises on failure."""
+    process = subprocess.Popen(
+        cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+        text=True, errors="replace",
+    )
+    for line in process.stdout:
+        if on_line:
+            on_line(line)
+        if tracker.feed(line) and on_phase:
+            on_phase(tracker)
+    process.stdout.close()
+    return_code = process.wait()
+    tracker.finish()
+    if return_code != 0:
+        raise subprocess.CalledProcessError(return_code, cmd)
+
+##################################
+# Reports
+##################################
+
+def write_report(log_dir: str, kind: str, started: float, entries: list, versions: Optional[dict] = None) -> str:
+    """
+    Writes `<log_dir>/profile-<kind>-<timestamp>.json`; one file per run, so
+    timings can be compared across versions. Returns its path.
+    """
+    seconds = time.time() - started
+    report = {
+        "kind": kind,
+        "startedAt": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(started)),
+        "seconds": round(seconds, 3),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "versions": versions or {},
+        "entries": entries,
+    }
+    os.makedirs(log_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(started))
+    path = os.path.join(log_dir, f"{REPORT_PREFIX}-{kind}-{stamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    return path
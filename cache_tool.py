@@ -0,0 +1,855 @@
+import os
+import re
+import sys
+import json
+import mmap
+import time
+import shutil
+import asyncio
+import hashlib
+import argparse
+import http.client
+import mimetypes
+import urllib.error
+import urllib.request
+from typing import Optional
+from urllib.parse import unquote, urljoin, urldefrag, urlsplit
+from rich.console import Console
+from rich.progress import Progress, BarColumn, MofNCompleteColumn, TextColumn
+
+console = Console()
+
+# Top-level files core/cache.js keeps next to the entries (same names as there).
+INDEX_FILE = "index.json"
+STATS_FILE = "stats.json"
+ACCESS_LOG_FILE = "access-log.json"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+SHARD_NAME = re.compile(r"^[0-9a-f]{2}$")
+BLOB_DIR = "blobs"
+
+PACK_DIR_NAME = "pack"
+PACK_VERSION = 1
+SEGMENT_MAX_BYTES = 1 << 30
+COPY_CHUNK = 1 << 20
+
+# Asset types Hyperfy serves that the stdlib mimetypes table doesn't know.
+for _type, _ext in (("model/gltf-binary", ".glb"), ("model/gltf+json", ".gltf"),
+                    ("image/ktx2", ".ktx2"), ("application/wasm", ".wasm"), ("model/vrm", ".vrm")):
+    mimetypes.add_type(_type, _ext)
+
+##################################
+# Cache layout (mirrors core/cache.js)
+##################################
+
+def url_origin(url: str) -> str:
+    """Returns `scheme://host[:port]` the way a WHATWG URL reports `origin`."""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return f"{scheme}://{host}"
+
+def cache_key(url: str) -> str:
+    """SHA-256 of origin + path + query, the key core/cache.js stores `url` under."""
+    parts = urlsplit(url)
+    search = f"?{parts.query}" if parts.query else ""
+    return hashlib.sha256((url_origin(url) + (parts.path or "/") + search).encode("utf-8")).hexdigest()
+
+def meta_path(cache_dir: str, key: str) -> str:
+    """Path of the `.meta` record for cache key `key`."""
+    return os.path.join(cache_dir, key[:2], key[2:4], f"{key}.meta")
+
+def blob_path(cache_dir: str, digest: str) -> str:
+    """Path of the content-addressed body whose SHA-256 is `digest`."""
+    return os.path.join(cache_dir, BLOB_DIR, digest[:2], digest[2:4], digest)
+
+def write_json_atomic(path: str, data: dict):
+    tmp_path = f"{path}.{os.getpid()}.part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def invalidate_index(cache_dir: str):
+    """Removes the saved index so core/main.js rescans the directory on its next start."""
+    index_path = os.path.join(cache_dir, INDEX_FILE)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+def iter_cache_entries(cache_dir: str):
+    """Yields `(key, meta, blob_path)` for every complete entry in a sharded cache directory."""
+    for top in os.scandir(cache_dir):
+        if not top.is_dir() or not SHARD_NAME.match(top.name):
+            continue
+        for sub in os.scandir(top.path):
+            if not sub.is_dir() or not SHARD_NAME.match(sub.name):
+                continue
+            for entry in os.scandir(sub.path):
+                if not entry.name.endswith(".meta"):
+                    continue
+                try:
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if not isinstance(meta, dict) or "headers" not in meta or not meta.get("hash"):
+                    continue
+                data_path = blob_path(cache_dir, meta["hash"])
+                if os.path.exists(data_path):
+                    yield entry.name[:-5], meta, data_path
+
+##################################
+# Migration from the flat layout
+##################################
+
+def read_flat_meta(flat_meta: str, origin: Optional[str], name: str) -> Optional[dict]:
+    """
+    Reads a flat-layout `.meta` file. Structured records are returned as-is;
+    the older timestamp-only files are upgraded using `origin` and a content
+    type guessed from the file name. Returns None if the entry can't be placed.
+    """
+    try:
+        with open(flat_meta, "r", encoding="utf-8") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return None
+
+    try:
+        meta = json.loads(raw)
+    except ValueError:
+        meta = None
+    if isinstance(meta, dict) and meta.get("url") and "headers" in meta:
+        return dict(meta, encoding=meta.get("encoding"))
+
+    if not origin:
+        return None
+    url = origin + unquote(name)
+    cached_at = meta if isinstance(meta, int) else int(os.stat(flat_meta).st_mtime * 1000)
+    headers = {}
+    content_type, _ = mimetypes.guess_type(urlsplit(url).path)
+    if content_type:
+        headers["content-type"] = content_type
+    return {
+        "url": url,
+        "cachedAt": cached_at,
+        "etag": None,
+        "lastModified": None,
+        "contentType": content_type,
+        "encoding": None,
+        "headers": headers,
+    }
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def migrate_flat_cache(cache_dir: str, origin: Optional[str]) -> dict:
+    """
+    Moves flat-layout entries (`encodeURIComponent(path + query)` names) into the
+    sharded, content-addressed layout in place. Entries are streamed from
+    `os.scandir`; each body is hashed and renamed into the blob store, never
+    copied, so the migration is cheap and can be interrupted and re-run at any
+    point. Bodies that several URLs share end up stored once.
+    """
+    counts = {"migrated": 0, "duplicates": 0, "skipped": 0, "dropped": 0}
+
+    # The saved index refers to the old names; core/main.js rebuilds it.
+    invalidate_index(cache_dir)
+
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            name = entry.name
+            if not entry.is_file() or name == INDEX_FILE or name.endswith(".meta"):
+                continue
+            # The app's statistics and prefetch history (and their temporary files) aren't entries.
+            if name.startswith((STATS_FILE, ACCESS_LOG_FILE)):
+                continue
+            if name.endswith(".part"):
+                os.remove(entry.path)
+                counts["dropped"] += 1
+                continue
+
+            flat_meta = entry.path + ".meta"
+            if not os.path.exists(flat_meta):
+                # A download that never finished.
+                os.remove(entry.path)
+                counts["dropped"] += 1
+                continue
+
+            meta = read_flat_meta(flat_meta, origin, name)
+            if meta is None:
+                counts["skipped"] += 1
+                continue
+
+            target_meta = meta_path(cache_dir, cache_key(meta["url"]))
+            if os.path.exists(target_meta):
+                try:
+                    with open(target_meta, "r", encoding="utf-8") as f:
+                        current = json.load(f)
+                    if os.path.exists(blob_path(cache_dir, current["hash"])):
+                        # Already cached again under the new layout; that copy is newer.
+                        os.remove(entry.path)
+                        os.remove(flat_meta)
+                        counts["duplicates"] += 1
+                        continue
+                except (OSError, ValueError, KeyError):
+                    pass
+
+            size = os.path.getsize(entry.path)
+            meta.update({"hash": file_sha256(entry.path), "size": meta.get("size", size), "storedSize": size})
+            target_blob = blob_path(cache_dir, meta["hash"])
+
+            # Record first, then the body, then the old sidecar: a run cut short
+            # at any step leaves either a complete flat entry or a complete new one.
+            os.makedirs(os.path.dirname(target_meta), exist_ok=True)
+            os.makedirs(os.path.dirname(target_blob), exist_ok=True)
+            write_json_atomic(target_meta, meta)
+            if os.path.exists(target_blob):
+                os.remove(entry.path)
+            else:
+                os.replace(entry.path, target_blob)
+            os.remove(flat_meta)
+            counts["migrated"] += 1
+
+    # Sidecars whose body was moved just before an interruption.
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(".meta") and not os.path.exists(entry.path[:-5]):
+                os.remove(entry.path)
+
+    return counts
+
+def default_remote_url(cache_dir: str) -> Optional[str]:
+    """`remoteUrl` from the project's settings.json, if one sits next to the cache."""
+    settings_file = os.path.join(os.path.dirname(os.path.abspath(cache_dir)), "settings.json")
+    try:
+        with open(settings_file, "r", encoding="utf-8") as f:
+            return json.load(f)["remoteUrl"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def default_origin(cache_dir: str) -> Optional[str]:
+    """Origin of `remoteUrl` from the project's settings.json, if one sits next to the cache."""
+    remote_url = default_remote_url(cache_dir)
+    return url_origin(remote_url) if remote_url else None
+
+def migrate_command(args):
+    if not os.path.isdir(args.cache_dir):
+        console.print(f"[red]Error: '{args.cache_dir}' is not a directory.[/red]")
+        sys.exit(1)
+
+    origin = url_origin(args.origin) if args.origin else default_origin(args.cache_dir)
+    if origin:
+        console.print(f"Timestamp-only entries will be attributed to [cyan]{origin}[/cyan].")
+    else:
+        console.print("[yellow]No --origin given; timestamp-only entries will be left in place.[/yellow]")
+
+    console.print(f"[bold cyan]Migrating '{args.cache_dir}' to the sharded layout...[/bold cyan]")
+    counts = migrate_flat_cache(args.cache_dir, origin)
+    console.print(
+        f"[green]Done.[/green] {counts['migrated']} migrated, {counts['duplicates']} duplicates removed, "
+        f"{counts['dropped']} incomplete dropped, {counts['skipped']} skipped."
+    )
+
+##################################
+# Packed store (mirrors core/pack.js)
+##################################
+
+def load_pack_index(pack_dir: str) -> dict:
+    try:
+        with open(os.path.join(pack_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return {"version": PACK_VERSION, "segments": [], "entries": {}}
+    if index.get("version") != PACK_VERSION:
+        raise ValueError(f"Unsupported pack version {index.get('version')} in '{pack_dir}'")
+    return index
+
+def pack_cache(cache_dir: str, pack_dir: str, move: bool = False) -> dict:
+    """
+    Appends every loose entry of `cache_dir` to the segments in `pack_dir`.
+    Segments are only ever appended to, and the index is replaced atomically at
+    the end, so an interrupted run leaves the previous pack intact. A body the
+    pack already holds (under any URL) is not stored again; with `move`, packed
+    loose entries are deleted afterwards.
+    """
+    os.makedirs(pack_dir, exist_ok=True)
+    index = load_pack_index(pack_dir)
+    segments, entries = index["segments"], index["entries"]
+    by_hash = {record["hash"]: record for record in entries.values() if record.get("hash")}
+    counts = {"packed": 0, "shared": 0, "bytes": 0}
+    packed_paths = []
+    touched = set()
+
+    segment_file = None
+    try:
+        for key, meta, data_path in iter_cache_entries(cache_dir):
+            packed_paths.append((meta_path(cache_dir, key), data_path))
+            record = {k: v for k, v in meta.items() if k != "storedSize"}
+
+            stored = by_hash.get(meta["hash"])
+            if stored:
+                # Same body already in a segment: point at it.
+                record.update({k: stored[k] for k in ("segment", "offset", "length", "encoding", "size")})
+                entries[key] = record
+                counts["shared"] += 1
+                continue
+
+            length = os.path.getsize(data_path)
+            if not segments or segments[-1]["size"] + length > SEGMENT_MAX_BYTES and segments[-1]["size"] > 0:
+                if segment_file:
+                    segment_file.close()
+                    segment_file = None
+                segments.append({"name": f"{len(segments):05d}.seg", "size": 0, "sha256": None})
+            segment = segments[-1]
+            if segment_file is None:
+                segment_file = open(os.path.join(pack_dir, segment["name"]), "ab")
+                # Drop bytes a previous, interrupted run appended after the last indexed entry.
+                segment_file.truncate(segment["size"])
+                segment_file.seek(segment["size"])
+
+            offset = segment["size"]
+            with open(data_path, "rb") as src:
+                shutil.copyfileobj(src, segment_file, COPY_CHUNK)
+            segment["size"] += length
+            touched.add(len(segments) - 1)
+
+            record.update({"segment": len(segments) - 1, "offset": offset, "length": length})
+            entries[key] = record
+            by_hash[meta["hash"]] = record
+            counts["packed"] += 1
+            counts["bytes"] += length
+    finally:
+        if segment_file:
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+            segment_file.close()
+
+    # Per-segment checksums let a shipped pack be verified after copying.
+    for number in touched:
+        segments[number]["sha256"] = file_sha256(os.path.join(pack_dir, segments[number]["name"]))
+    write_json_atomic(os.path.join(pack_dir, INDEX_FILE), index)
+
+    if move:
+        for record_path, data_path in packed_paths:
+            for path in (record_path, data_path):
+                # Blobs shared by several records are listed more than once.
+                if os.path.exists(path):
+                    os.remove(path)
+        invalidate_index(cache_dir)
+    return counts
+
+def unpack_cache(pack_dir: str, cache_dir: str) -> dict:
+    """
+    Writes every packed entry back out as a loose entry in `cache_dir`, reading
+    the segments through mmap. Bodies shared by several entries are written
+    once, and entries already present with the same body are skipped, so an
+    interrupted run can simply be repeated.
+    """
+    index = load_pack_index(pack_dir)
+    counts = {"unpacked": 0, "unchanged": 0, "bytes": 0}
+    maps = {}
+    try:
+        for key, record in index["entries"].items():
+            target_meta = meta_path(cache_dir, key)
+            target_blob = blob_path(cache_dir, record["hash"])
+            meta = {k: v for k, v in record.items() if k not in ("segment", "offset", "length")}
+            meta["storedSize"] = record["length"]
+            try:
+                with open(target_meta, "r", encoding="utf-8") as f:
+                    if json.load(f).get("hash") == record["hash"] and os.path.exists(target_blob):
+                        counts["unchanged"] += 1
+                        continue
+            except (OSError, ValueError):
+                pass
+
+            if not os.path.exists(target_blob):
+                number = record["segment"]
+                if number not in maps:
+                    with open(os.path.join(pack_dir, index["segments"][number]["name"]), "rb") as f:
+                        maps[number] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                view = maps[number]
+
+                os.makedirs(os.path.dirname(target_blob), exist_ok=True)
+                tmp_path = f"{target_blob}.{os.getpid()}.part"
+                with open(tmp_path, "wb") as out:
+                    end = record["offset"] + record["length"]
+                    for start in range(record["offset"], end, COPY_CHUNK):
+                        out.write(view[start:min(start + COPY_CHUNK, end)])
+                os.replace(tmp_path, target_blob)
+                counts["bytes"] += record["length"]
+
+            os.makedirs(os.path.dirname(target_meta), exist_ok=True)
+            write_json_atomic(target_meta, meta)
+            counts["unpacked"] += 1
+    finally:
+        for view in maps.values():
+            view.close()
+
+    invalidate_index(cache_dir)
+    return counts
+
+def pack_command(args):
+    if not os.path.isdir(args.cache_dir):
+        console.print(f"[red]Error: '{args.cache_dir}' is not a directory.[/red]")
+        sys.exit(1)
+    pack_dir = args.pack_dir or os.path.join(args.cache_dir, PACK_DIR_NAME)
+    console.print(f"[bold cyan]Packing '{args.cache_dir}' → '{pack_dir}'...[/bold cyan]")
+    counts = pack_cache(args.cache_dir, pack_dir, move=args.move)
+    console.print(
+        f"[green]Done.[/green] {counts['packed']} bodies appended ({counts['bytes']} bytes), "
+        f"{counts['shared']} entries reuse bodies already in the pack."
+    )
+
+def unpack_command(args):
+    pack_dir = args.pack_dir or os.path.join(args.cache_dir, PACK_DIR_NAME)
+    if not os.path.exists(os.path.join(pack_dir, INDEX_FILE)):
+        console.print(f"[red]Error: no pack found in '{pack_dir}'.[/red]")
+        sys.exit(1)
+    console.print(f"[bold cyan]Unpacking '{pack_dir}' → '{args.cache_dir}'...[/bold cyan]")
+    counts = unpack_cache(pack_dir, args.cache_dir)
+    console.print(
+        f"[green]Done.[/green] {counts['unpacked']} entries unpacked ({counts['bytes']} bytes), "
+        f"{counts['unchanged']} already present."
+    )
+
+##################################
+# Pre-warming
+##################################
+
+PREWARM_JOBS = 8
+PREWARM_TIMEOUT = 60
+PREWARM_CRAWL_DEPTH = 2
+# Documents larger than this are stored but not searched for further assets.
+CRAWL_MAX_BYTES = 16 << 20
+
+# Response headers core/main.js doesn't replay (see UNCACHED_HEADERS there),
+# plus the range headers of a resumed download.
+UNCACHED_HEADERS = {
+    "connection", "content-encoding", "content-length", "date", "keep-alive",
+    "set-cookie", "transfer-encoding", "age", "content-range",
+}
+
+CRAWL_TYPES = re.compile(r"^(text/html|text/css|application/(javascript|x-javascript|json)|text/javascript)")
+ASSET_EXTENSIONS = r"(?:m?js|json|css|wasm|glb|gltf|vrm|ktx2|basis|hdr|exr|png|jpe?g|webp|avif|gif|svg|mp3|ogg|wav|m4a|mp4|webm|woff2?|ttf)"
+CRAWL_PATTERNS = (
+    re.compile(r"""(?:src|href)\s*=\s*["']([^"'#]+)"""),
+    re.compile(r"""url\(\s*["']?([^"')]+)"""),
+    re.compile(r"""["'`]((?:https?://|/|\./)[^"'`\s]*?\.""" + ASSET_EXTENSIONS + r"""(?:\?[^"'`\s]*)?)["'`]"""),
+)
+# Links to other origins are only followed when they point at an asset file.
+ASSET_PATH = re.compile(r"\." + ASSET_EXTENSIONS + "$", re.IGNORECASE)
+
+class PrewarmError(Exception):
+    pass
+
+def read_manifest(manifest_path: str, base_url: Optional[str]) -> list:
+    """
+    Reads an asset manifest: a JSON list of URLs or `{"url": ..., "sha256": ...}`
+    objects (optionally under an "assets" key), or a text file with one URL per
+    line. Relative URLs are resolved against `base_url`. Returns `(url, sha256)` pairs.
+    """
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        items = json.loads(text)
+        if isinstance(items, dict):
+            items = items.get("assets", [])
+    except ValueError:
+        items = [line.strip() for line in text.splitlines() if line.strip() and not line.startswith("#")]
+
+    assets = []
+    for item in items:
+        url, expected = (item, None) if isinstance(item, str) else (item.get("url"), item.get("sha256"))
+        if not url:
+            continue
+        if base_url:
+            url = urljoin(base_url, url)
+        if urlsplit(url).scheme not in DEFAULT_PORTS:
+            raise PrewarmError(f"Not an absolute http(s) URL: {url}")
+        assets.append((urldefrag(url)[0], expected))
+    return assets
+
+def crawl_links(url: str, body: bytes) -> set:
+    """Asset URLs referenced by an HTML, CSS, JS or JSON document."""
+    text = body.decode("utf-8", errors="replace")
+    links = set()
+    for pattern in CRAWL_PATTERNS:
+        for match in pattern.finditer(text):
+            link = urldefrag(urljoin(url, match.group(1).strip()))[0]
+            if urlsplit(link).scheme in DEFAULT_PORTS:
+                links.add(link)
+    return links
+
+def download_asset(url: str, part_path: str, user_agent: Optional[str]) -> dict:
+    """
+    Downloads `url` into `part_path`, resuming a previous partial download with
+    `Range` + `If-Range` when the server supports it. Returns the response
+    details needed for the cache record. Runs in a worker thread.
+    """
+    validator_path = f"{part_path[:-5]}.validator.part"
+    offset = 0
+    headers = {"User-Agent": user_agent} if user_agent else {}
+    if os.path.exists(part_path) and os.path.exists(validator_path):
+        with open(validator_path, "r", encoding="utf-8") as f:
+            validator = f.read().strip()
+        if validator and os.path.getsize(part_path):
+            offset = os.path.getsize(part_path)
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+
+    try:
+        response = urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=PREWARM_TIMEOUT)
+    except urllib.error.HTTPError as e:
+        raise PrewarmError(f"HTTP {e.code}") from None
+    except (urllib.error.URLError, OSError) as e:
+        raise PrewarmError(str(getattr(e, "reason", e))) from None
+
+    with response:
+        status = response.status
+        content_range = response.headers.get("Content-Range", "")
+        if status == 206 and not content_range.startswith(f"bytes {offset}-"):
+            raise PrewarmError(f"unexpected Content-Range '{content_range}'")
+        if status != 206:
+            offset = 0
+        total = response.headers.get("Content-Length")
+        total = offset + int(total) if total and total.isdigit() else None
+
+        # Strong validators let an interrupted download continue where it stopped.
+        etag = response.headers.get("ETag")
+        validator = etag if etag and not etag.startswith("W/") else response.headers.get("Last-Modified")
+        with open(validator_path, "w", encoding="utf-8") as f:
+            f.write(validator or "")
+
+        try:
+            with open(part_path, "ab" if offset else "wb") as out:
+                shutil.copyfileobj(response, out, COPY_CHUNK)
+        except (OSError, http.client.HTTPException) as e:
+            # The partial body stays on disk for the next run to resume.
+            raise PrewarmError(f"download interrupted: {e}") from None
+
+        size = os.path.getsize(part_path)
+        if total is not None and size != total:
+            raise PrewarmError(f"incomplete body ({size} of {total} bytes)")
+
+        headers = {name.lower(): value for name, value in response.headers.items()
+                   if name.lower() not in UNCACHED_HEADERS}
+
+    os.remove(validator_path)
+    return {
+        "resumed": bool(offset),
+        "size": size,
+        "etag": etag,
+        "lastModified": response.headers.get("Last-Modified"),
+        "contentType": response.headers.get("Content-Type"),
+        "headers": headers,
+    }
+
+class CacheWarmer:
+    """
+    Downloads assets into a cache directory in the layout core/cache.js reads:
+    a `.meta` record per URL and one content-addressed blob per distinct body.
+    Downloads run in worker threads, at most `jobs` at a time; records are
+    written from the event loop, so blob bookkeeping needs no locking.
+    """
+
+    def __init__(self, cache_dir: str, jobs: int = PREWARM_JOBS, crawl_depth: int = 0,
+                 refresh: bool = False, user_agent: Optional[str] = None, progress=None):
+        self.cache_dir = cache_dir
+        self.jobs = max(1, jobs)
+        self.crawl_depth = crawl_depth
+        self.refresh = refresh
+        self.user_agent = user_agent
+        self.progress = progress
+        self.task_id = None
+        self.seen = set()
+        self.counts = {"downloaded": 0, "resumed": 0, "skipped": 0, "failed": 0, "bytes": 0}
+        self.failures = []
+        # hash -> (storedSize, encoding) of every blob already in the cache, so a
+        # body the app stored compressed is shared rather than overwritten.
+        self.blobs = {meta["hash"]: (os.path.getsize(path), meta.get("encoding"))
+                      for _, meta, path in iter_cache_entries(cache_dir)} if os.path.isdir(cache_dir) else {}
+        # Entries already moved into the packed store count as cached too.
+        self.pack_dir = os.path.join(cache_dir, PACK_DIR_NAME)
+        self.pack_index = load_pack_index(self.pack_dir)
+
+    async def run(self, assets: list, crawl_origins: set) -> dict:
+        self.crawl_origins = crawl_origins
+        self.semaphore = asyncio.Semaphore(self.jobs)
+        if self.progress:
+            self.task_id = self.progress.add_task("Pre-warming", total=0)
+        await asyncio.gather(*(self.fetch(url, expected, self.crawl_depth) for url, expected in assets))
+        invalidate_index(self.cache_dir)
+        return self.counts
+
+    def existing(self, key: str, expected: Optional[str]) -> Optional[dict]:
+        try:
+            with open(meta_path(self.cache_dir, key), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = self.pack_index["entries"].get(key)
+            if not meta:
+                return None
+        if "segment" not in meta and (not meta.get("hash") or not os.path.exists(blob_path(self.cache_dir, meta["hash"]))):
+            return None
+        if expected and meta["hash"] != expected.lower():
+            return None
+        return meta
+
+    async def fetch(self, url: str, expected: Optional[str], depth: int):
+        if url in self.seen:
+            return
+        self.seen.add(url)
+        if self.progress:
+            self.progress.update(self.task_id, total=len(self.seen))
+
+        key = cache_key(url)
+        links = set()
+        try:
+            meta = None if self.refresh else self.existing(key, expected)
+            if meta:
+                self.counts["skipped"] += 1
+                if depth and self.crawlable(url, meta.get("contentType"), meta["size"]):
+                    links = crawl_links(url, await asyncio.to_thread(self.read_body, meta))
+            else:
+                async with self.semaphore:
+                    links = await self.download(url, key, expected, depth)
+        except PrewarmError as e:
+            self.counts["failed"] += 1
+            self.failures.append((url, str(e)))
+        finally:
+            if self.progress:
+                self.progress.advance(self.task_id)
+
+        links = [link for link in links
+                 if url_origin(link) in self.crawl_origins or ASSET_PATH.search(urlsplit(link).path)]
+        await asyncio.gather(*(self.fetch(link, None, depth - 1) for link in links))
+
+    def crawlable(self, url: str, content_type: Optional[str], size: int) -> bool:
+        return (url_origin(url) in self.crawl_origins and size <= CRAWL_MAX_BYTES
+                and bool(CRAWL_TYPES.match((content_type or "").lower())))
+
+    def read_body(self, meta: dict) -> bytes:
+        if meta.get("encoding"):
+            return b""  # Compressed by the app; not worth decoding just to crawl.
+        if "segment" in meta:
+            segment = self.pack_index["segments"][meta["segment"]]
+            with open(os.path.join(self.pack_dir, segment["name"]), "rb") as f:
+                f.seek(meta["offset"])
+                return f.read(meta["length"])
+        with open(blob_path(self.cache_dir, meta["hash"]), "rb") as f:
+            return f.read()
+
+    async def download(self, url: str, key: str, expected: Optional[str], depth: int) -> set:
+        blob_root = os.path.join(self.cache_dir, BLOB_DIR)
+        os.makedirs(blob_root, exist_ok=True)
+        # A stable name, so a re-run picks up where an interrupted one stopped.
+        part_path = os.path.join(blob_root, f"{key}.prewarm.part")
+
+        response = await asyncio.to_thread(download_asset, url, part_path, self.user_agent)
+        digest = await asyncio.to_thread(file_sha256, part_path)
+        if expected and digest != expected.lower():
+            os.remove(part_path)
+            raise PrewarmError(f"checksum mismatch (got {digest})")
+
+        links = set()
+        if depth and self.crawlable(url, response["contentType"], response["size"]):
+            with open(part_path, "rb") as f:
+                links = crawl_links(url, f.read())
+
+        stored = self.blobs.get(digest)
+        if stored:
+            os.remove(part_path)
+        else:
+            target = blob_path(self.cache_dir, digest)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(part_path, target)
+            stored = self.blobs[digest] = (response["size"], None)
+            self.counts["bytes"] += response["size"]
+
+        meta = {
+            "url": url,
+            "cachedAt": int(time.time() * 1000),
+            "etag": response["etag"],
+            "lastModified": response["lastModified"],
+            "contentType": response["contentType"],
+            "headers": response["headers"],
+            "size": response["size"],
+            "hash": digest,
+            "storedSize": stored[0],
+            "encoding": stored[1],
+        }
+        target_meta = meta_path(self.cache_dir, key)
+        os.makedirs(os.path.dirname(target_meta), exist_ok=True)
+        write_json_atomic(target_meta, meta)
+        self.counts["downloaded"] += 1
+        self.counts["resumed"] += response["resumed"]
+        return links
+
+def prewarm_cache(cache_dir: str, remote_url: Optional[str] = None, manifest: Optional[str] = None,
+                  jobs: int = PREWARM_JOBS, crawl_depth: Optional[int] = None, refresh: bool = False,
+                  user_agent: Optional[str] = None, progress=None) -> CacheWarmer:
+    """
+    Downloads the assets listed in `manifest`, or the `remote_url` page and the
+    assets it references (followed `crawl_depth` levels deep on its origin),
+    into `cache_dir`. Entries already cached are skipped, partial downloads are
+    resumed and bodies are verified against the manifest's sha256 if given.
+    """
+    if manifest:
+        assets = read_manifest(manifest, remote_url)
+        depth = crawl_depth or 0
+    elif remote_url:
+        assets = [(urldefrag(remote_url)[0], None)]
+        depth = PREWARM_CRAWL_DEPTH if crawl_depth is None else crawl_depth
+    else:
+        raise PrewarmError("Nothing to download: give a remote URL or a manifest.")
+
+    origins = {url_origin(remote_url)} if remote_url else {url_origin(url) for url, _ in assets}
+    warmer = CacheWarmer(cache_dir, jobs=jobs, crawl_depth=depth, refresh=refresh,
+                         user_agent=user_agent, progress=progress)
+    asyncio.run(warmer.run(assets, origins))
+    return warmer
+
+def prewarm_command(args):
+    remote_url = args.remote_url or (None if args.manifest else default_remote_url(args.cache_dir))
+    console.print(f"[bold cyan]Pre-warming '{args.cache_dir}' from {args.manifest or remote_url}...[/bold cyan]")
+    try:
+        with Progress(TextColumn("[progress.description]{task.description}"), BarColumn(),
+                      MofNCompleteColumn(), console=console, transient=True) as progress:
+            warmer = prewarm_cache(
+                args.cache_dir, remote_url=remote_url, manifest=args.manifest, jobs=args.jobs,
+                crawl_depth=args.depth, refresh=args.refresh, user_agent=args.user_agent, progress=progress,
+            )
+    except (PrewarmError, OSError, ValueError) as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+
+    counts = warmer.counts
+    for url, reason in warmer.failures:
+        console.print(f"[red]Failed:[/red] {url} ({reason})")
+    console.print(
+        f"[green]Done.[/green] {counts['downloaded']} downloaded ({counts['resumed']} resumed, "
+        f"{counts['bytes']} bytes), {counts['skipped']} already cached, {counts['failed']} failed."
+    )
+    if args.pack:
+        pack_command(argparse.Namespace(cache_dir=args.cache_dir, pack_dir=None, move=True))
+    if counts["failed"]:
+        sys.exit(1)
+
+##################################
+# Seed caches for builds
+##################################
+
+SEED_DIR_NAME = "cache-seed"
+# electron-builder copies the seed's packed store to resources/cache-seed,
+# where core/main.js looks for it.
+SEED_RESOURCE = {"from": f"{SEED_DIR_NAME}/{PACK_DIR_NAME}", "to": SEED_DIR_NAME, "filter": ["**/*"]}
+# ...and only there: electron-builder's default `files` would put it in app.asar too.
+SEED_FILES_EXCLUDE = f"!{SEED_DIR_NAME}/**"
+# Build logs (build_matrix.LOG_DIR) are never part of the app.
+LOGS_FILES_EXCLUDE = "!build-logs/**"
+
+def set_seed_resource(project_folder: str, enabled: bool):
+    """
+    Adds or removes the seed cache in the project's `build.extraResources`,
+    keeping it out of `build.files` while it is bundled. Build logs are always
+    kept out of `build.files`.
+    """
+    package_json = os.path.join(project_folder, "package.json")
+    with open(package_json, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    build = data.setdefault("build", {})
+    resources = build.get("extraResources", [])
+    if isinstance(resources, (dict, str)):
+        resources = [resources]
+    resources = [r for r in resources if not (isinstance(r, dict) and r.get("to") == SEED_DIR_NAME)]
+    if enabled:
+        resources.append(SEED_RESOURCE)
+    build["extraResources"] = resources
+
+    # Exclusions only: electron-builder still starts from its default "**/*".
+    files = build.get("files", [])
+    if isinstance(files, (dict, str)):
+        files = [files]
+    files = [pattern for pattern in files if pattern != SEED_FILES_EXCLUDE]
+    if LOGS_FILES_EXCLUDE not in files:
+        files.append(LOGS_FILES_EXCLUDE)
+    if enabled:
+        files.append(SEED_FILES_EXCLUDE)
+    build["files"] = files
+    with open(package_json, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+
+def seed_command(args):
+    """Pre-warms `<project>/cache-seed`, packs it and bundles it with the next build."""
+    if not os.path.exists(os.path.join(args.project_folder, "package.json")):
+        console.print(f"[red]Error: '{args.project_folder}' is not an Electron project folder.[/red]")
+        sys.exit(1)
+    seed_dir = os.path.join(args.project_folder, SEED_DIR_NAME)
+    try:
+        prewarm_command(argparse.Namespace(
+            cache_dir=seed_dir, remote_url=args.remote_url or default_remote_url(seed_dir),
+            manifest=args.manifest, jobs=args.jobs, depth=args.depth, refresh=args.refresh,
+            user_agent=args.user_agent, pack=True,
+        ))
+    finally:
+        # A partially warmed seed is still worth shipping.
+        if os.path.exists(os.path.join(seed_dir, PACK_DIR_NAME, INDEX_FILE)):
+            set_seed_resource(args.project_folder, True)
+            console.print(f"[green]The seed cache will be bundled with the next build of '{args.project_folder}'.[/green]")
+
+##################################
+# Entry point
+##################################
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintenance tools for the Hyperfy client asset cache.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="Convert a flat cache directory to the sharded layout in place")
+    migrate.add_argument("cache_dir", help="Cache directory (e.g. <project>/cache or <userData>/cache)")
+    migrate.add_argument("--origin", help="Origin for entries that don't record their URL (default: remoteUrl from settings.json)")
+    migrate.set_defaults(func=migrate_command)
+
+    pack = commands.add_parser("pack", help="Append loose cache entries to a packed store")
+    pack.add_argument("cache_dir", help="Cache directory to pack")
+    pack.add_argument("--pack-dir", help="Packed store directory (default: <cache_dir>/pack)")
+    pack.add_argument("--move", action="store_true", help="Delete loose entries once they are packed")
+    pack.set_defaults(func=pack_command)
+
+    unpack = commands.add_parser("unpack", help="Expand a packed store into loose cache entries")
+    unpack.add_argument("cache_dir", help="Cache directory to write into")
+    unpack.add_argument("--pack-dir", help="Packed store directory (default: <cache_dir>/pack)")
+    unpack.set_defaults(func=unpack_command)
+
+    prewarm = commands.add_parser("prewarm", help="Download a world's assets into a cache before first launch")
+    prewarm.add_argument("cache_dir", help="Cache directory to fill (created if missing)")
+    prewarm.add_argument("--remote-url", help="Page to crawl for assets (default: remoteUrl from settings.json)")
+    prewarm.add_argument("--manifest", help="JSON or text list of asset URLs to download instead of crawling")
+    prewarm.add_argument("--jobs", "-j", type=int, default=PREWARM_JOBS, help=f"Parallel downloads (default: {PREWARM_JOBS})")
+    prewarm.add_argument("--depth", type=int, help=f"How many levels of references to follow (default: {PREWARM_CRAWL_DEPTH} when crawling, 0 with --manifest)")
+    prewarm.add_argument("--refresh", action="store_true", help="Download entries that are already cached again")
+    prewarm.add_argument("--user-agent", help="User-Agent header (use the app's customUserAgent if the server checks it)")
+    prewarm.add_argument("--pack", action="store_true", help="Move the result into the packed store afterwards")
+    prewarm.set_defaults(func=prewarm_command)
+
+    seed = commands.add_parser("seed", help="Pre-warm a cache and bundle it with a project's builds")
+    seed.add_argument("project_folder", help="Electron project folder (with package.json and settings.json)")
+    seed.add_argument("--remote-url", help="Page to crawl for assets (default: remoteUrl from settings.json)")
+    seed.add_argument("--manifest", help="JSON or text list of asset URLs to download instead of crawling")
+    seed.add_argument("--jobs", "-j", type=int, default=PREWARM_JOBS, help=f"Parallel downloads (default: {PREWARM_JOBS})")
+    seed.add_argument("--depth", type=int, help="How many levels of references to follow")
+    seed.add_argument("--refresh", action="store_true", help="Download entries that are already in the seed again")
+    seed.add_argument("--user-agent", help="User-Agent header")
+    seed.set_defaults(func=seed_command)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import os
+import sys
+import stat
+import errno
+import shutil
+import threading
+import ctypes
+import ctypes.util
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+# Build output and logs, installed packages and caches are never part of a clone.
+# ("build-logs" is build_matrix.LOG_DIR, which can't be imported here.)
+DEFAULT_EXCLUDES = frozenset({"node_modules", "cache", "cache-seed", "dist", "build-logs", ".git"})
+
+METHODS = ("auto", "reflink", "hardlink", "link", "copy")
+# Fast paths tried, in order, before falling back to a copy.
+FAST_PATHS = {"auto": ("reflink",), "reflink": ("reflink",), "hardlink": ("hardlink",),
+              "link": ("reflink", "hardlink"), "copy": ()}
+COPY_JOBS = min(32, (os.cpu_count() or 1) * 4)
+
+# Errors that mean "this filesystem can't do that", as opposed to real I/O errors.
+UNSUPPORTED = {errno.EXDEV, errno.EINVAL, errno.EPERM, errno.ENOTTY, errno.EOPNOTSUPP,
+               getattr(errno, "ENOTSUP", errno.EOPNOTSUPP), errno.EMLINK}
+
+FICLONE = 0x40049409  # Linux ioctl: share the source's extents with the destination
+
+##################################
+# File copy methods
+##################################
+
+def _load_clonefile():
+    """macOS clonefile(2), or None elsewhere."""
+    if sys.platform != "darwin":
+        return None
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    clonefile = libc.clonefile
+    clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+    return clonefile
+
+_clonefile = _load_clonefile()
+
+def reflink_file(src: str, dst: str):
+    """Copy-on-write clone of `src` (APFS, Btrfs, XFS). Raises OSError if unsupported."""
+    if _clonefile:
+        if _clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), dst)
+    elif sys.platform.startswith("linux"):
+        import fcntl
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except OSError:
+                fdst.close()
+                os.remove(dst)
+                raise
+    else:
+        raise OSError(errno.EOPNOTSUPP, "reflinks are not supported on this platform", dst)
+    shutil.copystat(src, dst)
+
+def hardlink_file(src: str, dst: str):
+    os.link(src, dst)
+
+def copy_file(src: str, dst: str):
+    shutil.copy2(src, dst)
+
+##################################
+# Tree sync
+##################################
+
+class CloneEngine:
+    """
+    Mirrors a source tree into a destination, skipping `excludes` (directory or
+    file names, at any depth). Files are reflinked when the filesystem supports
+    it, hard-linked if asked to ("hardlink", or "link" to try a reflink
+    first), and otherwise copied on a thread pool.
+
+    Syncing into an existing destination only touches files whose size or
+    modification time differ, and removes files the source no longer has.
+    Excluded names are left alone on both sides, so a project keeps its
+    node_modules, cache and build output.
+
+    Hard links share data with the source: editing a linked file in place
+    changes it in both trees. That's why "auto" only uses reflinks, which are
+    copy-on-write, and falls back to plain copies.
+    """
+
+    def __init__(self, excludes=DEFAULT_EXCLUDES, method: str = "auto", jobs: int = COPY_JOBS):
+        if method not in METHODS:
+            raise ValueError(f"Unknown clone method '{method}' (expected one of {', '.join(METHODS)})")
+        self.excludes = frozenset(excludes)
+        self.method = method
+        self.jobs = max(1, jobs)
+        self.counts = {"reflinked": 0, "hardlinked": 0, "copied": 0, "unchanged": 0, "removed": 0}
+        self.lock = threading.Lock()
+        # Narrowed down by the first file: which fast paths does the destination filesystem support?
+        self.fast_paths = [{"reflink": reflink_file, "hardlink": hardlink_file}[name] for name in FAST_PATHS[method]]
+
+    def scan(self, root: str):
+        """
+        Returns `(dirs, files)` relative to `root`, skipping excluded names.
+        Symlinks, including links to directories, are files: they are
+        recreated as links, never followed.
+        """
+        dirs, files = [], {}
+        for current, subdirs, names in os.walk(root):
+            rel = os.path.relpath(current, root)
+            linked = [d for d in subdirs if os.path.islink(os.path.join(current, d))]
+            subdirs[:] = sorted(d for d in subdirs if d not in self.excludes and d not in linked)
+            for d in subdirs:
+                dirs.append(os.path.normpath(os.path.join(rel, d)))
+            for name in names + linked:
+                if name not in self.excludes:
+                    path = os.path.join(current, name)
+                    files[os.path.normpath(os.path.join(rel, name))] = os.lstat(path)
+        return dirs, files
+
+    def unchanged(self, src_stat, dst_stat) -> bool:
+        # Copies keep the source's mtime (and links share it), so equal size + mtime means "already synced".
+        return (stat.S_IFMT(src_stat.st_mode) == stat.S_IFMT(dst_stat.st_mode)
+                and src_stat.st_size == dst_stat.st_size
+                and src_stat.st_mtime_ns == dst_stat.st_mtime_ns)
+
+    def count(self, name: str):
+        with self.lock:
+            self.counts[name] += 1
+
+    def place(self, src: str, dst: str, src_stat):
+        if os.path.isdir(dst) and not os.path.islink(dst):
+            shutil.rmtree(dst)
+        elif os.path.lexists(dst):
+            os.remove(dst)
+        if stat.S_ISLNK(src_stat.st_mode):
+            os.symlink(os.readlink(src), dst)
+            self.count("copied")
+            return
+
+        for fast_path in list(self.fast_paths):
+            try:
+                fast_path(src, dst)
+                self.count("reflinked" if fast_path is reflink_file else "hardlinked")
+                return
+            except OSError as e:
+                if e.errno not in UNSUPPORTED:
+                    raise
+                if os.path.lexists(dst):
+                    os.remove(dst)
+                # Not on this filesystem; don't try it for the remaining files.
+                with self.lock:
+                    if fast_path in self.fast_paths:
+                        self.fast_paths.remove(fast_path)
+        copy_file(src, dst)
+        self.count("copied")
+
+    def sync(self, source: str, dest: str) -> dict:
+        src_dirs, src_files = self.scan(source)
+        dst_dirs, dst_files = self.scan(dest) if os.path.isdir(dest) else ([], {})
+
+        # Remove what the source no longer has (deepest paths first).
+        for rel in set(dst_files) - set(src_files):
+            os.remove(os.path.join(dest, rel))
+            self.counts["removed"] += 1
+        for rel in sorted(set(dst_dirs) - set(src_dirs), key=len, reverse=True):
+            path = os.path.join(dest, rel)
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+
+        os.makedirs(dest, exist_ok=True)
+        for rel in src_dirs:
+            path = os.path.join(dest, rel)
+            if os.path.lexists(path) and not os.path.isdir(path):
+                os.remove(path)
+            os.makedirs(path, exist_ok=True)
+
+        pending = []
+        for rel, src_stat in src_files.items():
+            dst_stat = dst_files.get(rel)
+            if stat.S_ISLNK(src_stat.st_mode) and dst_stat and stat.S_ISLNK(dst_stat.st_mode):
+                same = os.readlink(os.path.join(source, rel)) == os.readlink(os.path.join(dest, rel))
+            else:
+                same = dst_stat is not None and self.unchanged(src_stat, dst_stat)
+            if same:
+                self.counts["unchanged"] += 1
+            else:
+                pending.append((os.path.join(source, rel), os.path.join(dest, rel), src_stat))
+
+        # Probe the fast path on one file before fanning out.
+        if pending and self.fast_paths:
+            self.place(*pending.pop())
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            for future in [pool.submit(self.place, *item) for item in pending]:
+                future.result()
+        return self.counts
+
+def clone_tree(source: str, dest: str, excludes=DEFAULT_EXCLUDES, method: str = "auto",
+               jobs: Optional[int] = None) -> dict:
+    """Syncs `source` into `dest` with a CloneEngine and returns its counts."""
+    return CloneEngine(excludes, method, jobs or COPY_JOBS).sync(source, dest)
@@ -0,0 +1,525 @@
+const crypto = require('crypto');
+const fs = require('fs');
+const path = require('path');
+const { Readable, Transform } = require('stream');
+const { pipeline } = require('stream/promises');
+const zlib = require('zlib');
+
+// Top-level files besides the entries; cache_tool.py uses the same names.
+const INDEX_FILE = 'index.json';
+const INDEX_VERSION = 4;
+// Written by the app's metrics (see metrics.js) for tools to read while it runs.
+const STATS_FILE = 'stats.json';
+// Which assets each world requested (see prefetch.js); not a cache entry.
+const ACCESS_LOG_FILE = 'access-log.json';
+const BLOB_DIR = 'blobs';
+
+// Shard directories are the first two byte pairs of the hex key: ab/cd/abcd...
+const SHARD_NAME = /^[0-9a-f]{2}$/;
+
+// Number of .meta files read concurrently when rebuilding the index from disk.
+const SCAN_BATCH = 64;
+
+// Eviction trims the cache to this fraction of the quota, so a cache sitting at
+// its limit is not swept again after every new download.
+const EVICT_TARGET = 0.9;
+// How long writes must be quiet before an over-quota cache is swept.
+const SWEEP_IDLE_MS = 5000;
+
+// Content types worth compressing on disk. Everything else (GLB, KTX2, PNG,
+// audio, video, archives) is already compressed and is stored as received.
+const COMPRESSIBLE_TYPE = /^(text\/|image\/svg\+xml|model\/gltf\+json|application\/(javascript|x-javascript|ecmascript|json|[\w.+-]+\+json|xml|[\w.+-]+\+xml|wasm|x-glsl|x-sh))/;
+
+const COMPRESSORS = {
+    br: () => zlib.createBrotliCompress({ params: { [zlib.constants.BROTLI_PARAM_QUALITY]: 5 } }),
+    gzip: () => zlib.createGzip(),
+};
+const DECOMPRESSORS = {
+    br: () => zlib.createBrotliDecompress(),
+    gzip: () => zlib.createGunzip(),
+};
+
+// `content-type` without parameters, used to group entries in stats.
+function mediaType(contentType) {
+    return (contentType || 'unknown').split(';')[0].trim().toLowerCase();
+}
+
+// On-disk asset cache. Every URL has a JSON `.meta` record; an in-memory index
+// of the records answers lookups without touching the disk.
+//
+// Records are keyed by the SHA-256 of origin + path + query and stored under
+// two levels of fan-out directories (`ab/cd/abcd....meta`), which keeps
+// directories small and file names short regardless of the URL. Caches from
+// older builds used flat, URL-encoded names; `cache_tool.py migrate` converts
+// them in place.
+//
+// Bodies are content-addressed: each record names the SHA-256 of its body, and
+// the body is stored once under `blobs/ab/cd/<hash>` however many URLs (cache
+// busting queries, CDN mirrors) serve it. Blobs are reference counted by the
+// index and deleted when their last record goes.
+//
+// The index is persisted to `index.json` on quit and removed again once it has
+// been loaded, so a crash (where the index may no longer match the files)
+// always falls back to a full directory scan on the next start.
+//
+// With a `maxBytes` quota, least recently used entries are evicted by a
+// background sweep: on a timer, and shortly after writes push the cache over
+// the quota. Lookups and writes never wait for it.
+//
+// With `compression` set to 'br' or 'gzip', compressible content types are
+// stored compressed and transparently decompressed when read. An entry's
+// `size` is always the original body size; `storedSize` is what its blob
+// occupies on disk. Each blob counts against the quota once.
+//
+// Read-only `packs` (see pack.js) are consulted, in order, for keys that are
+// not in the loose cache: the cache's own packed store and a seed bundled with
+// the app. Packed entries are never evicted; revalidating one copies its body
+// into the loose cache with the refreshed metadata.
+class AssetCache {
+    constructor(dir, { maxBytes = 0, compression = 'none', packs = [] } = {}) {
+        this.dir = dir;
+        this.statsPath = path.join(dir, STATS_FILE);
+        this.accessLogPath = path.join(dir, ACCESS_LOG_FILE);
+        this.packs = packs;
+        this.maxBytes = maxBytes;
+        this.compression = COMPRESSORS[compression] ? compression : null;
+        this.entries = new Map();
+        this.blobs = new Map();
+        this.blobDeletions = new Map();
+        this.totalBytes = 0;
+        this.evictions = { entries: 0, bytes: 0 };
+        this.ready = null;
+        // Set once the index is complete; until then there is nothing trustworthy to save.
+        this.loaded = false;
+        this.sweeping = null;
+        this.sweepTimer = null;
+    }
+
+    keyFor(requestUrl) {
+        return crypto.createHash('sha256')
+            .update(requestUrl.origin + requestUrl.pathname + requestUrl.search)
+            .digest('hex');
+    }
+
+    metaPath(key) {
+        return path.join(this.dir, key.slice(0, 2), key.slice(2, 4), `${key}.meta`);
+    }
+
+    blobPath(hash) {
+        return path.join(this.dir, BLOB_DIR, hash.slice(0, 2), hash.slice(2, 4), hash);
+    }
+
+    // Loads the index once; callers await the returned promise before lookups.
+    load() {
+        if (!this.ready) {
+            const loading = [this.loadIndex(), ...this.packs.map((pack) => pack.load())];
+            this.ready = Promise.all(loading).catch((err) => {
+                console.error('Error loading cache index:', err);
+            });
+        }
+        return this.ready;
+    }
+
+    async loadIndex() {
+        const started = Date.now();
+        await fs.promises.mkdir(this.dir, { recursive: true });
+
+        const indexPath = path.join(this.dir, INDEX_FILE);
+        let saved = null;
+        try {
+            saved = JSON.parse(await fs.promises.readFile(indexPath, 'utf-8'));
+            await fs.promises.rm(indexPath, { force: true });
+        } catch (err) {
+            saved = null;
+        }
+
+        if (saved && saved.version === INDEX_VERSION && Array.isArray(saved.entries)) {
+            this.entries = new Map();
+            this.blobs = new Map();
+            this.totalBytes = 0;
+            for (const [key, entry] of saved.entries) {
+                this.setEntry(key, entry);
+            }
+            console.log(`Cache index loaded: ${this.entries.size} entries in ${Date.now() - started}ms`);
+        } else {
+            await this.scan();
+            console.log(`Cache index rebuilt: ${this.entries.size} entries in ${Date.now() - started}ms`);
+        }
+        this.loaded = true;
+    }
+
+    // Lists the files two shard levels below `root` as [directory, name] pairs.
+    async listSharded(root) {
+        const files = [];
+        let tops;
+        try {
+            tops = await fs.promises.readdir(root, { withFileTypes: true });
+        } catch (err) {
+            return files;
+        }
+        for (const top of tops) {
+            if (!top.isDirectory() || !SHARD_NAME.test(top.name)) continue;
+            const topDir = path.join(root, top.name);
+            for (const sub of await fs.promises.readdir(topDir, { withFileTypes: true })) {
+                if (!sub.isDirectory() || !SHARD_NAME.test(sub.name)) continue;
+                const subDir = path.join(topDir, sub.name);
+                for (const name of await fs.promises.readdir(subDir)) {
+                    files.push([subDir, name]);
+                }
+            }
+        }
+        return files;
+    }
+
+    // Rebuilds the index from the .meta records, dropping records whose blob
+    // is missing, blobs nothing refers to, and leftover temporary files.
+    async scan() {
+        this.entries = new Map();
+        this.blobs = new Map();
+        this.totalBytes = 0;
+
+        const legacyFiles = (await fs.promises.readdir(this.dir, { withFileTypes: true }))
+            .filter((top) => top.isFile() && top.name !== INDEX_FILE
+                && !top.name.startsWith(STATS_FILE) && !top.name.startsWith(ACCESS_LOG_FILE)).length;
+        if (legacyFiles) {
+            console.warn(`Cache has ${legacyFiles} files in the old flat layout; run cache_tool.py migrate to keep them.`);
+        }
+
+        const keys = [];
+        for (const [dir, name] of await this.listSharded(this.dir)) {
+            if (name.endsWith('.meta')) {
+                keys.push(name.slice(0, -'.meta'.length));
+            } else if (name.endsWith('.part')) {
+                await fs.promises.rm(path.join(dir, name), { force: true });
+            }
+        }
+
+        for (let i = 0; i < keys.length; i += SCAN_BATCH) {
+            await Promise.all(keys.slice(i, i + SCAN_BATCH).map(async (key) => {
+                try {
+                    const meta = JSON.parse(await fs.promises.readFile(this.metaPath(key), 'utf-8'));
+                    if (typeof meta !== 'object' || !meta || !meta.headers || !meta.hash) return;
+                    const blobPath = this.blobPath(meta.hash);
+                    // Older builds kept the body next to its record; move it into the blob store.
+                    const legacyPath = this.metaPath(key).slice(0, -'.meta'.length);
+                    if (await fs.promises.access(legacyPath).then(() => true, () => false)) {
+                        await fs.promises.mkdir(path.dirname(blobPath), { recursive: true });
+                        await fs.promises.rename(legacyPath, blobPath);
+                    }
+                    const blobStat = await fs.promises.stat(blobPath);
+                    const size = meta.encoding ? meta.size : blobStat.size;
+                    this.setEntry(key, { ...meta, size, storedSize: blobStat.size, lastAccess: meta.cachedAt });
+                } catch (err) {
+                    // Blob missing or record unreadable: not a usable entry.
+                }
+            }));
+        }
+
+        const blobRoot = path.join(this.dir, BLOB_DIR);
+        const unfinished = await fs.promises.readdir(blobRoot).catch(() => []);
+        for (const [dir, name] of [...unfinished.map((name) => [blobRoot, name]), ...await this.listSharded(blobRoot)]) {
+            if (name.endsWith('.part') || (dir !== blobRoot && !this.blobs.has(name))) {
+                await fs.promises.rm(path.join(dir, name), { force: true });
+            }
+        }
+    }
+
+    // Writes the index so the next start can skip the directory scan. Quitting
+    // during the first scan writes nothing: a partial index would hide the
+    // entries it hadn't reached from lookups, the quota and eviction.
+    saveSync() {
+        if (!this.loaded) return;
+        try {
+            fs.mkdirSync(this.dir, { recursive: true });
+            const data = { version: INDEX_VERSION, entries: [...this.entries] };
+            fs.writeFileSync(path.join(this.dir, INDEX_FILE), JSON.stringify(data));
+        } catch (err) {
+            console.error('Error saving cache index:', err);
+        }
+    }
+
+    setEntry(key, entry) {
+        // Retain the new blob before releasing the old one, so replacing an
+        // entry with the same body never drops the blob.
+        this.retainBlob(entry);
+        this.deleteEntry(key);
+        this.entries.set(key, entry);
+    }
+
+    deleteEntry(key) {
+        const entry = this.entries.get(key);
+        if (entry) {
+            this.entries.delete(key);
+            this.releaseBlob(entry.hash);
+        }
+    }
+
+    retainBlob(entry) {
+        const blob = this.blobs.get(entry.hash);
+        if (blob) {
+            blob.refs += 1;
+            return;
+        }
+        this.blobs.set(entry.hash, { refs: 1, storedSize: entry.storedSize, encoding: entry.encoding || null });
+        this.totalBytes += entry.storedSize;
+    }
+
+    // Drops a reference to a blob, deleting its file once nothing refers to it.
+    // Writes of the same body wait for a pending deletion before reusing the path.
+    releaseBlob(hash) {
+        const blob = this.blobs.get(hash);
+        if (!blob) return;
+        blob.refs -= 1;
+        if (blob.refs > 0) return;
+
+        this.blobs.delete(hash);
+        this.totalBytes -= blob.storedSize;
+        const deletion = fs.promises.rm(this.blobPath(hash), { force: true })
+            .catch((err) => {
+                // Typically still open for serving on Windows; the next scan removes it.
+                console.error(`Cache blob removal error: ${hash}`, err);
+            })
+            .finally(() => {
+                if (this.blobDeletions.get(hash) === deletion) this.blobDeletions.delete(hash);
+            });
+        this.blobDeletions.set(hash, deletion);
+    }
+
+    get(key) {
+        return this.entries.get(key) || this.packedEntry(key)[1];
+    }
+
+    // The first pack holding `key`, and its entry: [pack, entry] or [null, null].
+    packedEntry(key) {
+        for (const pack of this.packs) {
+            const entry = pack.get(key);
+            if (entry) return [pack, entry];
+        }
+        return [null, null];
+    }
+
+    // Marks an entry as recently used for LRU eviction.
+    touch(key) {
+        const entry = this.entries.get(key);
+        if (entry) entry.lastAccess = Date.now();
+    }
+
+    // Opens an entry's (decompressed) body as a stream. Uncompressed entries
+    // can be limited to an inclusive byte range. Returns null (and forgets the
+    // entry) if the file is gone.
+    async openBody(key, start, end) {
+        const entry = this.entries.get(key);
+        if (!entry) {
+            const [pack, packed] = this.packedEntry(key);
+            if (!packed) return null;
+            return packed.encoding
+                ? this.decompress(key, packed, pack.createReadStream(packed))
+                : pack.createReadStream(packed, start, end);
+        }
+
+        let handle;
+        try {
+            handle = await fs.promises.open(this.blobPath(entry.hash), 'r');
+        } catch (err) {
+            this.deleteEntry(key);
+            return null;
+        }
+        return entry.encoding
+            ? this.decompress(key, entry, handle.createReadStream())
+            : handle.createReadStream({ start, end });
+    }
+
+    decompress(key, entry, stored) {
+        const decompressor = DECOMPRESSORS[entry.encoding]();
+        pipeline(stored, decompressor).catch((err) => {
+            console.error(`Cache read error: ${key}`, err);
+        });
+        return decompressor;
+    }
+
+    // Writes an entry's .meta record. Everything but the in-memory access time
+    // is persisted, so a directory scan recovers the full entry.
+    async writeMeta(key, entry) {
+        const { lastAccess, ...meta } = entry;
+        await fs.promises.writeFile(this.metaPath(key), JSON.stringify(meta));
+    }
+
+    // Streams a web ReadableStream into the cache, recording its size and
+    // SHA-256 in the entry and compressing it if its type allows. The body is
+    // written to a temporary file and then either renamed into place as a new
+    // blob or, if a blob with the same hash exists, discarded in favour of it.
+    // Readers never see a partial file, and an old entry stays usable until it
+    // is replaced.
+    async write(key, body, meta) {
+        const blobRoot = path.join(this.dir, BLOB_DIR);
+        const tmpPath = path.join(blobRoot, `${key}.${process.pid}.${Date.now()}.part`);
+        try {
+            await fs.promises.mkdir(blobRoot, { recursive: true });
+            await fs.promises.mkdir(path.dirname(this.metaPath(key)), { recursive: true });
+            const hash = crypto.createHash('sha256');
+            let size = 0;
+            const hasher = new Transform({
+                transform(chunk, encoding, callback) {
+                    hash.update(chunk);
+                    size += chunk.length;
+                    callback(null, chunk);
+                },
+            });
+            const encoding = this.compression && COMPRESSIBLE_TYPE.test(mediaType(meta.contentType))
+                ? this.compression
+                : null;
+            const fileStream = fs.createWriteStream(tmpPath);
+            const stages = encoding ? [hasher, COMPRESSORS[encoding](), fileStream] : [hasher, fileStream];
+            await pipeline(Readable.fromWeb(body), ...stages);
+
+            const digest = hash.digest('hex');
+            const entry = { ...meta, size, hash: digest, lastAccess: Date.now() };
+            const existing = this.blobs.get(digest);
+            if (existing) {
+                // Same body under another URL: share the stored blob.
+                Object.assign(entry, { storedSize: existing.storedSize, encoding: existing.encoding });
+                this.setEntry(key, entry);
+                await fs.promises.rm(tmpPath, { force: true });
+            } else {
+                await this.blobDeletions.get(digest);
+                const blobPath = this.blobPath(digest);
+                await fs.promises.mkdir(path.dirname(blobPath), { recursive: true });
+                await fs.promises.rename(tmpPath, blobPath);
+                Object.assign(entry, { storedSize: fileStream.bytesWritten, encoding });
+                this.setEntry(key, entry);
+            }
+            await this.writeMeta(key, entry);
+            if (this.maxBytes && this.totalBytes > this.maxBytes) {
+                this.scheduleSweep();
+            }
+            return entry;
+        } catch (err) {
+            fs.promises.rm(tmpPath, { force: true }).catch(() => {});
+            throw err;
+        }
+    }
+
+    // Marks an entry as fresh again after the server confirmed it is unchanged
+    // (HTTP 304), merging in any updated validators. The body is not touched,
+    // except that a packed entry is first copied into the loose cache.
+    async refresh(key, updates) {
+        const entry = this.entries.get(key);
+        if (!entry) {
+            const [, packed] = this.packedEntry(key);
+            if (!packed) return null;
+            const { segment, offset, length, packed: _, seeded, ...meta } = packed;
+            const body = Readable.toWeb(await this.openBody(key));
+            return this.write(key, body, { ...meta, ...updates, cachedAt: Date.now() });
+        }
+        const refreshed = { ...entry, ...updates, cachedAt: Date.now(), lastAccess: Date.now() };
+        await this.writeMeta(key, refreshed);
+        this.setEntry(key, refreshed);
+        return refreshed;
+    }
+
+    // Removes an entry's record; its blob goes with it if no other URL uses it.
+    async remove(key) {
+        await fs.promises.rm(this.metaPath(key), { force: true });
+        this.deleteEntry(key);
+    }
+
+    // Totals for the whole cache and per content type, including how much
+    // on-disk compression saves for each type and how much sharing blobs
+    // between URLs saves overall.
+    stats() {
+        const byType = {};
+        let bytes = 0;
+        let referencedBytes = 0;
+        for (const entry of this.entries.values()) {
+            referencedBytes += entry.storedSize;
+            const type = mediaType(entry.contentType || (entry.headers && entry.headers['content-type']));
+            const totals = byType[type] || (byType[type] = { entries: 0, bytes: 0, storedBytes: 0, savedBytes: 0 });
+            totals.entries += 1;
+            totals.bytes += entry.size;
+            totals.storedBytes += entry.storedSize;
+            totals.savedBytes += entry.size - entry.storedSize;
+            bytes += entry.size;
+        }
+        return {
+            entries: this.entries.size,
+            blobs: this.blobs.size,
+            bytes,
+            storedBytes: this.totalBytes,
+            savedBytes: bytes - this.totalBytes,
+            dedupSavedBytes: referencedBytes - this.totalBytes,
+            dedupRatio: this.totalBytes ? referencedBytes / this.totalBytes : 1,
+            maxBytes: this.maxBytes,
+            evictions: { ...this.evictions },
+            compression: this.compression || 'none',
+            byType,
+            packs: this.packs.map((pack) => ({
+                dir: pack.dir,
+                seeded: pack.seeded,
+                entries: pack.entries.size,
+                storedBytes: pack.totalBytes,
+            })),
+        };
+    }
+
+    clear() {
+        this.entries.clear();
+        this.blobs.clear();
+        this.totalBytes = 0;
+        // Packs inside the cache directory go with it; a bundled seed stays.
+        for (const pack of this.packs) {
+            const relative = path.relative(this.dir, pack.dir);
+            if (!relative.startsWith('..') && !path.isAbsolute(relative)) pack.clear();
+        }
+        fs.rmSync(this.dir, { recursive: true, force: true });
+    }
+
+    // Runs `evict` on a timer until the process exits.
+    startSweeper(intervalMs) {
+        setInterval(() => this.evict(), intervalMs).unref();
+    }
+
+    // Sweeps once writes have been quiet for a moment, i.e. when the app is idle.
+    scheduleSweep() {
+        clearTimeout(this.sweepTimer);
+        this.sweepTimer = setTimeout(() => this.evict(), SWEEP_IDLE_MS);
+        this.sweepTimer.unref();
+    }
+
+    // Removes least recently used entries (record and, once unreferenced, blob)
+    // until the cache is back under its quota. Resolves to the number of
+    // entries removed.
+    evict() {
+        if (!this.sweeping) {
+            this.sweeping = this.evictLru().finally(() => {
+                this.sweeping = null;
+            });
+        }
+        return this.sweeping;
+    }
+
+    async evictLru() {
+        if (!this.maxBytes || this.totalBytes <= this.maxBytes) return 0;
+
+        const target = this.maxBytes * EVICT_TARGET;
+        const oldestFirst = [...this.entries].sort((a, b) => a[1].lastAccess - b[1].lastAccess);
+        const before = this.totalBytes;
+        let removed = 0;
+        for (const [key, entry] of oldestFirst) {
+            if (this.totalBytes <= target) break;
+            // Skip entries that were replaced or used since the sweep started.
+            if (this.entries.get(key) !== entry) continue;
+            try {
+                await this.remove(key);
+                removed += 1;
+            } catch (err) {
+                console.error(`Cache eviction error: ${key}`, err);
+            }
+        }
+        this.evictions.entries += removed;
+        this.evictions.bytes += before - this.totalBytes;
+        console.log(`Cache sweep evicted ${removed} entries (${before - this.totalBytes} bytes), ${this.totalBytes} bytes in use`);
+        return removed;
+    }
+}
+
+module.exports = { AssetCache };
@@ -0,0 +1,81 @@
+// Scheduling for the downloads that fill the asset cache.
+//
+// Misses are fetched through the session's network stack (net.fetch), which
+// already keeps connections alive and multiplexes them per origin. What it
+// doesn't do is order our downloads: when a world requests hundreds of assets
+// at once, the queue below caps how many cache fills run together and lets the
+// page, scripts and manifests go ahead of large media, and everything the page
+// asks for go ahead of prefetches.
+
+// Lower numbers are started first.
+const PRIORITY = {
+    document: 0,
+    script: 1,
+    default: 2,
+    media: 3,
+    prefetch: 4,
+};
+
+const SCRIPT_EXTENSIONS = /\.(m?js|json|wasm|css)$/i;
+const MEDIA_EXTENSIONS = /\.(glb|gltf|vrm|ktx2|basis|hdr|exr|png|jpe?g|webp|avif|gif|mp3|ogg|wav|m4a|mp4|webm)$/i;
+
+function requestPriority(request) {
+    const { pathname } = new URL(request.url);
+    if ((request.headers.get('accept') || '').includes('text/html')) return PRIORITY.document;
+    if (SCRIPT_EXTENSIONS.test(pathname)) return PRIORITY.script;
+    if (MEDIA_EXTENSIONS.test(pathname)) return PRIORITY.media;
+    return PRIORITY.default;
+}
+
+// A counting semaphore whose waiters are served by priority, then in arrival
+// order. `maxConcurrent` of 0 means unlimited.
+class DownloadQueue {
+    constructor(maxConcurrent = 0) {
+        this.maxConcurrent = maxConcurrent;
+        this.active = 0;
+        this.waiting = [];
+        this.sequence = 0;
+    }
+
+    // Resolves with a release function once a slot is free. The caller must
+    // call it exactly once, when its download has finished or failed. While
+    // waiting, the promise's `promote(priority)` moves it up the queue (when
+    // the page asks for something a prefetch has queued).
+    acquire(priority = PRIORITY.default) {
+        let waiter;
+        const acquired = new Promise((resolve) => {
+            waiter = { priority, sequence: this.sequence++, resolve };
+            this.waiting.push(waiter);
+        });
+        acquired.promote = (higher) => {
+            waiter.priority = Math.min(waiter.priority, higher);
+        };
+        this.next();
+        return acquired;
+    }
+
+    next() {
+        while (this.waiting.length && (!this.maxConcurrent || this.active < this.maxConcurrent)) {
+            let best = 0;
+            for (let i = 1; i < this.waiting.length; i++) {
+                const candidate = this.waiting[i];
+                const current = this.waiting[best];
+                if (candidate.priority < current.priority
+                    || (candidate.priority === current.priority && candidate.sequence < current.sequence)) {
+                    best = i;
+                }
+            }
+            const [waiter] = this.waiting.splice(best, 1);
+            this.active += 1;
+            let released = false;
+            waiter.resolve(() => {
+                if (released) return;
+                released = true;
+                this.active -= 1;
+                this.next();
+            });
+        }
+    }
+}
+
+module.exports = { DownloadQueue, PRIORITY, requestPriority };
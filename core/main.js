@@ -1,25 +1,47 @@
-const { app, BrowserWindow, session, ipcMain, Tray, Menu } = require('electron');
+const { app, BrowserWindow, session, ipcMain, Tray, Menu, net } = require('electron');
 const fs = require('fs');
 const path = require('path');
-const https = require('https');
-const http = require('http');
-const yargs = require('yargs/yargs');
-const { hideBin } = require('yargs/helpers');
-
-let startTime = Date.now();
+const { Readable } = require('stream');
+const { StartupTrace } = require('./trace');
+const { AssetCache } = require('./cache');
+const { DownloadQueue, PRIORITY, requestPriority } = require('./downloads');
+const { AccessLog, Prefetcher, worldKey } = require('./prefetch');
+const { WorldWindows } = require('./standby');
+const { PackStore } = require('./pack');
+const { CacheMetrics } = require('./metrics');
+
+const trace = new StartupTrace();
+trace.mark('main-start');
 
 const USER_DATA = app.getPath('userData'); 
 
 const CACHE_DIR = app.isPackaged? path.join(USER_DATA, 'cache') : path.join('./', 'cache');
 const SETTINGS_FILE = app.isPackaged ? path.join(process.resourcesPath, 'settings.json') : path.join('./', 'settings.json');
+// Read-only cache pack bundled with the build (see "Bundling a seed cache" in the README).
+const SEED_CACHE_DIR = app.isPackaged ? path.join(process.resourcesPath, 'cache-seed') : path.join('./', 'cache-seed', 'pack');
+// Startup milestones of the last few launches (see trace.js).
+const STARTUP_TRACE_FILE = path.join(USER_DATA, 'startup-trace.json');
 console.log(CACHE_DIR, SETTINGS_FILE);
 
+// How often the cache is checked against `cacheMaxBytes`.
+const CACHE_SWEEP_INTERVAL_MS = 10 * 60 * 1000;
+// How often cache statistics are written to cache/stats.json.
+const CACHE_STATS_INTERVAL_MS = 5000;
+
 // Default settings
 const defaultSettings = {
     appName: "MyElectronApp",
     remoteUrl: "https://hyperfy.bitmato.dev",
     windowSize: { width: 1024, height: 768 },
     cacheExpirationHours: 24,
+    cacheMaxBytes: 2 * 1024 * 1024 * 1024,
+    cacheCompression: "none",
+    cacheMaxConcurrentDownloads: 8,
+    prefetchEnabled: true,
+    prefetchMaxConcurrent: 2,
+    prefetchMaxBytesPerSecond: 8 * 1024 * 1024,
+    prefetchMaxBytes: 512 * 1024 * 1024,
+    standbyWindow: true,
     isDeveloper: false,
     startMaximized: false,
     alwaysOnTop: false,
@@ -29,41 +51,84 @@ const defaultSettings = {
     hardwareAcceleration: true,
 };
 
+// What settings.json holds (merged with the defaults), so saving unchanged settings is a no-op.
+let savedSettingsJson = null;
+
 // Load settings (merge with defaults but don't overwrite)
 function loadSettings() {
-    console.log(fs.existsSync(SETTINGS_FILE));
-    if (fs.existsSync(SETTINGS_FILE)) {
-        try {
-            const fileData = JSON.parse(fs.readFileSync(SETTINGS_FILE, 'utf-8'));
-            return { ...defaultSettings, ...fileData };
-        } catch (err) {
-            console.error("Error loading settings:", err);
-            return defaultSettings;
-        }
-    } else {
+    let text;
+    try {
+        text = fs.readFileSync(SETTINGS_FILE, 'utf-8');
+    } catch (err) {
         saveSettings(defaultSettings);
-        return defaultSettings;
+        return { ...defaultSettings };
+    }
+    try {
+        const loaded = { ...defaultSettings, ...JSON.parse(text) };
+        savedSettingsJson = JSON.stringify(loaded, null, 4);
+        return loaded;
+    } catch (err) {
+        console.error("Error loading settings:", err);
+        return { ...defaultSettings };
     }
 }
 
-// Save settings
+// Save settings, if they differ from what's on disk
 function saveSettings(updatedSettings) {
     if (app.isPackaged) { return; }
-    fs.writeFileSync(SETTINGS_FILE, JSON.stringify(updatedSettings, null, 4));
+    const json = JSON.stringify(updatedSettings, null, 4);
+    if (json === savedSettingsJson) { return; }
+    fs.writeFileSync(SETTINGS_FILE, json);
+    savedSettingsJson = json;
 }
 
 // Load settings once
 let settings = loadSettings();
+trace.mark('settings-loaded');
+
+const cache = new AssetCache(CACHE_DIR, {
+    maxBytes: settings.cacheMaxBytes,
+    compression: settings.cacheCompression,
+    packs: [
+        new PackStore(path.join(CACHE_DIR, 'pack')),
+        new PackStore(SEED_CACHE_DIR, { seeded: true }),
+    ],
+});
+const downloads = new DownloadQueue(settings.cacheMaxConcurrentDownloads);
+const metrics = new CacheMetrics();
+const accessLog = new AccessLog(cache.accessLogPath, {
+    sizeOf: (url) => {
+        const entry = cache.get(cache.keyFor(new URL(url)));
+        return entry ? entry.size : 0;
+    },
+});
+const prefetcher = new Prefetcher({
+    maxConcurrent: settings.prefetchMaxConcurrent,
+    maxBytesPerSecond: settings.prefetchMaxBytesPerSecond,
+    maxBytes: settings.prefetchMaxBytes,
+    needed: prefetchNeeded,
+    fetch: prefetchAsset,
+});
+
+// CLI parsing with yargs, which is only loaded when there are options to parse
+function parseArgs(args) {
+    const yargs = require('yargs/yargs');
+    return yargs(args)
+        .option('clear-cache', { alias: 'c', type: 'boolean', description: 'Clear the cache' })
+        .option('cache-gc', { type: 'boolean', description: 'Evict least recently used cache entries down to cacheMaxBytes' })
+        .option('cache-stats', { type: 'boolean', description: 'Print cache statistics as JSON' })
+        .option('set-cache-time', { alias: 't', type: 'number', description: 'Set cache expiration in hours' })
+        .option('enable-dev', { type: 'boolean', description: 'Enable developer mode' })
+        .option('disable-dev', { type: 'boolean', description: 'Disable developer mode' })
+        .option('disable-cache', { type: 'boolean', description: 'Disable caching' })
+        .help()
+        .argv;
+}
 
-// CLI parsing with yargs
-const argv = yargs(hideBin(process.argv))
-    .option('clear-cache', { alias: 'c', type: 'boolean', description: 'Clear the cache' })
-    .option('set-cache-time', { alias: 't', type: 'number', description: 'Set cache expiration in hours' })
-    .option('enable-dev', { type: 'boolean', description: 'Enable developer mode' })
-    .option('disable-dev', { type: 'boolean', description: 'Disable developer mode' })
-    .option('disable-cache', { type: 'boolean', description: 'Disable caching' })
-    .help()
-    .argv;
+// Same as yargs' hideBin: `electron .` passes two leading arguments, a packaged app one.
+const cliArgs = process.argv.slice(process.defaultApp ? 2 : 1);
+const argv = cliArgs.some((arg) => arg.startsWith('-')) ? parseArgs(cliArgs) : {};
+trace.mark('cli-parsed');
 
 // Handle CLI
 if (argv.clearCache) {
@@ -71,6 +136,25 @@ if (argv.clearCache) {
     console.log("Cache cleared!");
     process.exit(0);
 }
+
+// Cache maintenance commands need the index, which loads asynchronously. They
+// run instead of the app and exit when done.
+let cacheCommand = null;
+if (argv.cacheGc) {
+    cacheCommand = async () => {
+        await cache.evict();
+        cache.saveSync();
+        console.log(`Cache collected: ${cache.entries.size} entries, ${cache.totalBytes} bytes.`);
+    };
+} else if (argv.cacheStats) {
+    cacheCommand = async () => {
+        console.log(JSON.stringify(cache.stats(), null, 4));
+        cache.saveSync();
+    };
+}
+if (cacheCommand) {
+    cache.load().then(cacheCommand).then(() => process.exit(0));
+}
 if (argv.setCacheTime) {
     settings.cacheExpirationHours = argv.setCacheTime;
     saveSettings(settings);
@@ -80,90 +164,440 @@ if (argv.setCacheTime) {
 if (argv.enableDev) settings.isDeveloper = true;
 if (argv.disableDev) settings.isDeveloper = false;
 
-// Persist any CLI changes
+// Persist any CLI changes (a no-op unless they changed something)
 saveSettings(settings);
 
+// Only possible before the app is ready.
+if (!settings.hardwareAcceleration) {
+    app.disableHardwareAcceleration();
+}
+
 //////////////////////
 // Wait until ready //
 //////////////////////
 
 app.whenReady().then(() => {
+    if (cacheCommand) return;
+    trace.mark('app-ready');
+
+    // Network caching. The handlers must be in place before the page loads, and
+    // the index starts loading now (asynchronously; requests wait for it) so the
+    // first requests can already be served from disk.
+    const caching = !settings.disableCache;
+    if (caching) {
+        cache.load().then(() => trace.mark('cache-index-loaded'));
+        session.defaultSession.protocol.handle('https', handleAssetRequest);
+        session.defaultSession.protocol.handle('http', handleAssetRequest);
+        // What the first world requested last time starts downloading alongside the page.
+        prefetchWorld(settings.remoteUrl);
+    }
+
+    createMainWindow();
+    trace.mark('window-created');
+
+    // Everything the first frame doesn't need waits until it's on screen.
+    afterFirstPaint(mainWindow, () => {
+        trace.mark('first-paint');
+        if (caching) {
+            cache.load().then(() => cache.evict());
+            cache.startSweeper(CACHE_SWEEP_INTERVAL_MS);
+            setInterval(() => {
+                metrics.writeFile(cache.statsPath, cache.stats()).catch(() => {});
+            }, CACHE_STATS_INTERVAL_MS).unref();
+        }
+        if (settings.trayEnabled) {
+            createTray();
+            trace.mark('tray-created');
+        }
+        worldWindows.scheduleStandby();
+    });
+});
+
+// Runs `callback` once `win` has painted its first frame, or its page has
+// finished or failed loading, whichever comes first.
+function afterFirstPaint(win, callback) {
+    let called = false;
+    const once = () => {
+        if (called) return;
+        called = true;
+        setImmediate(callback);
+    };
+    win.once('ready-to-show', once);
+    win.webContents.once('did-finish-load', once);
+    win.webContents.on('did-fail-load', (event, code, description, url, isMainFrame) => {
+        if (isMainFrame) once();
+    });
+}
+
+///////////////////
+// Asset caching //
+///////////////////
+
+// Response headers that describe the transfer rather than the asset. The body we
+// hand over is already decoded by the network stack, so these must not be replayed.
+const TRANSFER_HEADERS = new Set([
+    'connection', 'content-encoding', 'content-length', 'keep-alive', 'transfer-encoding',
+]);
+// ...nor stored, along with what only applies to this one response.
+const UNCACHED_HEADERS = new Set([...TRANSFER_HEADERS, 'date', 'set-cookie', 'age']);
+// The body is decoded before it is stored, so varying by encoding doesn't matter.
+const IGNORED_VARY = new Set(['accept-encoding']);
+
+// Downloads currently being written to the cache, keyed by cache key, so
+// concurrent requests for the same URL share a single network fetch.
+const inFlight = new Map();
+
+function fetchUpstream(request) {
+    return net.fetch(request, { bypassCustomProtocolHandlers: true });
+}
+
+// Upstream responses that go to the page without being stored.
+async function passUpstream(request) {
+    const response = await fetchUpstream(request);
+    metrics.passthrough += 1;
+    metrics.bytesFromNetwork += parseInt(response.headers.get('content-length'), 10) || 0;
+    return response;
+}
 
-    // 2) Ensure userData-based directories exist
-    if (!fs.existsSync(CACHE_DIR)) {
-        fs.mkdirSync(CACHE_DIR, { recursive: true });
-        console.log(`Created cache directory: ${CACHE_DIR}`);
+function isExpired(entry) {
+    return Date.now() - entry.cachedAt >= settings.cacheExpirationHours * 3600000;
+}
+
+// Builds a response from a cache entry, honouring a single `bytes=` range.
+// Resolves to null if the entry's file has disappeared.
+async function serveFromCache(key, entry, range) {
+    // Compressed entries can only be streamed whole; a 200 is a valid answer to
+    // a range request.
+    const headers = { ...entry.headers, 'accept-ranges': entry.encoding ? 'none' : 'bytes' };
+    const match = !entry.encoding && range && /^bytes=(\d*)-(\d*)$/.exec(range.trim());
+    if (match && (match[1] || match[2])) {
+        let start = match[1] ? parseInt(match[1], 10) : entry.size - parseInt(match[2], 10);
+        let end = match[1] && match[2] ? parseInt(match[2], 10) : entry.size - 1;
+        start = Math.max(0, start);
+        end = Math.min(end, entry.size - 1);
+        if (start > end) {
+            return new Response(null, { status: 416, headers: { 'content-range': `bytes */${entry.size}` } });
+        }
+        const stream = await cache.openBody(key, start, end);
+        if (!stream) return null;
+        headers['content-range'] = `bytes ${start}-${end}/${entry.size}`;
+        headers['content-length'] = String(end - start + 1);
+        metrics.bytesFromDisk += end - start + 1;
+        return new Response(Readable.toWeb(stream), { status: 206, headers });
     }
+    const stream = await cache.openBody(key);
+    if (!stream) return null;
+    headers['content-length'] = String(entry.size);
+    metrics.bytesFromDisk += entry.size;
+    return new Response(Readable.toWeb(stream), { status: 200, headers });
+}
 
-    if (!settings.hardwareAcceleration) {
-        app.disableHardwareAcceleration();
+function replayableHeaders(responseHeaders) {
+    const headers = {};
+    responseHeaders.forEach((value, name) => {
+        if (!UNCACHED_HEADERS.has(name)) headers[name] = value;
+    });
+    return headers;
+}
+
+// The upstream headers as the page should see them, cookies included.
+function clientHeaders(responseHeaders) {
+    const headers = new Headers();
+    responseHeaders.forEach((value, name) => {
+        if (!TRANSFER_HEADERS.has(name) && name !== 'set-cookie') headers.append(name, value);
+    });
+    // forEach joins cookies with commas, which their Expires dates contain too.
+    for (const cookie of responseHeaders.getSetCookie()) headers.append('set-cookie', cookie);
+    return headers;
+}
+
+function cacheControl(responseHeaders) {
+    return (responseHeaders.get('cache-control') || '').toLowerCase().split(',').map((d) => d.trim().split('=')[0]);
+}
+
+// The request headers a response varies by, or null if it can't be reused at all.
+function varyHeaders(responseHeaders) {
+    const names = (responseHeaders.get('vary') || '').toLowerCase().split(',').map((name) => name.trim()).filter(Boolean);
+    if (names.includes('*')) return null;
+    return names.filter((name) => !IGNORED_VARY.has(name));
+}
+
+// Per-user and one-off responses never go into the cache.
+function isStorable(response) {
+    const directives = cacheControl(response.headers);
+    return !directives.includes('no-store') && !directives.includes('private')
+        && !response.headers.has('set-cookie') && varyHeaders(response.headers) !== null;
+}
+
+// Whether the entry was stored for a request like this one (same values for the headers it varies by).
+function varyMatches(entry, request) {
+    return Object.entries(entry.vary || {}).every(([name, value]) => request.headers.get(name) === value);
+}
+
+// Pages, and responses marked no-cache, are always checked with the server
+// before they are reused, so a deploy shows up on the next load.
+function mustRevalidate(entry, priority) {
+    return priority === PRIORITY.document || Boolean(entry.revalidate);
+}
+
+// Adds the entry's validators to the request, so an unchanged asset comes back
+// as a bodiless 304 instead of a full download.
+function conditionalRequest(request, entry) {
+    if (!entry || (!entry.etag && !entry.lastModified)) return request;
+    const headers = new Headers(request.headers);
+    if (entry.etag) headers.set('if-none-match', entry.etag);
+    if (entry.lastModified) headers.set('if-modified-since', entry.lastModified);
+    return new Request(request.url, { method: 'GET', headers });
+}
+
+// Hands the response to Chromium while a second branch of the body is written
+// to the cache. `stored` resolves to the new cache entry, or null if nothing
+// was cached.
+function storeResponse(request, response, key) {
+    if (response.status !== 200 || !response.body || !isStorable(response)) {
+        metrics.bytesFromNetwork += parseInt(response.headers.get('content-length'), 10) || 0;
+        return { response, stored: Promise.resolve(null) };
     }
 
-    createMainWindow();
+    const directives = cacheControl(response.headers);
+    const vary = varyHeaders(response.headers);
+    const meta = {
+        url: request.url,
+        cachedAt: Date.now(),
+        etag: response.headers.get('etag'),
+        lastModified: response.headers.get('last-modified'),
+        contentType: response.headers.get('content-type'),
+        headers: replayableHeaders(response.headers),
+        revalidate: directives.includes('no-cache') || undefined,
+        vary: vary.length ? Object.fromEntries(vary.map((name) => [name, request.headers.get(name)])) : undefined,
+    };
+
+    const [clientBody, cacheBody] = response.body.tee();
+    const stored = cache.write(key, cacheBody, meta).then((entry) => {
+        metrics.bytesFromNetwork += entry.size;
+        return entry;
+    }, (err) => {
+        console.error(`Cache write error: ${request.url}`, err);
+        return null;
+    });
+    const clientResponse = new Response(clientBody, {
+        status: response.status,
+        statusText: response.statusText,
+        headers: clientHeaders(response.headers),
+    });
+    return { response: clientResponse, stored };
+}
+
+// Fetches `request`, revalidating `cached` when it carries validators. On a 304
+// the entry is refreshed in place and `response` is null: the caller serves the
+// body it already has on disk.
+async function downloadEntry(request, key, cached) {
+    const response = await fetchUpstream(conditionalRequest(request, cached));
+    if (response.status === 304 && cached) {
+        metrics.notModified += 1;
+        if (response.body) response.body.cancel();
+        const stored = cache.refresh(key, {
+            etag: response.headers.get('etag') || cached.etag,
+            lastModified: response.headers.get('last-modified') || cached.lastModified,
+            headers: { ...cached.headers, ...replayableHeaders(response.headers) },
+        }).catch((err) => {
+            console.error(`Cache refresh error: ${request.url}`, err);
+            return cached;
+        });
+        return { response: null, stored };
+    }
+    return storeResponse(request, response, key);
+}
+
+// Downloads still waiting for a slot, keyed by cache key: a function that raises their priority.
+const queuedDownloads = new Map();
+
+// Starts fetching `request` into the cache (revalidating `cached` if given) and
+// registers it in `inFlight`. `stored` resolves to the new entry or null.
+function startDownload(request, key, cached, priority = requestPriority(request)) {
+    // Prefetches are counted separately (`prefetched`), so they don't skew the page's hit ratio.
+    if (priority === PRIORITY.prefetch) {
+        metrics.prefetched += 1;
+    } else if (cached) {
+        metrics.revalidations += 1;
+    } else {
+        metrics.misses += 1;
+    }
 
-    if (settings.trayEnabled) {
-        createTray();
+    // The download slot is held until the body is on disk (or the fetch failed),
+    // so the limit covers the whole cache fill rather than just the headers.
+    const acquired = downloads.acquire(priority);
+    queuedDownloads.set(key, acquired.promote);
+    const download = acquired.then((release) => {
+        queuedDownloads.delete(key);
+        console.log(`${cached ? 'Revalidating' : 'Downloading and caching'}: ${request.url}`);
+        const pending = downloadEntry(request, key, cached);
+        pending.then(({ stored }) => stored).catch(() => null).finally(release);
+        return pending;
+    });
+    const stored = download.then(({ stored }) => stored, () => null);
+    inFlight.set(key, stored);
+    stored.finally(() => inFlight.delete(key));
+    return { download, stored };
+}
+
+// Protocol handler for http(s). Times every request, from the moment Chromium
+// hands it over until a response is ready.
+async function handleAssetRequest(request) {
+    const start = performance.now();
+    try {
+        return await serveAssetRequest(request);
+    } finally {
+        metrics.recordLatency(performance.now() - start);
     }
+}
 
-    // Network caching
-    session.defaultSession.webRequest.onBeforeRequest((details, callback) => {
-        if (!details.url.startsWith('http') || settings.disableCache) {
-            callback({ cancel: false });
-            return;
+async function serveAssetRequest(request) {
+    if (request.method !== 'GET') {
+        return passUpstream(request);
+    }
+
+    await cache.ready;
+    const key = cache.keyFor(new URL(request.url));
+    const range = request.headers.get('range');
+    const priority = requestPriority(request);
+    // An entry stored for other values of the headers its response varies by is replaced, not reused.
+    const existing = cache.get(key);
+    const cached = existing && varyMatches(existing, request) ? existing : null;
+    if (priority !== PRIORITY.document) recordAsset(request.url);
+    if (prefetchedKeys.delete(key)) metrics.prefetchHits += 1;
+
+    // Entries from the bundled seed are served even when expired, so a fresh
+    // install starts from disk; they are revalidated in the background and the
+    // result lands in the user's cache for next time.
+    if (cached && !mustRevalidate(cached, priority) && (!isExpired(cached) || cached.seeded)) {
+        const response = await serveFromCache(key, cached, range);
+        if (response) {
+            cache.touch(key);
+            metrics.hits += 1;
+            console.log(`Serving from cache: ${request.url}`);
+            if (cached.seeded && isExpired(cached) && !inFlight.has(key)) {
+                const headers = new Headers(request.headers);
+                headers.delete('range');
+                startDownload(new Request(request.url, { headers }), key, cached).download.then(({ response: fresh }) => {
+                    if (fresh && fresh.body) fresh.body.cancel();
+                }, () => {});
+            }
+            return response;
         }
+    }
+
+    // Partial requests are never stored; let them through untouched.
+    if (range) {
+        return passUpstream(request);
+    }
+
+    // Someone else is already fetching this URL: wait for it and serve the result.
+    if (inFlight.has(key)) {
+        metrics.coalesced += 1;
+        // A prefetch still waiting for a slot moves up to this request's priority.
+        const promote = queuedDownloads.get(key);
+        if (promote) promote(priority);
+        const entry = await inFlight.get(key);
+        return (entry && varyMatches(entry, request) && await serveFromCache(key, entry, null)) || passUpstream(request);
+    }
 
-        const requestUrl = new URL(details.url);
-        const fileName = encodeURIComponent(requestUrl.pathname + requestUrl.search);
-        const filePath = path.join(CACHE_DIR, fileName);
-        const metaFilePath = filePath + ".meta";
-
-        if (fs.existsSync(filePath) && fs.existsSync(metaFilePath)) {
-            const fileStat = fs.statSync(metaFilePath);
-            try {
-                // Check expiration
-                if (Date.now() - fileStat.mtimeMs < settings.cacheExpirationHours * 3600000) {
-                    console.log(`Serving from cache: ${details.url}`);
-                    callback({ cancel: false });
-                    return;
-                } else {
-                    fs.unlinkSync(filePath);
-                    fs.unlinkSync(metaFilePath);
-                }
-            } catch (e) {
-                console.log(`Error reading from cache: ${e}`);
-            }        
+    const { download, stored } = startDownload(request, key, cached, priority);
+    try {
+        const { response } = await download;
+        if (response) return response;
+        console.log(`Not modified, serving from cache: ${request.url}`);
+        const entry = await stored;
+        return (entry && await serveFromCache(key, entry, null)) || passUpstream(request);
+    } catch (err) {
+        // Offline or upstream unreachable: an expired copy beats no copy.
+        const stale = cache.get(key) && await serveFromCache(key, cache.get(key), null);
+        if (stale) {
+            metrics.staleServed += 1;
+            console.log(`Network failed, serving stale cache: ${request.url}`);
+            return stale;
         }
+        console.error(`Download error: ${request.url}`, err);
+        throw err;
+    }
+}
 
-        console.log(`Downloading and caching: ${details.url}`);
-        const protocol = details.url.startsWith('https') ? https : http;
-        protocol.get(details.url, (response) => {
-            if (response.statusCode !== 200) return;
-            const fileStream = fs.createWriteStream(filePath);
-            response.pipe(fileStream);
-            fileStream.on('finish', () => {
-                fileStream.close();
-                fs.writeFileSync(metaFilePath, Date.now().toString());
-            });
-        }).on('error', (err) => {
-            console.error(`Download error: ${details.url}`, err);
-        });
+/////////////////
+// Prefetching //
+/////////////////
 
-        callback({ cancel: false });
-    });
+// Cache keys of assets the prefetcher fetched that the page hasn't requested yet.
+const prefetchedKeys = new Set();
+// The world whose recorded assets are being prefetched.
+let prefetchingWorld = null;
 
-    let appReadyTime = Date.now(); 
-    console.log(`App ready in ${appReadyTime - startTime}ms`);
-});
+// Starts recording the page's requests under `url`'s world and prefetches what
+// that world requested last time.
+function visitWorld(url) {
+    if (accessLog.startVisit(url)) prefetchWorld(url);
+}
 
-// Create main application window
-function createMainWindow() {
-    const windowStartTime = Date.now(); 
+// Records a request in the visible world's visit. Requests don't say which
+// window made them, so nothing is recorded while the hidden standby holds
+// another world: its assets would be logged as this world's.
+function recordAsset(url) {
+    const preloaded = worldWindows.preloadedUrl();
+    if (preloaded && accessLog.visit && worldKey(preloaded) !== accessLog.visit.world) return;
+    accessLog.record(url);
+}
+
+function prefetchWorld(url) {
+    const world = worldKey(url);
+    if (!settings.prefetchEnabled || prefetchingWorld === world) return;
+    prefetchingWorld = world;
+    prefetcher.cancel();
+    Promise.all([cache.load(), accessLog.load()]).then(() => {
+        const assets = accessLog.assets(url);
+        if (prefetchingWorld !== world || !assets.length) return;
+        console.log(`Prefetching ${assets.length} recorded assets of ${url}`);
+        return prefetcher.start(assets);
+    }).catch((err) => console.error('Prefetch error:', err));
+}
+
+// Whether an asset is missing or expired and isn't already being downloaded.
+function prefetchNeeded(url) {
+    const key = cache.keyFor(new URL(url));
+    const cached = cache.get(key);
+    return !inFlight.has(key) && (!cached || isExpired(cached));
+}
+
+async function prefetchAsset(url) {
+    if (!prefetchNeeded(url)) return;
+    const key = cache.keyFor(new URL(url));
+    prefetchedKeys.add(key);
+    const { download, stored } = startDownload(new Request(url), key, cache.get(key), PRIORITY.prefetch);
+    download.then(({ response }) => {
+        if (response && response.body) response.body.cancel();
+    }, () => {});
+    if (!await stored) prefetchedKeys.delete(key);
+}
 
+///////////////////
+// World windows //
+///////////////////
+
+// The visible window, and the hidden standby that replaces it when the page
+// switches worlds or its renderer crashes (see standby.js).
+let mainWindow = null;
+const worldWindows = new WorldWindows({
+    createWindow: createWorldWindow,
+    onActivate: activateWindow,
+    standby: settings.standbyWindow,
+});
+
+// A window with the app's options; the visible one and the standby are made alike.
+function createWorldWindow({ show }) {
     // Use your appName, etc. from settings
-    mainWindow = new BrowserWindow({
+    const win = new BrowserWindow({
         width: settings.windowSize.width,
         height: settings.windowSize.height,
         title: settings.appName,
+        show,
         autoHideMenuBar: !settings.isDeveloper,
         alwaysOnTop: settings.alwaysOnTop,
         frame: true,
@@ -176,6 +610,24 @@ function createMainWindow() {
         }
     });
 
+    if (settings.customUserAgent) {
+        win.webContents.setUserAgent(settings.customUserAgent);
+    }
+
+    win.webContents.on('did-finish-load', () => {
+        win.setTitle(settings.appName);
+    });
+    // Only the visible window's navigations start a visit in the access log.
+    win.webContents.on('did-start-navigation', (details) => {
+        if (details.isMainFrame && win === mainWindow && !settings.disableCache) visitWorld(details.url);
+    });
+    return win;
+}
+
+// Create main application window
+function createMainWindow() {
+    mainWindow = worldWindows.open(settings.remoteUrl);
+
     if (settings.startMaximized) {
         mainWindow.maximize();
     }
@@ -184,21 +636,48 @@ function createMainWindow() {
         mainWindow.webContents.openDevTools({ mode: 'detach' });
     }
 
-    if (settings.customUserAgent) {
-        mainWindow.webContents.setUserAgent(settings.customUserAgent);
+    mainWindow.webContents.once('did-finish-load', () => {
+        writeStartupTrace('did-finish-load');
+    });
+    mainWindow.webContents.on('did-fail-load', (event, code, description, url, isMainFrame) => {
+        if (isMainFrame) writeStartupTrace('did-fail-load');
+    });
+}
+
+// A standby window has replaced the visible one (null: the window was closed).
+function activateWindow(win) {
+    mainWindow = win;
+    if (!win) return;
+    if (settings.isDeveloper) {
+        win.webContents.openDevTools({ mode: 'detach' });
     }
+    if (!settings.disableCache) visitWorld(win.webContents.getURL());
+}
 
-    mainWindow.loadURL(settings.remoteUrl);
+// Only the visible window's page may switch worlds, and only to web pages.
+function worldRequest(event, url) {
+    if (!mainWindow || event.sender !== mainWindow.webContents) return null;
+    try {
+        const { protocol } = new URL(url);
+        return protocol === 'https:' || protocol === 'http:' ? url : null;
+    } catch (err) {
+        return null;
+    }
+}
 
-    mainWindow.on('closed', () => {
-        mainWindow = null;
-    });
-    mainWindow.webContents.once('did-finish-load', () => {
-        const fullLoadTime = Date.now();
-        console.log(`Window created in ${fullLoadTime - windowStartTime}ms`);
-        console.log(`Total time from start to full load: ${fullLoadTime - startTime}ms`);
-        mainWindow.setTitle(settings.appName);
-    });
+// Writes this launch's milestones to startup-trace.json once the page has loaded (or failed to).
+let startupTraceWritten = false;
+function writeStartupTrace(outcome) {
+    if (startupTraceWritten) return;
+    startupTraceWritten = true;
+    trace.mark(outcome);
+    const total = trace.marks[trace.marks.length - 1].ms;
+    console.log(`Startup: ${outcome} ${total}ms after process start (trace: ${STARTUP_TRACE_FILE})`);
+    trace.writeFile(STARTUP_TRACE_FILE, {
+        electron: process.versions.electron,
+        packaged: app.isPackaged,
+        cache: !settings.disableCache,
+    }).catch((err) => console.error('Error writing startup trace:', err));
 }
 
 // Create system tray icon
@@ -218,12 +697,22 @@ function createTray() {
 }
 
 // IPC Handlers
-ipcMain.on('clear-cache', () => fs.rmSync(CACHE_DIR, { recursive: true, force: true }));
+ipcMain.on('clear-cache', () => cache.clear());
 ipcMain.on('set-cache-time', (_, hours) => {
     settings.cacheExpirationHours = parseInt(hours, 10);
     saveSettings(settings);
 });
 ipcMain.handle('get-settings', async () => settings);
+ipcMain.handle('get-cache-time', async () => settings.cacheExpirationHours);
+ipcMain.handle('get-cache-stats', async () => metrics.snapshot(cache.stats()));
+ipcMain.handle('switch-world', async (event, url) => {
+    const target = worldRequest(event, url);
+    return target ? worldWindows.switchTo(target) : false;
+});
+ipcMain.handle('preload-world', async (event, url) => {
+    const target = worldRequest(event, url);
+    return target ? worldWindows.preload(target) : false;
+});
 ipcMain.on('enable-developer-mode', () => {
     settings.isDeveloper = true;
     saveSettings(settings);
@@ -233,6 +722,11 @@ ipcMain.on('disable-developer-mode', () => {
     saveSettings(settings);
 });
 
+app.on('will-quit', () => {
+    cache.saveSync();
+    accessLog.saveSync();
+});
+
 app.on('window-all-closed', () => {
     if (process.platform !== 'darwin') app.quit();
 });
@@ -0,0 +1,81 @@
+const fs = require('fs');
+
+// How many recent handler latencies the percentiles are computed over.
+const LATENCY_SAMPLES = 1024;
+
+// Counters for the asset request handler. Everything here is cheap to update
+// on the hot path; percentiles are only computed when a snapshot is taken.
+class CacheMetrics {
+    constructor() {
+        this.startedAt = Date.now();
+        this.hits = 0;
+        this.misses = 0;
+        this.revalidations = 0;
+        this.coalesced = 0;
+        this.notModified = 0;
+        this.staleServed = 0;
+        this.passthrough = 0;
+        // Downloads started by the prefetcher, and page requests they answered.
+        this.prefetched = 0;
+        this.prefetchHits = 0;
+        this.bytesFromDisk = 0;
+        this.bytesFromNetwork = 0;
+        // Ring buffer of handler latencies in milliseconds.
+        this.latencies = new Float64Array(LATENCY_SAMPLES);
+        this.latencyCount = 0;
+    }
+
+    recordLatency(ms) {
+        this.latencies[this.latencyCount % LATENCY_SAMPLES] = ms;
+        this.latencyCount += 1;
+    }
+
+    percentile(sorted, p) {
+        if (!sorted.length) return null;
+        const index = Math.min(sorted.length - 1, Math.ceil(p * sorted.length) - 1);
+        return Math.round(sorted[Math.max(0, index)] * 100) / 100;
+    }
+
+    // `cacheStats` is AssetCache#stats(), merged in so one object describes
+    // both the traffic and what is on disk.
+    snapshot(cacheStats) {
+        const samples = this.latencies.slice(0, Math.min(this.latencyCount, LATENCY_SAMPLES)).sort();
+        const lookups = this.hits + this.misses + this.revalidations;
+        return {
+            updatedAt: Date.now(),
+            uptimeMs: Date.now() - this.startedAt,
+            requests: {
+                hits: this.hits,
+                misses: this.misses,
+                revalidations: this.revalidations,
+                coalesced: this.coalesced,
+                notModified: this.notModified,
+                staleServed: this.staleServed,
+                passthrough: this.passthrough,
+                prefetched: this.prefetched,
+                prefetchHits: this.prefetchHits,
+                hitRatio: lookups ? this.hits / lookups : null,
+            },
+            bytes: {
+                fromDisk: this.bytesFromDisk,
+                fromNetwork: this.bytesFromNetwork,
+            },
+            latencyMs: {
+                samples: samples.length,
+                p50: this.percentile(samples, 0.5),
+                p95: this.percentile(samples, 0.95),
+            },
+            cache: cacheStats,
+        };
+    }
+
+    // Writes the snapshot to `file` via a temporary file, so readers never see
+    // a half-written document.
+    async writeFile(file, cacheStats) {
+        const tmpPath = `${file}.${process.pid}.tmp`;
+        await fs.promises.writeFile(tmpPath, JSON.stringify(this.snapshot(cacheStats), null, 4));
+        await fs.promises.rename(tmpPath, file);
+    }
+}
+
+module.exports = { CacheMetrics };
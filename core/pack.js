@@ -0,0 +1,72 @@
+const fs = require('fs');
+const path = require('path');
+
+const PACK_INDEX_FILE = 'index.json';
+const PACK_VERSION = 1;
+
+// Read-only view of a packed cache: a few large, append-only segment files
+// plus `index.json`, which maps each cache key to the segment, offset and
+// length of its stored body alongside the usual .meta record. Bodies are read
+// with ranged reads straight out of the segment.
+//
+// Packs are produced (and expanded back into a normal cache directory) by
+// `cache_tool.py pack` / `cache_tool.py unpack`. A `seeded` pack is one
+// bundled with the app build; its entries are flagged `seeded`.
+class PackStore {
+    constructor(dir, { seeded = false } = {}) {
+        this.dir = dir;
+        this.seeded = seeded;
+        this.segments = [];
+        this.entries = new Map();
+        this.totalBytes = 0;
+    }
+
+    async load() {
+        let index;
+        try {
+            index = JSON.parse(await fs.promises.readFile(path.join(this.dir, PACK_INDEX_FILE), 'utf-8'));
+        } catch (err) {
+            return; // No pack; nothing to serve.
+        }
+        if (index.version !== PACK_VERSION) {
+            console.warn(`Ignoring cache pack with unsupported version ${index.version}: ${this.dir}`);
+            return;
+        }
+
+        // Entries whose segment is missing or truncated are dropped up front.
+        const segmentSizes = await Promise.all(index.segments.map(async (segment) => {
+            try {
+                return (await fs.promises.stat(path.join(this.dir, segment.name))).size;
+            } catch (err) {
+                return -1;
+            }
+        }));
+        this.segments = index.segments;
+        for (const [key, entry] of Object.entries(index.entries)) {
+            if (entry.offset + entry.length <= segmentSizes[entry.segment]) {
+                this.entries.set(key, { ...entry, storedSize: entry.length, packed: true, seeded: this.seeded });
+                this.totalBytes += entry.length;
+            }
+        }
+        console.log(`Cache pack loaded: ${this.entries.size} entries from ${this.segments.length} segments`);
+    }
+
+    get(key) {
+        return this.entries.get(key) || null;
+    }
+
+    // Streams the stored bytes of `entry`, optionally limited to an inclusive
+    // byte range relative to the start of the entry.
+    createReadStream(entry, start = 0, end = entry.length - 1) {
+        const segmentPath = path.join(this.dir, this.segments[entry.segment].name);
+        return fs.createReadStream(segmentPath, { start: entry.offset + start, end: entry.offset + end });
+    }
+
+    clear() {
+        this.segments = [];
+        this.entries.clear();
+        this.totalBytes = 0;
+    }
+}
+
+module.exports = { PackStore };
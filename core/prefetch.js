@@ -0,0 +1,190 @@
+const fs = require('fs');
+
+const LOG_VERSION = 1;
+// How many worlds the access log remembers, most recently visited first.
+const MAX_WORLDS = 20;
+// How many requests are remembered per world.
+const MAX_ASSETS = 500;
+// An asset the world stopped requesting is forgotten after this many visits without it.
+const MAX_MISSED_VISITS = 3;
+// The log is written this long after the last request it recorded.
+const SAVE_DELAY_MS = 5000;
+
+// A world is its main-frame URL without the fragment.
+function worldKey(url) {
+    const { origin, pathname, search } = new URL(url);
+    return origin + pathname + search;
+}
+
+// Which assets each world requested, in the order the page asked for them and
+// with their offset from the start of the visit, so the next visit can fetch
+// them before the scene graph discovers them one by one.
+//
+// A visit's requests go first; assets an earlier visit requested but this one
+// hasn't (yet) follow, until they have been missed MAX_MISSED_VISITS times.
+class AccessLog {
+    constructor(file, { sizeOf = () => 0 } = {}) {
+        this.file = file;
+        // Sizes come from the cache when the log is written, so bandwidth limits can pace prefetches.
+        this.sizeOf = sizeOf;
+        this.worlds = new Map();
+        this.ready = null;
+        this.loaded = false;
+        this.visit = null;
+        this.saveTimer = null;
+    }
+
+    load() {
+        if (!this.ready) {
+            this.ready = fs.promises.readFile(this.file, 'utf-8').then((text) => {
+                const data = JSON.parse(text);
+                if (data.version !== LOG_VERSION) return;
+                for (const [world, log] of data.worlds) this.worlds.set(world, log);
+            }).catch(() => {}).then(() => {
+                this.loaded = true;
+            });
+        }
+        return this.ready;
+    }
+
+    // The recorded assets of `url`'s world, in request order.
+    assets(url) {
+        const log = this.worlds.get(worldKey(url));
+        return log ? log.assets : [];
+    }
+
+    // Starts recording a visit to `url`'s world; returns false if it is already being recorded.
+    startVisit(url) {
+        const world = worldKey(url);
+        if (this.visit && this.visit.world === world) return false;
+        this.flush();
+        this.visit = { world, startedAt: Date.now(), assets: [], seen: new Set(), previous: null };
+        return true;
+    }
+
+    record(url) {
+        const visit = this.visit;
+        if (!visit || visit.seen.has(url) || visit.assets.length >= MAX_ASSETS) return;
+        visit.seen.add(url);
+        visit.assets.push({ url, offset: Date.now() - visit.startedAt });
+        if (!this.saveTimer) {
+            this.saveTimer = setTimeout(() => {
+                this.saveTimer = null;
+                this.save().catch((err) => console.error('Error saving access log:', err));
+            }, SAVE_DELAY_MS);
+            this.saveTimer.unref();
+        }
+    }
+
+    // Folds a visit into its world's log.
+    merge(visit) {
+        if (!visit || !visit.assets.length) return;
+        // What the world looked like before this visit; later merges of the same visit start from it too.
+        if (!visit.previous) visit.previous = this.worlds.get(visit.world) || { assets: [] };
+        const assets = visit.assets.map((asset) => ({ ...asset, size: this.sizeOf(asset.url), missed: 0 }));
+        for (const asset of visit.previous.assets) {
+            if (assets.length >= MAX_ASSETS) break;
+            if (visit.seen.has(asset.url) || asset.missed + 1 >= MAX_MISSED_VISITS) continue;
+            assets.push({ ...asset, missed: asset.missed + 1 });
+        }
+        this.worlds.delete(visit.world);
+        this.worlds.set(visit.world, { visitedAt: visit.startedAt, assets });
+        while (this.worlds.size > MAX_WORLDS) {
+            this.worlds.delete(this.worlds.keys().next().value);
+        }
+    }
+
+    data() {
+        return { version: LOG_VERSION, worlds: [...this.worlds] };
+    }
+
+    async save(visit = this.visit) {
+        await this.load();
+        this.merge(visit);
+        const tmpPath = `${this.file}.${process.pid}.tmp`;
+        await fs.promises.writeFile(tmpPath, JSON.stringify(this.data()));
+        await fs.promises.rename(tmpPath, this.file);
+    }
+
+    // Writes the current visit now, e.g. when the page leaves its world.
+    flush() {
+        clearTimeout(this.saveTimer);
+        this.saveTimer = null;
+        const visit = this.visit;
+        if (!visit || !visit.assets.length) return;
+        this.save(visit).catch((err) => console.error('Error saving access log:', err));
+    }
+
+    // For quitting; a log that hasn't loaded yet isn't overwritten.
+    saveSync() {
+        clearTimeout(this.saveTimer);
+        this.saveTimer = null;
+        if (!this.loaded || !this.visit || !this.visit.assets.length) return;
+        try {
+            this.merge(this.visit);
+            fs.writeFileSync(this.file, JSON.stringify(this.data()));
+        } catch (err) {
+            console.error('Error saving access log:', err);
+        }
+    }
+}
+
+function sleep(ms) {
+    return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+// Fetches a world's recorded assets in the background, `maxConcurrent` at a
+// time, paced to `maxBytesPerSecond` by their recorded sizes and stopping
+// after `maxBytes` (0 means no limit). `needed(url)` says whether an asset
+// still has to be fetched; `fetch(url)` fetches it into the cache.
+class Prefetcher {
+    constructor({ maxConcurrent = 2, maxBytesPerSecond = 0, maxBytes = 0, needed, fetch }) {
+        this.maxConcurrent = Math.max(1, maxConcurrent);
+        this.maxBytesPerSecond = maxBytesPerSecond;
+        this.maxBytes = maxBytes;
+        this.needed = needed;
+        this.fetch = fetch;
+        this.run = null;
+    }
+
+    // Prefetches `assets` (in order), stopping any earlier run.
+    start(assets) {
+        this.cancel();
+        const run = { cancelled: false, next: 0, bytes: 0, nextStartAt: Date.now() };
+        this.run = run;
+        const workers = [];
+        for (let i = 0; i < Math.min(this.maxConcurrent, assets.length); i++) {
+            workers.push(this.work(run, assets));
+        }
+        return Promise.all(workers);
+    }
+
+    cancel() {
+        if (this.run) this.run.cancelled = true;
+        this.run = null;
+    }
+
+    async work(run, assets) {
+        while (!run.cancelled && run.next < assets.length) {
+            const asset = assets[run.next++];
+            if (!this.needed(asset.url)) continue;
+            const size = asset.size || 0;
+            if (this.maxBytes && run.bytes + size > this.maxBytes) continue;
+            run.bytes += size;
+            // Each download reserves its share of the bandwidth budget before it starts.
+            if (this.maxBytesPerSecond && size) {
+                const startAt = Math.max(run.nextStartAt, Date.now());
+                run.nextStartAt = startAt + size / this.maxBytesPerSecond * 1000;
+                if (startAt > Date.now()) await sleep(startAt - Date.now());
+                if (run.cancelled) break;
+            }
+            try {
+                await this.fetch(asset.url);
+            } catch (err) {
+                console.error(`Prefetch error: ${asset.url}`, err);
+            }
+        }
+    }
+}
+
+module.exports = { AccessLog, Prefetcher, worldKey };
@@ -4,5 +4,10 @@ contextBridge.exposeInMainWorld('appSettings', {
     clearCache: () => ipcRenderer.send('clear-cache'),
     setCacheTime: (hours) => ipcRenderer.send('set-cache-time', hours),
     getCacheTime: () => ipcRenderer.invoke('get-cache-time'),
+    getCacheStats: () => ipcRenderer.invoke('get-cache-stats'),
+    // Shows another world, loaded in a standby window first; resolves to whether it loaded.
+    switchWorld: (url) => ipcRenderer.invoke('switch-world', url),
+    // Loads a world in the hidden standby ahead of time, so a later switchWorld to it is instant.
+    preloadWorld: (url) => ipcRenderer.invoke('preload-world', url),
     getSettings: () => ipcRenderer.invoke('get-settings')
 });
@@ -0,0 +1,209 @@
+// The visible world window, and a hidden standby ready to replace it.
+//
+// Loading a world in a fresh window means starting a renderer process,
+// running the preload script and only then fetching the page. The standby has
+// done the first two already (it idles on a blank page), and may even hold a
+// preloaded world. Switching worlds, or recovering from a crashed renderer,
+// loads the world in the standby while the current window stays on screen,
+// then swaps the two, instead of tearing the window down and starting cold.
+
+const BLANK_URL = 'about:blank';
+// How long a switch waits for the standby's page before swapping anyway.
+const SWITCH_TIMEOUT_MS = 15000;
+// A new standby is started this long after a swap, so it doesn't compete with the new world's load.
+const STANDBY_DELAY_MS = 5000;
+// Renderers that keep crashing are restarted more slowly.
+const CRASH_WINDOW_MS = 60000;
+const MAX_QUICK_RECOVERIES = 3;
+const RECOVERY_BACKOFF_MS = 30000;
+
+class WorldWindows {
+    // `createWindow({ show })` makes a BrowserWindow with the app's options.
+    // `onActivate(win)` is called when `win` becomes the visible window,
+    // before the one it replaces is destroyed, and with null when the user
+    // closes the visible window.
+    constructor({ createWindow, onActivate = () => {}, standby = true }) {
+        this.createWindow = createWindow;
+        this.onActivate = onActivate;
+        this.standbyEnabled = standby;
+        this.active = null;
+        this.standby = null;
+        // What the standby has loaded or is loading, and a promise of whether it loaded.
+        this.standbyUrl = null;
+        this.standbyLoaded = null;
+        this.standbyTimer = null;
+        // Each window's world, kept after a crash, when the window can't report it.
+        this.urls = new WeakMap();
+        this.switching = null;
+        this.crashes = [];
+        this.closing = false;
+    }
+
+    // Opens the first, visible window on `url`.
+    open(url) {
+        const win = this.createWindow({ show: true });
+        this.watch(win);
+        this.active = win;
+        this.load(win, url);
+        return win;
+    }
+
+    // Resolves to true once `url` has loaded in `win`, false if it failed.
+    load(win, url) {
+        this.urls.set(win, url);
+        return win.loadURL(url).then(() => true, (err) => {
+            // ERR_ABORTED: replaced by a newer load, which reports for itself.
+            if (err.code !== 'ERR_ABORTED') console.error(`Failed to load ${url}:`, err.message);
+            return false;
+        });
+    }
+
+    watch(win) {
+        win.on('closed', () => {
+            if (win === this.active) {
+                // The user closed the app's window: the standby goes too, so the app can quit.
+                this.active = null;
+                this.close();
+                this.onActivate(null);
+            } else if (win === this.standby) {
+                this.standby = null;
+                this.standbyUrl = null;
+            }
+        });
+        const remember = (event, url) => this.urls.set(win, url);
+        win.webContents.on('did-navigate', remember);
+        win.webContents.on('did-navigate-in-page', remember);
+        win.webContents.on('render-process-gone', (event, details) => {
+            if (details.reason === 'clean-exit') return;
+            if (win === this.active) {
+                console.error(`Renderer gone (${details.reason}); recovering ${this.urls.get(win)}`);
+                this.recover(win);
+            } else if (win === this.standby) {
+                console.error(`Standby renderer gone (${details.reason})`);
+                this.dropStandby();
+                this.scheduleStandby();
+            }
+        });
+    }
+
+    makeStandby() {
+        const win = this.createWindow({ show: false });
+        // A preloaded world must not be heard before it's shown.
+        win.webContents.setAudioMuted(true);
+        this.watch(win);
+        this.standby = win;
+        this.standbyUrl = null;
+        this.standbyLoaded = null;
+        return win;
+    }
+
+    // Starts a blank standby after `delay` ms, unless there already is one.
+    scheduleStandby(delay = STANDBY_DELAY_MS) {
+        if (!this.standbyEnabled || this.closing) return;
+        clearTimeout(this.standbyTimer);
+        this.standbyTimer = setTimeout(() => {
+            if (this.standby || this.closing) return;
+            this.preload(BLANK_URL);
+        }, delay);
+    }
+
+    dropStandby() {
+        const win = this.standby;
+        this.standby = null;
+        this.standbyUrl = null;
+        this.standbyLoaded = null;
+        if (win && !win.isDestroyed()) win.destroy();
+    }
+
+    // Loads `url` in the standby, hidden and muted, so a later switch to it is
+    // instant. Resolves to whether it loaded.
+    preload(url) {
+        if (!this.standbyEnabled || this.closing) return Promise.resolve(false);
+        const win = this.standby || this.makeStandby();
+        if (this.standbyUrl !== url) {
+            this.standbyUrl = url;
+            this.standbyLoaded = this.load(win, url);
+        }
+        return this.standbyLoaded;
+    }
+
+    // The world the standby holds or is loading, or null while it idles (or there is none).
+    preloadedUrl() {
+        return this.standbyUrl && this.standbyUrl !== BLANK_URL ? this.standbyUrl : null;
+    }
+
+    // Shows `url` in place of the current world. Resolves to true once it is
+    // on screen, false if it failed to load (the current world stays, unless
+    // `force`: a crashed window is worse than a failed page) or a later switch
+    // replaced this one.
+    async switchTo(url, { force = false } = {}) {
+        if (this.closing || !this.active) return false;
+        if (!this.standbyEnabled) {
+            return this.load(this.active, url);
+        }
+        const switching = {};
+        this.switching = switching;
+        clearTimeout(this.standbyTimer);
+        this.preload(url);
+        const win = this.standby;
+        let timer;
+        const timedOut = new Promise((resolve) => {
+            timer = setTimeout(() => resolve(null), SWITCH_TIMEOUT_MS);
+        });
+        const loaded = await Promise.race([this.standbyLoaded, timedOut]);
+        clearTimeout(timer);
+        if (this.switching !== switching || this.standby !== win || this.closing) return false;
+        this.switching = null;
+        if (loaded === false && !force) {
+            // Leave the failed page behind; the next switch or preload starts over.
+            this.standbyUrl = null;
+            return false;
+        }
+        this.swap(win);
+        return loaded !== false;
+    }
+
+    swap(win) {
+        const old = this.active;
+        this.standby = null;
+        this.standbyUrl = null;
+        this.standbyLoaded = null;
+        if (old && !old.isDestroyed()) {
+            win.setBounds(old.getBounds());
+            if (old.isMaximized()) win.maximize();
+            if (old.isFullScreen()) win.setFullScreen(true);
+        }
+        this.active = win;
+        win.webContents.setAudioMuted(false);
+        win.show();
+        win.focus();
+        this.onActivate(win);
+        if (old && !old.isDestroyed()) old.destroy();
+        this.scheduleStandby();
+    }
+
+    // Reloads a crashed window's world, in the standby if there is one.
+    recover(win) {
+        const now = Date.now();
+        this.crashes = this.crashes.filter((time) => now - time < CRASH_WINDOW_MS);
+        this.crashes.push(now);
+        const delay = this.crashes.length > MAX_QUICK_RECOVERIES ? RECOVERY_BACKOFF_MS : 0;
+        const url = this.urls.get(win);
+        setTimeout(() => {
+            if (this.active !== win || this.closing) return;
+            if (this.standbyEnabled) {
+                this.switchTo(url, { force: true });
+            } else {
+                this.load(win, url);
+            }
+        }, delay);
+    }
+
+    close() {
+        this.closing = true;
+        clearTimeout(this.standbyTimer);
+        this.dropStandby();
+    }
+}
+
+module.exports = { WorldWindows };
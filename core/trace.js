@@ -0,0 +1,46 @@
+const fs = require('fs');
+const { performance } = require('perf_hooks');
+
+// How many launches startup-trace.json keeps, newest first.
+const TRACE_HISTORY = 20;
+
+// Timestamps of startup milestones, in milliseconds since the process started
+// (performance.timeOrigin), so time spent before main.js runs is included.
+// Each launch is prepended to the trace file, which keeps the last few for
+// comparing one build's startup with another's.
+class StartupTrace {
+    constructor() {
+        this.startedAt = Math.round(performance.timeOrigin);
+        this.marks = [];
+    }
+
+    // Records the first occurrence of `name`; later ones are ignored.
+    mark(name) {
+        if (!this.marks.some((m) => m.name === name)) {
+            this.marks.push({ name, ms: Math.round(performance.now()) });
+        }
+    }
+
+    snapshot(details = {}) {
+        return {
+            startedAt: new Date(this.startedAt).toISOString(),
+            ...details,
+            marks: this.marks,
+        };
+    }
+
+    async writeFile(file, details) {
+        let launches = [];
+        try {
+            launches = JSON.parse(await fs.promises.readFile(file, 'utf-8')).launches || [];
+        } catch (err) {
+            launches = [];
+        }
+        const data = { launches: [this.snapshot(details), ...launches].slice(0, TRACE_HISTORY) };
+        const tmpPath = `${file}.${process.pid}.tmp`;
+        await fs.promises.writeFile(tmpPath, JSON.stringify(data, null, 4));
+        await fs.promises.rename(tmpPath, file);
+    }
+}
+
+module.exports = { StartupTrace };
@@ -0,0 +1,344 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from rich.console import Console
+from rich.table import Table
+
+import batch
+import build_cache
+import clone_engine
+import module_store
+import build_matrix
+
+console = Console()
+
+SOURCE_FOLDER = "./core"
+SETTINGS_FILE = "settings.json"
+PACKAGE_FILE = module_store.PACKAGE_FILE
+LOCK_FILE = module_store.LOCK_FILE
+# What each project was last synced to: the hash of every core file as applied,
+# and of the lockfile its node_modules were last installed from.
+STATE_FILE = ".core-sync.json"
+SYNC_LOG = "sync.log"
+DEFAULT_JOBS = 4
+DEFAULT_DEPTH = 2
+# A cloned project has core's files plus the settings.json the clone flows write; core itself has none.
+PROJECT_MARKERS = (PACKAGE_FILE, "main.js", SETTINGS_FILE)
+# Never copied from core, never removed: the project's own files, output and installed packages.
+IGNORED = clone_engine.DEFAULT_EXCLUDES | {SETTINGS_FILE, STATE_FILE, build_matrix.LOG_DIR}
+
+##################################
+# Discovery
+##################################
+
+def is_project(path: str, source: str) -> bool:
+    if os.path.realpath(path) == os.path.realpath(source):
+        return False
+    return all(os.path.isfile(os.path.join(path, name)) for name in PROJECT_MARKERS)
+
+def find_projects(roots: list, source: str, depth: int = DEFAULT_DEPTH) -> list:
+    """Projects cloned from `source` at or below each root, at most `depth` levels down."""
+    found = []
+    for root in roots:
+        base_depth = os.path.abspath(root).rstrip(os.sep).count(os.sep)
+        for current, subdirs, _ in os.walk(root):
+            if is_project(current, source):
+                found.append(current)
+                subdirs[:] = []  # A project's own folders aren't searched
+                continue
+            if os.path.abspath(current).count(os.sep) - base_depth >= depth:
+                subdirs[:] = []
+            subdirs[:] = sorted(d for d in subdirs if d not in IGNORED and not d.startswith("."))
+    unique = {}
+    for path in found:
+        unique.setdefault(os.path.realpath(path), path)
+    return sorted(unique.values())
+
+##################################
+# Deltas
+##################################
+
+def entry_hash(path: str) -> str:
+    """A file's hash; a symlink (which the clone engine recreates, not follows) hashes its target path."""
+    if os.path.islink(path):
+        return hashlib.sha256(os.fsencode(os.readlink(path))).hexdigest()
+    return build_cache.file_hash(path)
+
+class CoreSnapshot:
+    """Core's files (minus IGNORED) with their stats and hashes, read once per run."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.engine = clone_engine.CloneEngine(excludes=IGNORED)
+        _, self.files = self.engine.scan(source)
+        self.hashes = {rel: entry_hash(os.path.join(source, rel)) for rel in self.files}
+        with open(os.path.join(source, PACKAGE_FILE), "r", encoding="utf-8") as f:
+            self.package = json.load(f)
+
+def load_state(project: str) -> dict:
+    try:
+        with open(os.path.join(project, STATE_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def merged_package(core_package: dict, project_package: dict) -> dict:
+    """
+    Core's package.json with the project's `name`, and any `build.extraResources`
+    and `build.files` entries the project added itself (e.g. a bundled seed
+    cache, see cache_tool.set_seed_resource).
+    """
+    merged = json.loads(json.dumps(core_package))
+    merged["name"] = project_package.get("name", merged.get("name"))
+
+    def entries(package, field):
+        values = package.get("build", {}).get(field, [])
+        return [values] if isinstance(values, (dict, str)) else list(values)
+
+    for field in ("extraResources", "files"):
+        core_entries = entries(core_package, field)
+        added = [e for e in entries(project_package, field) if e not in core_entries]
+        if added:
+            merged.setdefault("build", {})[field] = core_entries + added
+    return merged
+
+def plan_sync(core: CoreSnapshot, project: str, force: bool = False) -> dict:
+    """
+    Compares the project with core, file by file. Against the hashes recorded at
+    the last sync, a file the project changed itself is a conflict (kept, unless
+    `force`) rather than an update. Files core no longer has are removed only if
+    they came from core and the project hasn't changed them. Projects synced for
+    the first time have no record, so core's version wins.
+
+    `install` is set when the lockfile changes, or when installing the last
+    one didn't finish (or was skipped).
+    """
+    _, project_files = core.engine.scan(project)
+    state = load_state(project)
+    baseline = state.get("files", {})
+    plan = {"add": [], "update": [], "remove": [], "conflict": [], "package": False, "files": {}}
+
+    for rel, core_stat in core.files.items():
+        core_hash = core.hashes[rel]
+        plan["files"][rel] = core_hash
+        if rel == PACKAGE_FILE:
+            continue
+        project_stat = project_files.get(rel)
+        if project_stat is None:
+            plan["add"].append(rel)
+            continue
+        # Clones and syncs keep core's mtimes, so an equal size and mtime means it's already current.
+        if core.engine.unchanged(core_stat, project_stat):
+            continue
+        local_hash = entry_hash(os.path.join(project, rel))
+        if local_hash == core_hash:
+            continue
+        if rel in baseline and local_hash != baseline[rel] and not force:
+            plan["conflict"].append(rel)
+            plan["files"][rel] = baseline[rel]  # Still what the project was last synced to
+        else:
+            plan["update"].append(rel)
+
+    for rel, synced_hash in baseline.items():
+        if rel in core.files or rel not in project_files:
+            continue
+        if force or entry_hash(os.path.join(project, rel)) == synced_hash:
+            plan["remove"].append(rel)
+        else:
+            plan["conflict"].append(rel)
+            plan["files"][rel] = synced_hash
+
+    with open(os.path.join(project, PACKAGE_FILE), "r", encoding="utf-8") as f:
+        project_package = json.load(f)
+    plan["merged_package"] = merged_package(core.package, project_package)
+    plan["package"] = plan["merged_package"] != project_package
+
+    lock = core.hashes.get(LOCK_FILE)
+    # A first sync can't know; a lockfile that already matches core is taken as installed.
+    plan["modules"] = state.get("modules") if state else (None if LOCK_FILE in plan["add"] + plan["update"] else lock)
+    # A lockfile the project changed itself stays, and so do the modules installed from it.
+    plan["install"] = lock is not None and plan["modules"] != lock and LOCK_FILE not in plan["conflict"]
+    return plan
+
+def plan_changes(plan: dict) -> int:
+    return len(plan["add"]) + len(plan["update"]) + len(plan["remove"]) + int(plan["package"])
+
+def write_state(core: CoreSnapshot, project: str, files: dict, modules: Optional[str]):
+    state = {"source": os.path.abspath(core.source), "syncedAt": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+             "files": files, "modules": modules}
+    tmp_path = os.path.join(project, f"{STATE_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=4)
+    os.replace(tmp_path, os.path.join(project, STATE_FILE))
+
+def apply_sync(core: CoreSnapshot, project: str, plan: dict):
+    """Applies a plan from `plan_sync` and records what the project now matches."""
+    engine = clone_engine.CloneEngine(excludes=IGNORED)
+    for rel in plan["add"] + plan["update"]:
+        dest = os.path.join(project, rel)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        engine.place(os.path.join(core.source, rel), dest, core.files[rel])
+    for rel in plan["remove"]:
+        os.remove(os.path.join(project, rel))
+    if plan["package"]:
+        with open(os.path.join(project, PACKAGE_FILE), "w", encoding="utf-8") as f:
+            json.dump(plan["merged_package"], f, indent=4)
+    state = load_state(project)
+    if plan_changes(plan) or state.get("files") != plan["files"] or state.get("modules") != plan["modules"]:
+        write_state(core, project, plan["files"], plan["modules"])
+
+##################################
+# Fleet
+##################################
+
+class FleetSync:
+    """
+    Syncs core into many projects, `jobs` at a time. Projects whose lockfile
+    changed get their node_modules from the module store (one `npm ci` per
+    new lockfile, shared by every project that has it), with npm's output in
+    `<project>/build-logs/sync.log`.
+    """
+
+    def __init__(self, source: str = SOURCE_FOLDER, jobs: int = DEFAULT_JOBS, dry_run: bool = False,
+                 force: bool = False, install: bool = True, store: Optional[module_store.ModuleStore] = None):
+        self.core = CoreSnapshot(source)
+        self.jobs = max(1, jobs)
+        self.dry_run = dry_run
+        self.force = force
+        self.install = install
+        self.store = store or module_store.ModuleStore()
+
+    def sync(self, project: str) -> dict:
+        started = time.time()
+        result = {"project": project, "status": "up to date", "added": [], "updated": [], "removed": [],
+                  "conflicts": [], "package": False, "install": None, "error": None}
+        try:
+            plan = plan_sync(self.core, project, self.force)
+            result.update(added=plan["add"], updated=plan["update"], removed=plan["remove"],
+                          conflicts=plan["conflict"], package=plan["package"])
+            install = plan["install"] and self.install
+            if self.dry_run:
+                if plan_changes(plan) or install:
+                    result["status"] = "would sync"
+                    result["install"] = "would install" if install else None
+            else:
+                apply_sync(self.core, project, plan)
+                if plan_changes(plan):
+                    result["status"] = "synced"
+                if install:
+                    result["install"] = self.install_modules(project)
+                    write_state(self.core, project, plan["files"], self.core.hashes[LOCK_FILE])
+            if plan["conflict"]:
+                result["status"] = "conflicts"
+        except subprocess.CalledProcessError as e:
+            result.update(status="failed", error=f"'{' '.join(e.cmd)}' exited with {e.returncode}")
+        except Exception as e:
+            result.update(status="failed", error=str(e) or type(e).__name__)
+        result["seconds"] = round(time.time() - started, 3)
+        return result
+
+    def install_modules(self, project: str) -> str:
+        log_path = os.path.join(project, build_matrix.LOG_DIR, SYNC_LOG)
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        with open(log_path, "w", encoding="utf-8") as log:
+            def run(cmd, cwd):
+                log.write(f"$ {' '.join(cmd)}\n")
+                log.flush()
+                subprocess.check_call(cmd, cwd=cwd, stdout=log, stderr=subprocess.STDOUT,
+                                      stdin=subprocess.DEVNULL)
+
+            installed = self.store.install(project, run=run)
+        return "installed" if installed["installed"] else "linked from store"
+
+    def run(self, projects: list) -> list:
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            return list(pool.map(self.sync, projects))
+
+STATUS_COLOURS = {"up to date": "white", "synced": "green", "would sync": "cyan", "conflicts": "yellow", "failed": "red"}
+
+def summary_table(results: list) -> Table:
+    table = Table(title="Fleet sync")
+    table.add_column("Project")
+    table.add_column("Status")
+    table.add_column("Added", justify="right")
+    table.add_column("Updated", justify="right")
+    table.add_column("Removed", justify="right")
+    table.add_column("Modules")
+    table.add_column("Time", justify="right")
+    for r in results:
+        colour = STATUS_COLOURS.get(r["status"], "white")
+        status = r["status"]
+        if r["conflicts"]:
+            status += f" ({', '.join(r['conflicts'])})"
+        if r["error"]:
+            status += f": {r['error']}"
+        updated = len(r["updated"]) + int(r["package"])
+        table.add_row(r["project"], f"[{colour}]{status}[/{colour}]", str(len(r["added"])), str(updated),
+                      str(len(r["removed"])), r["install"] or "", f"{r['seconds']:.1f}s")
+    return table
+
+##################################
+# Entry point
+##################################
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Push changes in core/ into every project cloned from it, file by file."
+    )
+    parser.add_argument("paths", nargs="*", default=["."],
+                        help="Projects, or folders to search for projects (default: the current folder)")
+    parser.add_argument("--manifest", "-m", help="Sync the projects of a batch manifest (see batch.py) instead")
+    parser.add_argument("--source", default=None, help=f"Project template (default: the manifest's 'source' or {SOURCE_FOLDER})")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH,
+                        help=f"How many folder levels below each path to search (default: {DEFAULT_DEPTH})")
+    parser.add_argument("--jobs", "-j", type=int, default=DEFAULT_JOBS,
+                        help=f"Projects synced at the same time (default: {DEFAULT_JOBS})")
+    parser.add_argument("--dry-run", "-n", action="store_true", help="Show what would change without changing anything")
+    parser.add_argument("--force", action="store_true", help="Overwrite files the projects changed themselves")
+    parser.add_argument("--no-install", action="store_true", help="Don't reinstall node_modules when the lockfile changes")
+    parser.add_argument("--output", "-o", help="Also write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.manifest:
+        base_dir = os.path.dirname(os.path.abspath(args.manifest))
+        try:
+            manifest = batch.load_manifest(args.manifest)
+            entries = batch.resolve_projects(manifest, base_dir)
+        except (OSError, batch.ManifestError) as e:
+            console.print(f"[red]Invalid manifest:\n{e}[/red]")
+            sys.exit(2)
+        source = args.source or (os.path.join(base_dir, manifest["source"]) if manifest.get("source") else SOURCE_FOLDER)
+    else:
+        source = args.source or SOURCE_FOLDER
+    if not os.path.isdir(source):
+        console.print(f"[red]Error: Source '{source}' does not exist.[/red]")
+        sys.exit(2)
+    if args.manifest:
+        projects = [os.path.relpath(p["dest"]) for p in entries if is_project(p["dest"], source)]
+    else:
+        projects = find_projects(args.paths, source, args.depth)
+    if not projects:
+        console.print("[yellow]No cloned projects found.[/yellow]")
+        sys.exit(0)
+
+    console.print(f"Syncing {len(projects)} projects with '{source}'" + (" (dry run)" if args.dry_run else ""))
+    fleet = FleetSync(source, args.jobs, dry_run=args.dry_run, force=args.force, install=not args.no_install)
+    results = fleet.run(projects)
+    console.print(summary_table(results))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    failed = [r for r in results if r["status"] in ("failed", "conflicts")]
+    if failed:
+        console.print(f"[red]{len(failed)} of {len(results)} projects need attention.[/red]")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
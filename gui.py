@@ -1,11 +1,17 @@
 import os
-import shutil
+import sys
 import json
-import subprocess
-import threading
+import time
+import queue
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from queue import Queue, Empty
+
+import cache_tool
+import clone_engine
+import module_store
+import build_matrix
+import build_profile
+import jobs
 
 
 #############################
@@ -13,8 +19,48 @@ from queue import Queue, Empty
 #############################
 
 SOURCE_FOLDER = "./core"  # For cloning
-PLATFORMS = ["win32", "linux", "macos"]
-ARCHS = ["x64", "arm64", 'ia32', 'arm7l']
+CACHE_TOOL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_tool.py")
+PLATFORMS = build_matrix.PLATFORMS
+ARCHS = build_matrix.ARCHS
+CACHE_STATS_FILE = "stats.json"  # Written by the running app into its cache folder
+CACHE_STATS_REFRESH_MS = 2000
+OUTPUT_WIDGET_LINES = 2000  # Lines of the selected job's output kept in the text box
+OUTPUT_REFRESH_MS = 100
+
+# (label, path into stats.json, formatter) for each row of the Cache tab
+CACHE_STATS_ROWS = [
+    ("Hits", ("requests", "hits"), str),
+    ("Misses", ("requests", "misses"), str),
+    ("Revalidations", ("requests", "revalidations"), str),
+    ("Not modified (304)", ("requests", "notModified"), str),
+    ("Shared downloads", ("requests", "coalesced"), str),
+    ("Stale served offline", ("requests", "staleServed"), str),
+    ("Hit ratio", ("requests", "hitRatio"), lambda v: f"{v:.1%}"),
+    ("Served from disk", ("bytes", "fromDisk"), lambda v: format_bytes(v)),
+    ("Downloaded", ("bytes", "fromNetwork"), lambda v: format_bytes(v)),
+    ("Latency p50", ("latencyMs", "p50"), lambda v: f"{v} ms"),
+    ("Latency p95", ("latencyMs", "p95"), lambda v: f"{v} ms"),
+    ("Entries", ("cache", "entries"), str),
+    ("On disk", ("cache", "storedBytes"), lambda v: format_bytes(v)),
+    ("Quota", ("cache", "maxBytes"), lambda v: format_bytes(v) if v else "unlimited"),
+    ("Dedup ratio", ("cache", "dedupRatio"), lambda v: f"{v:.2f}x"),
+    ("Evicted entries", ("cache", "evictions", "entries"), str),
+    ("Evicted bytes", ("cache", "evictions", "bytes"), lambda v: format_bytes(v)),
+]
+
+def job_progress(job) -> str:
+    """'45% packaging' where the share done is known, else just the phase."""
+    if job.status != "running":
+        return ""
+    if job.progress is None:
+        return job.phase
+    return f"{job.progress:.0%} {job.phase}".strip()
+
+def format_bytes(count) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if count < 1024 or unit == "GiB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
 
 #############################
 # Main GUI Class
@@ -24,7 +70,7 @@ class BitmatoHyperfyGUI(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Bitmato - Hyperfy Electron Client")
-        self.geometry("600x600")
+        self.geometry("640x900")
         self.configure(bg="#1e1e2d")
 
         # ========== Mode selection ==========
@@ -46,17 +92,29 @@ class BitmatoHyperfyGUI(tk.Tk):
 
         # ========== Build variables ==========
         self.build_project_folder_var = tk.StringVar(value=os.getcwd())
-        self.build_platform_var = tk.StringVar(value="win32")
-        self.build_arch_var = tk.StringVar(value="x64")
-
-        # Spinner references
-        self.progress_window = None
-        self.progress_label = None
-        self.progress_bar = None
-        
-        self.output_queue = Queue()
+        self.build_target_vars = {
+            (platform, arch): tk.BooleanVar(value=(platform, arch) == ("win32", "x64"))
+            for platform in PLATFORMS for arch in ARCHS
+        }
+        self.build_workers_var = tk.StringVar(value=str(build_matrix.DEFAULT_WORKERS))
+        self.bundle_cache_var = tk.BooleanVar(value=False)
+        self.seed_manifest_var = tk.StringVar(value="")
+        self.force_build_var = tk.BooleanVar(value=False)
+
+        # ========== Cache stats variables ==========
+        self.cache_folder_var = tk.StringVar(value=os.getcwd())
+        self.cache_status_var = tk.StringVar(value="")
+        self.cache_stat_vars = {label: tk.StringVar(value="–") for label, _, _ in CACHE_STATS_ROWS}
+
+        # ========== Jobs ==========
+        # Clone/install/build jobs run on worker threads and report back through this queue.
+        self.job_updates = queue.SimpleQueue()
+        self.jobs = jobs.JobScheduler(jobs.DEFAULT_JOBS, notify=self.job_updated)
+        self.jobs_finished = set()
+        self.output_seq = 0
 
         self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def create_widgets(self):
         # Title
@@ -80,6 +138,11 @@ class BitmatoHyperfyGUI(tk.Tk):
         self.main_notebook.add(self.build_frame, text="Build Project")
         self.build_build_ui()
 
+        # Cache tab
+        self.cache_frame = tk.Frame(self.main_notebook, bg="#1e1e2d")
+        self.main_notebook.add(self.cache_frame, text="Cache")
+        self.build_cache_ui()
+
         # Footer "Run" button
         run_button = tk.Button(
             self, text="Run Operation",
@@ -89,6 +152,9 @@ class BitmatoHyperfyGUI(tk.Tk):
         )
         run_button.pack(pady=10)
 
+        # Running and finished jobs, with the selected job's output
+        self.build_jobs_ui()
+
     ##################################
     # Clone UI
     ##################################
@@ -169,25 +235,124 @@ class BitmatoHyperfyGUI(tk.Tk):
             command=self.browse_build_folder
         ).grid(row=0, column=2, padx=5, pady=5, sticky="w")
 
-        # Platform
-        tk.Label(form_frame, text="Platform:", fg="white", bg="#1e1e2d").grid(
-            row=1, column=0, sticky="e", padx=5, pady=5
+        # Target matrix: one checkbox per platform/arch
+        tk.Label(form_frame, text="Targets:", fg="white", bg="#1e1e2d").grid(
+            row=1, column=0, sticky="ne", padx=5, pady=5
         )
-        platform_combo = ttk.Combobox(
-            form_frame, textvariable=self.build_platform_var,
-            values=PLATFORMS, state="readonly", width=10
+        matrix_frame = tk.Frame(form_frame, bg="#1e1e2d")
+        matrix_frame.grid(row=1, column=1, columnspan=2, padx=5, pady=5, sticky="w")
+        for col, arch in enumerate(ARCHS, start=1):
+            tk.Label(matrix_frame, text=arch, fg="white", bg="#1e1e2d").grid(row=0, column=col)
+        for row, platform in enumerate(PLATFORMS, start=1):
+            tk.Label(matrix_frame, text=platform, fg="white", bg="#1e1e2d").grid(row=row, column=0, sticky="e")
+            for col, arch in enumerate(ARCHS, start=1):
+                tk.Checkbutton(
+                    matrix_frame, variable=self.build_target_vars[(platform, arch)],
+                    bg="#1e1e2d", selectcolor="#1e1e2d"
+                ).grid(row=row, column=col)
+
+        # Parallel builds
+        self.add_labeled_entry(form_frame, "Parallel Builds:", self.build_workers_var, row=2)
+
+        # Seed cache
+        self.add_checkbox(form_frame, "Bundle pre-warmed asset cache", self.bundle_cache_var, row=3, col=1)
+        tk.Label(form_frame, text="Asset Manifest:", fg="white", bg="#1e1e2d").grid(
+            row=4, column=0, sticky="e", padx=5, pady=5
+        )
+        tk.Entry(form_frame, textvariable=self.seed_manifest_var, width=30).grid(
+            row=4, column=1, padx=5, pady=5, sticky="w"
+        )
+        tk.Button(
+            form_frame, text="Browse", bg="#007BFF", fg="white",
+            command=self.browse_seed_manifest
+        ).grid(row=4, column=2, padx=5, pady=5, sticky="w")
+
+        # Incremental builds
+        self.add_checkbox(form_frame, "Rebuild unchanged targets", self.force_build_var, row=5, col=1)
+
+    def browse_seed_manifest(self):
+        manifest = filedialog.askopenfilename(title="Select Asset Manifest (optional)")
+        if manifest:
+            self.seed_manifest_var.set(manifest)
+
+    ##################################
+    # Cache UI
+    ##################################
+    def build_cache_ui(self):
+        lbl_desc = tk.Label(
+            self.cache_frame,
+            text="Live cache statistics of a running client",
+            fg="white", bg="#1e1e2d", font=("Arial", 11)
         )
-        platform_combo.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+        lbl_desc.pack(pady=5)
+
+        form_frame = tk.Frame(self.cache_frame, bg="#1e1e2d")
+        form_frame.pack(pady=5, padx=5, fill="both")
+        form_frame.columnconfigure(0, weight=0, minsize=130)
+        form_frame.columnconfigure(1, weight=1, minsize=200)
 
-        # Arch
-        tk.Label(form_frame, text="Architecture:", fg="white", bg="#1e1e2d").grid(
-            row=2, column=0, sticky="e", padx=5, pady=5
+        # Project folder, or the cache folder itself (<userData>/cache for packaged apps)
+        tk.Label(form_frame, text="Project/Cache Folder:", fg="white", bg="#1e1e2d").grid(
+            row=0, column=0, sticky="e", padx=5, pady=5
         )
-        arch_combo = ttk.Combobox(
-            form_frame, textvariable=self.build_arch_var,
-            values=ARCHS, state="readonly", width=10
+        tk.Entry(form_frame, textvariable=self.cache_folder_var, width=30).grid(
+            row=0, column=1, padx=5, pady=5, sticky="w"
         )
-        arch_combo.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+        tk.Button(
+            form_frame, text="Browse", bg="#007BFF", fg="white",
+            command=self.browse_cache_folder
+        ).grid(row=0, column=2, padx=5, pady=5, sticky="w")
+
+        stats_frame = tk.Frame(self.cache_frame, bg="#1e1e2d")
+        stats_frame.pack(pady=5, padx=5, fill="both")
+        stats_frame.columnconfigure(0, weight=0, minsize=180)
+        stats_frame.columnconfigure(1, weight=1, minsize=200)
+        for row, (label, _, _) in enumerate(CACHE_STATS_ROWS):
+            tk.Label(stats_frame, text=f"{label}:", fg="white", bg="#1e1e2d").grid(
+                row=row, column=0, sticky="e", padx=5
+            )
+            tk.Label(stats_frame, textvariable=self.cache_stat_vars[label], fg="white", bg="#1e1e2d").grid(
+                row=row, column=1, sticky="w", padx=5
+            )
+
+        tk.Label(self.cache_frame, textvariable=self.cache_status_var, fg="gray", bg="#1e1e2d").pack(pady=5)
+
+        self.refresh_cache_stats()
+
+    def browse_cache_folder(self):
+        folder = filedialog.askdirectory(title="Select Project or Cache Folder")
+        if folder:
+            self.cache_folder_var.set(folder)
+            self.refresh_cache_stats(reschedule=False)
+
+    def cache_stats_path(self) -> str:
+        folder = self.cache_folder_var.get().strip()
+        project_stats = os.path.join(folder, "cache", CACHE_STATS_FILE)
+        return project_stats if os.path.exists(project_stats) else os.path.join(folder, CACHE_STATS_FILE)
+
+    def refresh_cache_stats(self, reschedule=True):
+        """Re-reads stats.json and updates the Cache tab; reschedules itself."""
+        if reschedule:
+            self.after(CACHE_STATS_REFRESH_MS, self.refresh_cache_stats)
+        # Reading the file is cheap, but there's no point while another tab is shown.
+        if reschedule and self.main_notebook.select() != str(self.cache_frame):
+            return
+
+        stats_path = self.cache_stats_path()
+        try:
+            with open(stats_path, "r", encoding="utf-8") as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            self.cache_status_var.set(f"No statistics at '{stats_path}' (is the client running?)")
+            return
+
+        for label, keys, fmt in CACHE_STATS_ROWS:
+            value = stats
+            for key in keys:
+                value = value.get(key) if isinstance(value, dict) else None
+            self.cache_stat_vars[label].set("–" if value is None else fmt(value))
+        age = max(0, time.time() - stats.get("updatedAt", 0) / 1000)
+        self.cache_status_var.set(f"Updated {age:.0f}s ago from '{stats_path}'")
 
     ##################################
     # Helpers
@@ -222,6 +387,8 @@ class BitmatoHyperfyGUI(tk.Tk):
         current_tab = self.main_notebook.tab(self.main_notebook.select(), "text")
         if current_tab == "Clone Project":
             self.clone_project()
+        elif current_tab == "Cache":
+            self.refresh_cache_stats(reschedule=False)
         else:
             self.build_project()
 
@@ -240,32 +407,30 @@ class BitmatoHyperfyGUI(tk.Tk):
             return
 
         project_dest = os.path.join(".", project_name)
+        if self.jobs.active(os.path.abspath(project_dest)):
+            messagebox.showerror("Error", f"'{project_dest}' is still being cloned or built.")
+            return
         if os.path.exists(project_dest):
             confirm = messagebox.askyesno("Warning", f"'{project_dest}' already exists. Overwrite?")
             if not confirm:
                 return
-            shutil.rmtree(project_dest)
 
-        try:
-            # Clone
-            shutil.copytree(SOURCE_FOLDER, project_dest)
-            # Create settings.json
-            self.create_settings_file(project_dest, project_name)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to clone/create settings:\n{e}")
-            return
-
-        # Run npm install in thread
-        threading.Thread(target=self.run_npm_install, args=(project_dest,)).start()
+        # Tk variables can only be read here, on the Tk thread
+        settings = self.settings_data(project_name)
+        self.jobs.submit(
+            f"Clone {project_name}", self.clone_job, project_dest, project_name, settings,
+            key=os.path.abspath(project_dest),
+            log_path=os.path.join(project_dest, build_matrix.LOG_DIR, "npm-install.log"),
+        )
 
-    def create_settings_file(self, project_dest: str, project_name: str):
+    def settings_data(self, project_name: str) -> dict:
         def to_int(s, default):
             try:
                 return int(s)
             except:
                 return default
 
-        data = {
+        return {
             "appName": project_name,
             "remoteUrl": self.remote_url_var.get().strip(),
             "windowSize": {
@@ -282,6 +447,7 @@ class BitmatoHyperfyGUI(tk.Tk):
             "hardwareAcceleration": self.hw_accel_var.get()
         }
 
+    def create_settings_file(self, project_dest: str, project_name: str, data: dict):
         settings_path = os.path.join(project_dest, "settings.json")
         package_json = os.path.join(project_dest, "package.json")
 
@@ -296,39 +462,33 @@ class BitmatoHyperfyGUI(tk.Tk):
             json.dump(current, rf, indent=4)
             rf.truncate()
 
-    def run_npm_install(self, project_dest: str):
-        self.show_progress_window("Running npm install...")
-
-        # We'll use subprocess.Popen so we can read lines from stdout/stderr in real-time
-        try:
-            process = subprocess.Popen(
-                ["npm", "install"],
-                cwd=project_dest,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
+    def clone_job(self, job, project_dest: str, project_name: str, settings: dict):
+        """Runs on a job thread: clone, settings.json, then node_modules."""
+        # Clone (or sync the changed files into an existing project)
+        counts = clone_engine.clone_tree(SOURCE_FOLDER, project_dest)
+        job.put(
+            f"Cloned '{SOURCE_FOLDER}' → '{project_dest}': {counts['reflinked']} reflinked, "
+            f"{counts['copied']} copied, {counts['unchanged']} unchanged, {counts['removed']} removed\n"
+        )
+        self.create_settings_file(project_dest, project_name, settings)
+        job.check()
+
+        # node_modules come from the shared store; npm only runs (with its output
+        # streamed into the job's log) when this lockfile hasn't been installed before.
+        started = time.time()
+        job.tracker = build_profile.PhaseTracker("npm")
+        result = module_store.ModuleStore().install(project_dest, run=job.run)
+        job.tracker.finish()
+        if result["store"]:
+            source = "installed into" if result["installed"] else "reused from"
+            job.put(f"node_modules {source} {result['store']}\n")
+        if result["installed"]:
+            report = build_profile.write_report(
+                os.path.join(project_dest, build_matrix.LOG_DIR), "install", started,
+                [{"command": "npm", "phases": job.tracker.report()}],
             )
+            job.put(f"Timing report: {report}\n")
 
-            # Start thread to read output
-            threading.Thread(target=self.read_subprocess_output, args=(process,)).start()
-
-            # Wait for process to finish
-            return_code = process.wait()
-
-            # After finishing, remove spinner and show result
-            if return_code == 0:
-                self.hide_progress_window()
-                messagebox.showinfo(
-                    "Success",
-                    f"Cloned '{SOURCE_FOLDER}' → '{project_dest}' and installed Node modules!"
-                )
-            else:
-                self.hide_progress_window()
-                messagebox.showerror("Error", f"npm install failed. Return code: {return_code}")
-
-        except Exception as e:
-            self.hide_progress_window()
-            messagebox.showerror("Error", f"npm install failed:\n{e}")
     ##################################
     # Build Logic
     ##################################
@@ -337,130 +497,181 @@ class BitmatoHyperfyGUI(tk.Tk):
         if not os.path.exists(project_folder):
             messagebox.showerror("Error", f"'{project_folder}' does not exist.")
             return
+        if self.jobs.active(os.path.abspath(project_folder)):
+            messagebox.showerror("Error", f"'{project_folder}' is still being cloned or built.")
+            return
 
-        platform_choice = self.build_platform_var.get().strip()
-        arch_choice = self.build_arch_var.get().strip()
+        targets = [target for target, var in self.build_target_vars.items() if var.get()]
+        if not targets:
+            messagebox.showerror("Error", "Select at least one target.")
+            return
+        workers = self.build_workers_var.get().strip()
+        workers = int(workers) if workers.isdigit() else build_matrix.DEFAULT_WORKERS
 
+        target_list = ", ".join(f"{platform}/{arch}" for platform, arch in targets)
         if not messagebox.askyesno(
             "Confirm Build",
-            f"Build for {platform_choice}/{arch_choice} in '{project_folder}'?"
+            f"Build for {target_list} in '{project_folder}'?"
         ):
             return
 
-            
-        cmd = [
-            "npx", "electron-builder",
-            f"--{platform_choice}",
-            f"--{arch_choice}",
-        ]
-
-        threading.Thread(target=self.run_build, args=(cmd, project_folder)).start()
+        # Pre-warm and bundle the seed cache first, or make sure an old one isn't shipped
+        seed_cmd = None
+        if self.bundle_cache_var.get():
+            seed_cmd = [sys.executable, CACHE_TOOL, "seed", os.path.abspath(project_folder)]
+            manifest = self.seed_manifest_var.get().strip()
+            if manifest:
+                seed_cmd += ["--manifest", os.path.abspath(manifest)]
+
+        incremental = not self.force_build_var.get()
+        self.jobs.submit(
+            f"Build {os.path.basename(os.path.abspath(project_folder))} ({len(targets)} targets)",
+            self.build_job, project_folder, targets, workers, seed_cmd, incremental,
+            key=os.path.abspath(project_folder),
+            log_path=os.path.join(project_folder, build_matrix.LOG_DIR, "build.log"),
+            on_done=lambda job: job.result and self.show_build_summary(job.result),
+        )
 
-    def run_build(self, cmd, project_folder):
-        self.show_progress_window("Building with electron-builder...")
+    def build_job(self, job, project_folder, targets, workers, seed_cmd=None, incremental=True):
+        """Runs on a job thread: the optional seed cache, then the build matrix."""
+        if seed_cmd:
+            job.run(seed_cmd, project_folder)
+        elif os.path.exists(os.path.join(project_folder, "package.json")):
+            cache_tool.set_seed_resource(project_folder, False)
 
-        try:
-            process = subprocess.Popen(
-                cmd,
-                cwd=project_folder,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            # Start thread to read output
-            threading.Thread(target=self.read_subprocess_output, args=(process,)).start()
-
-            return_code = process.wait()
-            if return_code == 0:
-                self.hide_progress_window()
-                messagebox.showinfo("Success", "Build completed successfully! Check your dist/ folder.")
+        def on_update(result):
+            if result.status == "running":
+                job.put(f"▶ {result.name} {result.phase} (log: {result.log_path})\n")
             else:
-                self.hide_progress_window()
-                messagebox.showerror("Error", f"Build failed with return code: {return_code}")
-
-        except Exception as e:
-            self.hide_progress_window()
-            messagebox.showerror("Error", f"Build failed:\n{e}")
+                job.put(f"■ {result.name} {result.status} in {result.seconds:.1f}s\n")
+            # The matrix's share done, from each target's electron-builder phase
+            job.progress = sum(r.progress for r in matrix.results) / len(matrix.results)
+            running = [f"{r.name}: {r.phase}" for r in matrix.results if r.status == "running"]
+            job.phase = ", ".join(running)
+
+        matrix = build_matrix.BuildMatrix(
+            project_folder, targets, workers, on_update=on_update, incremental=incremental
+        )
+        job.on_cancel(matrix.cancel)
+        job.result = matrix.run()
+        if matrix.report_path:
+            job.put(f"Timing report: {matrix.report_path}\n")
+        job.check()
+        failed = [r.name for r in job.result if not r.ok]
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(job.result)} targets failed: {', '.join(failed)}")
+
+    def show_build_summary(self, results):
+        """Shows each target's status, exit code, time and log file in a table."""
+        window = tk.Toplevel(self)
+        failed = [r for r in results if not r.ok]
+        window.title(f"Build summary: {len(results) - len(failed)} ok, {len(failed)} failed")
+        window.configure(bg="#1e1e2d")
+
+        columns = ("target", "status", "build", "exit", "time", "log")
+        tree = ttk.Treeview(window, columns=columns, show="headings", height=len(results))
+        for column, width in zip(columns, (110, 70, 60, 50, 70, 320)):
+            tree.heading(column, text=column.capitalize())
+            tree.column(column, width=width, anchor="w")
+        for r in results:
+            tree.insert("", "end", values=(
+                r.name, r.error or r.status, build_matrix.BUILD_MODES.get(r.mode, ""),
+                "" if r.returncode is None else r.returncode,
+                "" if r.seconds is None else f"{r.seconds:.1f}s",
+                r.log_path,
+            ))
+        tree.pack(padx=5, pady=5, fill="both", expand=True)
 
     ##################################
-    # Progress Window
+    # Jobs
     ##################################
-    def show_progress_window(self, message: str):
-        if self.progress_window:
-            return
-        self.progress_window = tk.Toplevel(self)
-        self.progress_window.title("Please Wait")
-        self.progress_window.configure(bg="#1e1e2d")
-
-        self.progress_window.grab_set()
-
-        width, height = 400, 250
-        x = self.winfo_rootx() + (self.winfo_width() // 2) - (width // 2)
-        y = self.winfo_rooty() + (self.winfo_height() // 2) - (height // 2)
-        self.progress_window.geometry(f"{width}x{height}+{x}+{y}")
+    def build_jobs_ui(self):
+        jobs_frame = tk.Frame(self, bg="#1e1e2d")
+        jobs_frame.pack(padx=5, pady=5, fill="both", expand=True)
+
+        columns = ("job", "status", "progress", "elapsed")
+        self.jobs_tree = ttk.Treeview(jobs_frame, columns=columns, show="headings", height=4)
+        for column, width in zip(columns, (220, 90, 220, 60)):
+            self.jobs_tree.heading(column, text=column.capitalize())
+            self.jobs_tree.column(column, width=width, anchor="w")
+        self.jobs_tree.pack(fill="x")
+        self.jobs_tree.bind("<<TreeviewSelect>>", lambda _: self.show_job_output())
 
-        self.progress_label = tk.Label(self.progress_window, text=message, fg="white", bg="#1e1e2d")
-        self.progress_label.pack(pady=10)
+        tk.Button(
+            jobs_frame, text="Cancel Job", bg="#dc3545", fg="white",
+            command=self.cancel_selected_job
+        ).pack(pady=3, anchor="e")
 
-        self.progress_bar = ttk.Progressbar(
-            self.progress_window, orient="horizontal", mode="indeterminate", length=200
-        )
-        self.progress_bar.pack()
-        self.progress_bar.start(10)
-        
-        # Text box for console output
+        # Output of the selected job
         self.console_text = tk.Text(
-            self.progress_window, wrap="word", height=10, width=50,
+            jobs_frame, wrap="word", height=10,
             bg="#222222", fg="white", font=("Consolas", 10)
         )
-        self.console_text.pack(padx=5, pady=5, fill="both", expand=True)
+        self.console_text.pack(fill="both", expand=True)
 
-        # Keep queue empty
-        with self.output_queue.mutex:
-            self.output_queue.queue.clear()
+        self.poll_jobs()
 
-        # Schedule periodic check for new lines in queue
-        self.check_output_queue()
-        
-    def check_output_queue(self):
-        """Checks for new output lines in the queue and appends them to the console_text."""
+    def job_updated(self, job):
+        """Called from job threads; the Tk loop picks the job up in poll_jobs."""
+        self.job_updates.put(job)
+
+    def poll_jobs(self):
+        """Applies job updates and appends new output of the selected job, once per tick."""
         try:
             while True:
-                line = self.output_queue.get_nowait()  # get line if available
-                self.console_text.insert("end", line)
-                self.console_text.see("end")  # auto-scroll
-        except Empty:
+                job = self.job_updates.get_nowait()
+                row = str(job.id)
+                if not self.jobs_tree.exists(row):
+                    self.jobs_tree.insert("", 0, iid=row, values=(job.title, job.status, "", ""))
+                    self.jobs_tree.selection_set(row)
+                if job.done and job.on_done and row not in self.jobs_finished:
+                    self.jobs_finished.add(row)
+                    job.on_done(job)
+        except queue.Empty:
             pass
-        # re-schedule
-        if self.progress_window:
-            self.after(100, self.check_output_queue)
-
-    def hide_progress_window(self):
-        if self.progress_window:
-            self.progress_bar.stop()
-            self.progress_window.destroy()
-            self.progress_window = None
-            
-    def read_subprocess_output(self, process):
-        """
-        Read lines from stdout/stderr in a loop and push them to output_queue,
-        so we can display them in the GUI.
-        """
-        # Read stdout
-        if process.stdout:
-            for line in iter(process.stdout.readline, ''):
-                if not line:
-                    break
-                self.output_queue.put(line)
-            process.stdout.close()
-
-        # Read stderr
-        if process.stderr:
-            for line in iter(process.stderr.readline, ''):
-                if not line:
-                    break
-                self.output_queue.put(line)
-            process.stderr.close()
+
+        for job in self.jobs.jobs:
+            row = str(job.id)
+            if self.jobs_tree.exists(row):
+                status = f"{job.status}: {job.error}" if job.error else job.status
+                self.jobs_tree.item(row, values=(job.title, status, job_progress(job), f"{job.elapsed:.0f}s"))
+
+        job = self.selected_job()
+        if job:
+            lines, self.output_seq, dropped = job.output.since(self.output_seq)
+            if dropped:
+                lines.insert(0, f"… {dropped} lines not shown (see the log file) …\n")
+            if lines:
+                self.console_text.insert("end", "".join(lines))
+                # Trim the oldest lines so the widget doesn't slow down as the output grows.
+                excess = int(self.console_text.index("end-1c").split(".")[0]) - OUTPUT_WIDGET_LINES
+                if excess > 0:
+                    self.console_text.delete("1.0", f"{excess + 1}.0")
+                self.console_text.see("end")  # auto-scroll
+        self.after(OUTPUT_REFRESH_MS, self.poll_jobs)
+
+    def selected_job(self):
+        selection = self.jobs_tree.selection()
+        if not selection:
+            return None
+        return next((job for job in self.jobs.jobs if str(job.id) == selection[0]), None)
+
+    def show_job_output(self):
+        """Switches the output box to the selected job; poll_jobs fills it in."""
+        self.console_text.delete("1.0", "end")
+        self.output_seq = 0
+
+    def cancel_selected_job(self):
+        job = self.selected_job()
+        if job and not job.done:
+            self.jobs.cancel(job)
+
+    def on_close(self):
+        running = [job for job in self.jobs.jobs if not job.done]
+        if running and not messagebox.askyesno("Quit", f"Cancel {len(running)} unfinished jobs and quit?"):
+            return
+        self.jobs.shutdown()
+        self.destroy()
 
 ##################################
 # Entry point
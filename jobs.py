@@ -0,0 +1,275 @@
+import os
+import sys
+import time
+import signal
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+DEFAULT_JOBS = 3
+OUTPUT_BUFFER_LINES = 5000  # Recent lines kept in memory per job; the log file gets all of them
+KILL_GRACE_SECONDS = 5
+
+##################################
+# Processes
+##################################
+
+def start_process(cmd, cwd, **kwargs) -> subprocess.Popen:
+    """Popen in a new process group, so `kill_tree` reaches everything it starts (npx → node → ...)."""
+    if sys.platform == "win32":
+        kwargs["creationflags"] = kwargs.get("creationflags", 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    return subprocess.Popen(cmd, cwd=cwd, **kwargs)
+
+def kill_tree(process: subprocess.Popen):
+    """
+    Terminates a process started by `start_process` and all of its descendants.
+    The leader may already have exited while its children (electron-builder's
+    subprocesses, say) still run, so the whole group is signalled either way.
+    """
+    if sys.platform == "win32":
+        subprocess.call(["taskkill", "/T", "/F", "/PID", str(process.pid)],
+                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        deadline = time.monotonic() + KILL_GRACE_SECONDS
+        while time.monotonic() < deadline:
+            process.poll()  # Reaps the leader, so it doesn't keep the group alive
+            os.killpg(process.pid, 0)
+            time.sleep(0.1)
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass  # The group is gone
+
+##################################
+# Output
+##################################
+
+class OutputBuffer:
+    """
+    A job's output. Reader threads `put` lines; the UI asks for the lines
+    `since` the last sequence number it saw, once per tick. Only the last
+    `max_lines` are kept in memory (older ones are counted as dropped), but
+    every line is written to the log file, if one is open.
+    """
+
+    def __init__(self, max_lines: int = OUTPUT_BUFFER_LINES):
+        self.lines = deque(maxlen=max_lines)
+        self.total = 0
+        self.log = None
+        self.lock = threading.Lock()
+
+    def open_log(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        log = open(path, "w", encoding="utf-8")
+        with self.lock:
+            self.log = log
+
+    def close_log(self):
+        with self.lock:
+            log, self.log = self.log, None
+        if log:
+            log.close()
+
+    def put(self, line: str):
+        with self.lock:
+            self.lines.append(line)
+            self.total += 1
+            if self.log:
+                self.log.write(line)
+
+    def since(self, seq: int):
+        """Returns `(lines, seq, dropped)`: the lines after `seq`, the new sequence number and how many are gone."""
+        with self.lock:
+            if self.log:
+                self.log.flush()
+            new = self.total - seq
+            kept = min(new, len(self.lines))
+            lines = list(self.lines)[len(self.lines) - kept:] if kept else []
+            return lines, self.total, new - kept
+
+##################################
+# Jobs
+##################################
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    """
+    One unit of work run by a JobScheduler: `fn(job, *args)`. The function
+    runs commands with `job.run`, so cancelling the job kills their process
+    trees, and can register other cleanup with `job.on_cancel`.
+    """
+
+    def __init__(self, job_id: int, title: str, key: Optional[str] = None,
+                 on_done: Optional[Callable] = None):
+        self.id = job_id
+        self.title = title
+        self.key = key  # e.g. a project folder; at most one active job per key
+        self.on_done = on_done
+        self.status = "queued"  # queued → running → ok / failed / cancelled
+        self.error: Optional[str] = None
+        self.result = None
+        self.queued = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.output = OutputBuffer()
+        self.cancelled = threading.Event()
+        self.processes = set()
+        self.cancel_callbacks = []
+        self.lock = threading.Lock()
+        # Shown next to the status; set by the job, or by `tracker` (a
+        # build_profile.PhaseTracker fed every output line) when it has one.
+        self.phase = ""
+        self.progress: Optional[float] = None
+        self.tracker = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("ok", "failed", "cancelled")
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def put(self, line: str):
+        self.output.put(line)
+        if self.tracker:
+            with self.lock:
+                self.tracker.feed(line)
+                self.phase, self.progress = self.tracker.phase, self.tracker.progress
+
+    def check(self):
+        """Raises JobCancelled if the job was cancelled; call between steps."""
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+    def on_cancel(self, callback: Callable):
+        with self.lock:
+            cancelled = self.cancelled.is_set()
+            if not cancelled:
+                self.cancel_callbacks.append(callback)
+        if cancelled:
+            callback()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled.set()
+            processes, callbacks = list(self.processes), list(self.cancel_callbacks)
+        for process in processes:
+            kill_tree(process)
+        for callback in callbacks:
+            callback()
+
+    def run(self, cmd, cwd):
+        """Runs `cmd` with its stdout and stderr read concurrently into the job's output; raises on failure."""
+        self.check()
+        self.put(f"$ {' '.join(cmd)}\n")
+        process = start_process(
+            cmd, cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+            text=True, errors="replace",
+        )
+        with self.lock:
+            self.processes.add(process)
+        if self.cancelled.is_set():  # Cancelled while it was starting
+            kill_tree(process)
+        # One reader per pipe, so a full stderr pipe can't stall the process while stdout is read.
+        readers = [threading.Thread(target=self.read_stream, args=(stream,), daemon=True)
+                   for stream in (process.stdout, process.stderr)]
+        for reader in readers:
+            reader.start()
+        return_code = process.wait()
+        for reader in readers:
+            reader.join()
+        with self.lock:
+            self.processes.discard(process)
+        self.check()
+        if return_code != 0:
+            raise subprocess.CalledProcessError(return_code, cmd)
+
+    def read_stream(self, stream):
+        for line in iter(stream.readline, ''):
+            self.put(line)
+        stream.close()
+
+class JobScheduler:
+    """
+    Runs jobs on a thread pool, `max_workers` at a time. `notify(job)` is
+    called from worker threads whenever a job changes status; a UI should
+    hand it to its own thread (e.g. through a queue polled by the Tk loop)
+    rather than touch widgets from it.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_JOBS, notify: Optional[Callable] = None):
+        self.pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="job")
+        self.notify = notify or (lambda job: None)
+        self.jobs = []
+        self.lock = threading.Lock()
+
+    def submit(self, title: str, fn: Callable, *args, key: Optional[str] = None,
+               log_path: Optional[str] = None, on_done: Optional[Callable] = None) -> Job:
+        """Queues `fn(job, *args)`. Its output also goes to `log_path`, if given."""
+        with self.lock:
+            if key is not None and self.active(key):
+                raise ValueError(f"'{key}' is already in use by another job")
+            job = Job(len(self.jobs) + 1, title, key, on_done)
+            self.jobs.append(job)
+        if log_path:
+            job.output.open_log(log_path)
+            job.put(f"(full output: {log_path})\n")
+        self.notify(job)
+        self.pool.submit(self.execute, job, fn, args)
+        return job
+
+    def active(self, key: str) -> bool:
+        return any(job.key == key and not job.done for job in self.jobs)
+
+    def execute(self, job: Job, fn: Callable, args):
+        if not job.cancelled.is_set():
+            job.status = "running"
+            job.started = time.time()
+            self.notify(job)
+            try:
+                result = fn(job, *args)
+                if result is not None:  # Jobs that fail can still leave a partial result in job.result
+                    job.result = result
+                job.check()
+                job.status = "ok"
+            except JobCancelled:
+                pass
+            except subprocess.CalledProcessError as e:
+                job.error = f"'{' '.join(e.cmd)}' exited with {e.returncode}"
+            except Exception as e:
+                job.error = str(e) or type(e).__name__
+        if job.cancelled.is_set():
+            job.status = "cancelled"
+            job.error = None  # Whatever failed, failed because it was cancelled
+        elif job.status != "ok":
+            job.status = "failed"
+        job.finished = time.time()
+        if job.error:
+            job.put(f"Error: {job.error}\n")
+        job.put(f"[{job.status} after {job.elapsed:.1f}s]\n")
+        job.output.close_log()
+        self.notify(job)
+
+    def cancel(self, job: Job):
+        """Cancels in the background; killing a process tree can take up to KILL_GRACE_SECONDS."""
+        def cancel():
+            job.cancel()
+            self.notify(job)
+        threading.Thread(target=cancel, daemon=True).start()
+
+    def shutdown(self):
+        """Cancels every job that hasn't finished; doesn't wait for them."""
+        for job in list(self.jobs):
+            if not job.done:
+                job.cancel()
+        self.pool.shutdown(wait=False)
@@ -0,0 +1,177 @@
+import os
+import sys
+import shutil
+import hashlib
+import argparse
+import threading
+import subprocess
+from typing import Callable, Optional
+from rich.console import Console
+
+import clone_engine
+
+console = Console()
+
+LOCK_FILE = "package-lock.json"
+PACKAGE_FILE = "package.json"
+COMPLETE_MARKER = ".complete"
+# One install per lockfile at a time, across every ModuleStore in this process.
+_install_locks = {}
+_install_locks_guard = threading.Lock()
+
+DEFAULT_STORE = os.environ.get(
+    "BITMATO_MODULE_STORE",
+    os.path.join(os.path.expanduser("~"), ".cache", "bitmato-hyperfy", "node_modules"),
+)
+
+##################################
+# Store
+##################################
+
+def lock_hash(project_folder: str) -> Optional[str]:
+    """SHA-256 of the project's package-lock.json, or None if it has none."""
+    try:
+        with open(os.path.join(project_folder, LOCK_FILE), "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+def run_command(cmd, cwd):
+    subprocess.check_call(cmd, cwd=cwd)
+
+class ModuleStore:
+    """
+    A directory of installed node_modules trees, one per package-lock.json
+    hash: `<store>/<sha256>/node_modules`. A tree is installed once with
+    `npm ci` (the only step that needs the network) and then linked into
+    every project with the same lockfile, by reflink where the filesystem
+    supports it and hard link otherwise.
+
+    Entries are built in a temporary directory and renamed into place, so an
+    interrupted install never leaves a half-populated entry behind.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE):
+        self.root = root
+
+    def entry(self, digest: str) -> str:
+        return os.path.join(self.root, digest)
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(os.path.join(self.entry(digest), COMPLETE_MARKER))
+
+    def populate(self, project_folder: str, digest: str, run: Callable = run_command):
+        """Runs `npm ci` for the project's lockfile into a new store entry."""
+        os.makedirs(self.root, exist_ok=True)
+        staging = f"{self.entry(digest)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        try:
+            for name in (PACKAGE_FILE, LOCK_FILE):
+                shutil.copy2(os.path.join(project_folder, name), os.path.join(staging, name))
+            run(["npm", "ci", "--no-audit", "--no-fund"], staging)
+            open(os.path.join(staging, COMPLETE_MARKER), "w").close()
+            try:
+                os.rename(staging, self.entry(digest))
+            except OSError:
+                # Another process populated the same lockfile first; keep theirs.
+                if not self.has(digest):
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def materialize(self, digest: str, project_folder: str) -> dict:
+        """Links the stored node_modules into the project, replacing what's there."""
+        source = os.path.join(self.entry(digest), "node_modules")
+        # Only files that differ are replaced, so re-linking an up-to-date project is quick.
+        engine = clone_engine.CloneEngine(excludes=(), method="link")
+        counts = engine.sync(source, os.path.join(project_folder, "node_modules"))
+        os.utime(self.entry(digest))  # Marks the entry as recently used for `prune`.
+        return counts
+
+    def install(self, project_folder: str, run: Callable = run_command) -> dict:
+        """
+        Gives the project a node_modules matching its lockfile: from the store if
+        this lockfile was installed before, otherwise by installing it into the
+        store first. Projects without a lockfile get a plain `npm install`.
+        """
+        digest = lock_hash(project_folder)
+        if not digest:
+            run(["npm", "install"], project_folder)
+            return {"store": None, "installed": True}
+        with _install_locks_guard:
+            lock = _install_locks.setdefault((self.root, digest), threading.Lock())
+        # Projects with the same lockfile wait for the first one's npm ci and then reuse it.
+        with lock:
+            installed = not self.has(digest)
+            if installed:
+                self.populate(project_folder, digest, run)
+        counts = self.materialize(digest, project_folder)
+        return {"store": self.entry(digest), "installed": installed, **counts}
+
+    def entries(self) -> list:
+        """Complete entries as `(digest, last_used, path)`, most recently used first."""
+        if not os.path.isdir(self.root):
+            return []
+        found = [(name, os.path.getmtime(self.entry(name)), self.entry(name))
+                 for name in os.listdir(self.root) if self.has(name)]
+        return sorted(found, key=lambda e: e[1], reverse=True)
+
+    def prune(self, keep: int) -> int:
+        """Deletes all but the `keep` most recently used entries."""
+        stale = self.entries()[keep:]
+        for _, _, path in stale:
+            shutil.rmtree(path)
+        return len(stale)
+
+##################################
+# Commands
+##################################
+
+def install_command(args):
+    if not os.path.exists(os.path.join(args.project_folder, PACKAGE_FILE)):
+        console.print(f"[red]Error: '{args.project_folder}' has no {PACKAGE_FILE}.[/red]")
+        sys.exit(1)
+    try:
+        result = ModuleStore(args.store).install(args.project_folder)
+    except (OSError, subprocess.CalledProcessError) as e:
+        console.print(f"[red]Install failed:\n{e}[/red]")
+        sys.exit(1)
+    if result["store"]:
+        source = "installed into" if result["installed"] else "reused from"
+        console.print(
+            f"[green]Done.[/green] node_modules {source} {result['store']} "
+            f"({result['reflinked']} reflinked, {result['hardlinked']} hard-linked, {result['copied']} copied)."
+        )
+    else:
+        console.print(f"[yellow]No {LOCK_FILE}; ran npm install without the store.[/yellow]")
+
+def list_command(args):
+    for digest, _, path in ModuleStore(args.store).entries():
+        console.print(f"{digest[:12]}  {path}")
+
+def prune_command(args):
+    removed = ModuleStore(args.store).prune(args.keep)
+    console.print(f"[green]Done.[/green] {removed} entries removed.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared node_modules store for Hyperfy client projects.")
+    parser.add_argument("--store", default=DEFAULT_STORE, help=f"Store directory (default: {DEFAULT_STORE})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    install = commands.add_parser("install", help="Give a project the node_modules for its package-lock.json")
+    install.add_argument("project_folder", help="Electron project folder")
+    install.set_defaults(func=install_command)
+
+    listing = commands.add_parser("list", help="List stored node_modules trees")
+    listing.set_defaults(func=list_command)
+
+    prune = commands.add_parser("prune", help="Delete all but the most recently used trees")
+    prune.add_argument("--keep", type=int, default=3, help="How many trees to keep (default: 3)")
+    prune.set_defaults(func=prune_command)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import os
+import json
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+import cache_tool
+
+BODY = bytes(range(256)) * 256  # 64 KiB
+ETAG = '"v1"'
+
+class AssetHandler(BaseHTTPRequestHandler):
+    """Serves `files` ({path: bytes}) with a strong ETag, honouring Range and If-Range."""
+
+    files = {}
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("Range"), self.headers.get("If-Range")))
+        body = self.files.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range", ETAG) == ETAG:
+            start = int(range_header[len("bytes="):].rstrip("-"))
+        self.send_response(206 if start else 200)
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.send_header("Content-Type", "model/gltf-binary")
+        self.send_header("Content-Length", str(len(body) - start))
+        self.send_header("ETag", ETAG)
+        self.send_header("Set-Cookie", "session=1")
+        self.end_headers()
+        self.wfile.write(body[start:])
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    AssetHandler.files = {"/a.glb": BODY, "/b.glb": BODY[:1000]}
+    AssetHandler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), AssetHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def write_manifest(tmp_path, assets) -> str:
+    path = tmp_path / "assets.json"
+    path.write_text(json.dumps(assets))
+    return str(path)
+
+def read_meta(cache_dir: str, url: str) -> dict:
+    with open(cache_tool.meta_path(cache_dir, cache_tool.cache_key(url)), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def test_prewarm_downloads_and_skips_cached(server, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    manifest = write_manifest(tmp_path, ["/a.glb", "/b.glb"])
+
+    warmer = cache_tool.prewarm_cache(cache_dir, remote_url=server + "/", manifest=manifest)
+    assert warmer.counts["downloaded"] == 2 and warmer.counts["failed"] == 0
+
+    meta = read_meta(cache_dir, server + "/a.glb")
+    assert meta["etag"] == ETAG
+    assert meta["hash"] == hashlib.sha256(BODY).hexdigest()
+    assert "set-cookie" not in meta["headers"]
+    with open(cache_tool.blob_path(cache_dir, meta["hash"]), "rb") as f:
+        assert f.read() == BODY
+
+    AssetHandler.requests.clear()
+    warmer = cache_tool.prewarm_cache(cache_dir, remote_url=server + "/", manifest=manifest)
+    assert warmer.counts["skipped"] == 2 and warmer.counts["downloaded"] == 0
+    assert AssetHandler.requests == []
+
+def make_partial(cache_dir: str, url: str, length: int, validator: str):
+    """A `.part` left behind by a download interrupted after `length` bytes."""
+    part_path = os.path.join(cache_dir, cache_tool.BLOB_DIR, f"{cache_tool.cache_key(url)}.prewarm.part")
+    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+    with open(part_path, "wb") as f:
+        f.write(BODY[:length])
+    with open(f"{part_path[:-5]}.validator.part", "w", encoding="utf-8") as f:
+        f.write(validator)
+    return part_path
+
+def test_prewarm_resumes_truncated_download(server, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    part_path = make_partial(cache_dir, server + "/a.glb", 10000, ETAG)
+    manifest = write_manifest(tmp_path, [{"url": "/a.glb", "sha256": hashlib.sha256(BODY).hexdigest()}])
+
+    warmer = cache_tool.prewarm_cache(cache_dir, remote_url=server + "/", manifest=manifest)
+
+    assert warmer.counts["resumed"] == 1 and warmer.counts["failed"] == 0
+    assert AssetHandler.requests == [("/a.glb", "bytes=10000-", ETAG)]
+    assert not os.path.exists(part_path)
+    with open(cache_tool.blob_path(cache_dir, read_meta(cache_dir, server + "/a.glb")["hash"]), "rb") as f:
+        assert f.read() == BODY
+
+def test_prewarm_restarts_when_validator_changed(server, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    make_partial(cache_dir, server + "/a.glb", 10000, '"v0"')
+    manifest = write_manifest(tmp_path, [{"url": "/a.glb", "sha256": hashlib.sha256(BODY).hexdigest()}])
+
+    warmer = cache_tool.prewarm_cache(cache_dir, remote_url=server + "/", manifest=manifest)
+
+    # If-Range didn't match, so the server sent the whole body and the stale prefix was discarded.
+    assert warmer.counts["resumed"] == 0 and warmer.counts["downloaded"] == 1
+    assert read_meta(cache_dir, server + "/a.glb")["hash"] == hashlib.sha256(BODY).hexdigest()
+
+def test_prewarm_rejects_checksum_mismatch(server, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    manifest = write_manifest(tmp_path, [{"url": "/a.glb", "sha256": "0" * 64}])
+
+    warmer = cache_tool.prewarm_cache(cache_dir, remote_url=server + "/", manifest=manifest)
+
+    assert warmer.counts["failed"] == 1 and warmer.counts["downloaded"] == 0
+    assert "checksum mismatch" in warmer.failures[0][1]
+    assert not os.path.exists(cache_tool.meta_path(cache_dir, cache_tool.cache_key(server + "/a.glb")))
+    assert os.listdir(os.path.join(cache_dir, cache_tool.BLOB_DIR)) == []
+
+def test_pack_unpack_round_trip(server, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    manifest = write_manifest(tmp_path, ["/a.glb", "/b.glb"])
+    cache_tool.prewarm_cache(cache_dir, remote_url=server + "/", manifest=manifest)
+    before = {key: meta for key, meta, _ in cache_tool.iter_cache_entries(cache_dir)}
+
+    pack_dir = os.path.join(cache_dir, cache_tool.PACK_DIR_NAME)
+    counts = cache_tool.pack_cache(cache_dir, pack_dir, move=True)
+    assert counts["packed"] == 2
+    assert list(cache_tool.iter_cache_entries(cache_dir)) == []
+
+    # Packed entries count as cached.
+    AssetHandler.requests.clear()
+    warmer = cache_tool.prewarm_cache(cache_dir, remote_url=server + "/", manifest=manifest)
+    assert warmer.counts["skipped"] == 2 and AssetHandler.requests == []
+
+    restored_dir = str(tmp_path / "restored")
+    assert cache_tool.unpack_cache(pack_dir, restored_dir)["unpacked"] == 2
+    after = {key: (meta, path) for key, meta, path in cache_tool.iter_cache_entries(restored_dir)}
+    assert after.keys() == before.keys()
+    for key, (meta, path) in after.items():
+        assert meta == before[key]
+        assert cache_tool.file_sha256(path) == meta["hash"]
+    assert cache_tool.unpack_cache(pack_dir, restored_dir)["unchanged"] == 2
+
+def test_migrate_flat_cache(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    # Old layout: encodeURIComponent(path + query), with a timestamp-only sidecar.
+    (cache_dir / "%2Fmodels%2Fa.glb").write_bytes(BODY)
+    (cache_dir / "%2Fmodels%2Fa.glb.meta").write_text("1700000000000")
+    (cache_dir / "%2Funfinished.js").write_bytes(b"partial")
+
+    counts = cache_tool.migrate_flat_cache(str(cache_dir), "https://example.com")
+
+    assert counts["migrated"] == 1 and counts["dropped"] == 1
+    meta = read_meta(str(cache_dir), "https://example.com/models/a.glb")
+    assert meta["cachedAt"] == 1700000000000
+    assert meta["hash"] == hashlib.sha256(BODY).hexdigest() and meta["size"] == len(BODY)
+    assert os.path.exists(cache_tool.blob_path(str(cache_dir), meta["hash"]))
+    assert sorted(os.listdir(cache_dir)) == sorted(["blobs", cache_tool.cache_key("https://example.com/models/a.glb")[:2]])
+
+def test_migrate_keeps_app_files(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    (cache_dir / "%2Fa.glb").write_bytes(BODY)
+    (cache_dir / "%2Fa.glb.meta").write_text("1700000000000")
+    (cache_dir / cache_tool.ACCESS_LOG_FILE).write_text('{"version": 1, "worlds": []}')
+    (cache_dir / cache_tool.STATS_FILE).write_text("{}")
+
+    counts = cache_tool.migrate_flat_cache(str(cache_dir), "https://example.com")
+
+    assert counts["migrated"] == 1 and counts["dropped"] == 0
+    assert (cache_dir / cache_tool.ACCESS_LOG_FILE).read_text() == '{"version": 1, "worlds": []}'
+    assert (cache_dir / cache_tool.STATS_FILE).exists()
+
+def test_seed_resource_stays_out_of_app_asar(tmp_path):
+    package_json = tmp_path / "package.json"
+    package_json.write_text(json.dumps({"name": "Brand", "build": {"extraResources": {"from": "settings.json", "to": "settings.json"}}}))
+
+    cache_tool.set_seed_resource(str(tmp_path), True)
+    build = json.loads(package_json.read_text())["build"]
+    assert build["extraResources"] == [{"from": "settings.json", "to": "settings.json"}, cache_tool.SEED_RESOURCE]
+    assert build["files"] == ["!build-logs/**", "!cache-seed/**"]
+
+    cache_tool.set_seed_resource(str(tmp_path), True)
+    assert json.loads(package_json.read_text())["build"]["files"] == ["!build-logs/**", "!cache-seed/**"]
+
+    cache_tool.set_seed_resource(str(tmp_path), False)
+    build = json.loads(package_json.read_text())["build"]
+    assert build["extraResources"] == [{"from": "settings.json", "to": "settings.json"}]
+    assert build["files"] == ["!build-logs/**"]
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+import module_store
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "symlink") or os.name == "nt",
+                                reason="needs POSIX symlinks")
+
+def make_entry(store: module_store.ModuleStore, digest: str) -> str:
+    """A complete store entry whose node_modules has the links Electron and npm rely on."""
+    modules = os.path.join(store.entry(digest), "node_modules")
+    framework = os.path.join(modules, "electron", "dist", "Electron.app", "Contents", "Frameworks",
+                             "Electron Framework.framework")
+    os.makedirs(os.path.join(framework, "Versions", "A", "Resources"))
+    with open(os.path.join(framework, "Versions", "A", "Electron Framework"), "w") as f:
+        f.write("binary")
+    with open(os.path.join(framework, "Versions", "A", "Resources", "Info.plist"), "w") as f:
+        f.write("plist")
+    os.symlink("A", os.path.join(framework, "Versions", "Current"))
+    os.symlink(os.path.join("Versions", "Current", "Resources"), os.path.join(framework, "Resources"))
+    os.symlink(os.path.join("Versions", "Current", "Electron Framework"),
+               os.path.join(framework, "Electron Framework"))
+    # An npm `file:` dependency
+    os.makedirs(os.path.join(modules, "..", "packages", "local"))
+    os.symlink(os.path.join("..", "packages", "local"), os.path.join(modules, "local"))
+    open(os.path.join(store.entry(digest), module_store.COMPLETE_MARKER), "w").close()
+    return framework
+
+def test_materialize_keeps_directory_symlinks(tmp_path):
+    store = module_store.ModuleStore(str(tmp_path / "store"))
+    make_entry(store, "abc")
+    project = tmp_path / "project"
+    project.mkdir()
+
+    store.materialize("abc", str(project))
+
+    framework = os.path.join(project, "node_modules", "electron", "dist", "Electron.app", "Contents",
+                             "Frameworks", "Electron Framework.framework")
+    for rel, target in [(os.path.join("Versions", "Current"), "A"),
+                        ("Resources", os.path.join("Versions", "Current", "Resources")),
+                        ("Electron Framework", os.path.join("Versions", "Current", "Electron Framework"))]:
+        assert os.path.islink(os.path.join(framework, rel))
+        assert os.readlink(os.path.join(framework, rel)) == target
+    with open(os.path.join(framework, "Resources", "Info.plist")) as f:
+        assert f.read() == "plist"
+    assert os.readlink(os.path.join(project, "node_modules", "local")) == os.path.join("..", "packages", "local")
+
+def test_materialize_replaces_directory_with_symlink(tmp_path):
+    store = module_store.ModuleStore(str(tmp_path / "store"))
+    make_entry(store, "abc")
+    project = tmp_path / "project"
+    # Left behind by an earlier materialize that turned the link into a directory
+    (project / "node_modules" / "local" / "stale").mkdir(parents=True)
+
+    store.materialize("abc", str(project))
+    counts = store.materialize("abc", str(project))
+
+    assert os.path.islink(os.path.join(project, "node_modules", "local"))
+    assert counts["copied"] == 0 and counts["hardlinked"] == 0
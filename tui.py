@@ -1,13 +1,19 @@
 import os
 import sys
 import json
-import shutil
-import subprocess
+import time
+import argparse
 from typing import Optional
 from rich.console import Console
 from rich.prompt import Prompt, Confirm
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
+import cache_tool
+import clone_engine
+import module_store
+import build_matrix
+import build_profile
+
 console = Console()
 
 SOURCE_FOLDER = "./core"
@@ -15,13 +21,15 @@ SOURCE_FOLDER = "./core"
 def main():
     console.rule("[bold blue]Bitmato - Hyperfy Electron Client - TUI[/bold blue]")
     console.print("Choose an operation:", style="bold green")
-    console.print("1) Clone Project (from ./core)\n2) Build Project (electron-builder)\n")
+    console.print("1) Clone Project (from ./core)\n2) Build Project (electron-builder)\n3) Pre-warm Cache\n")
 
-    choice = Prompt.ask("Enter 1 or 2", choices=["1", "2"])
+    choice = Prompt.ask("Enter 1, 2 or 3", choices=["1", "2", "3"])
     if choice == "1":
         clone_project_tui()
-    else:
+    elif choice == "2":
         build_project_tui()
+    else:
+        prewarm_cache_tui()
 
 def clone_project_tui():
     """
@@ -60,15 +68,18 @@ def clone_project_tui():
         if not overwrite:
             console.print("[yellow]Operation canceled.[/yellow]")
             sys.exit(0)
-        shutil.rmtree(project_dest)
 
-    # Clone
+    # Clone (or sync the changed files into an existing project)
     console.print(f"[bold cyan]Cloning '{SOURCE_FOLDER}' → '{project_dest}'...[/bold cyan]")
     try:
-        shutil.copytree(SOURCE_FOLDER, project_dest)
+        counts = clone_engine.clone_tree(SOURCE_FOLDER, project_dest)
     except Exception as e:
         console.print(f"[red]Failed to clone folder:\n{e}[/red]")
         sys.exit(1)
+    console.print(
+        f"{counts['reflinked']} reflinked, {counts['copied']} copied, "
+        f"{counts['unchanged']} unchanged, {counts['removed']} removed."
+    )
 
     # Create settings.json
     console.print("[bold cyan]Creating settings.json...[/bold cyan]")
@@ -85,19 +96,39 @@ def clone_project_tui():
 
     # NPM install with spinner
     console.print("[bold cyan]Running npm install...[/bold cyan]")
+    started = time.time()
+    tracker = build_profile.PhaseTracker("npm")
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
         transient=True
     ) as progress:
         task_id = progress.add_task("Installing packages...", total=None)
+
+        def run(cmd, cwd):
+            build_profile.run_tracked(
+                cmd, cwd, tracker,
+                on_line=lambda line: progress.console.print(line.rstrip(), markup=False, highlight=False),
+                on_phase=lambda t: progress.update(task_id, description=f"Installing packages... ({t.phase})"),
+            )
+
         try:
-            subprocess.check_call(["npm", "install"], cwd=project_dest)
+            # Linked from the shared store; npm only runs when the lockfile is new.
+            result = module_store.ModuleStore().install(project_dest, run=run)
         except Exception as e:
             progress.stop_task(task_id)
             console.print(f"[red]npm install failed:\n{e}[/red]")
             sys.exit(1)
 
+    if result["installed"]:
+        for phase in tracker.report():
+            console.print(f"  {phase['name']:<10} {phase['seconds']:.1f}s")
+        report = build_profile.write_report(
+            os.path.join(project_dest, build_matrix.LOG_DIR), "install", started,
+            [{"command": "npm", "phases": tracker.report()}],
+        )
+        console.print(f"Timing report: {report}")
+
     console.print(f"[green]Success![/green] Cloned into '{project_dest}' and installed modules!")
 
 def create_settings_file(
@@ -154,8 +185,8 @@ def create_settings_file(
         
 def build_project_tui():
     """
-    Runs electron-builder with user-chosen platform & arch in a specified folder,
-    showing a spinner in the terminal.
+    Runs electron-builder for one or more platform/arch targets in a specified
+    folder, several at a time, with a log file per target and a summary table.
     """
     console.rule("[bold green]Build Project[/bold green]")
 
@@ -165,49 +196,82 @@ def build_project_tui():
         console.print(f"[red]Error: '{project_folder}' does not exist.[/red]")
         sys.exit(1)
 
-    # 2) Choose platform
-    console.print("Supported platforms: win32, linux, darwin")
-    platform_choice = Prompt.ask("Which platform", default="win32", choices=["win32", "linux", "darwin"])
+    # 2) Choose targets
+    console.print(f"Supported platforms: {', '.join(build_matrix.PLATFORMS)}")
+    console.print(f"Supported archs: {', '.join(build_matrix.ARCHS)}")
+    while True:
+        spec = Prompt.ask("Targets (platform/arch, comma-separated)", default="win32/x64")
+        try:
+            targets = build_matrix.parse_targets(spec)
+        except ValueError as e:
+            console.print(f"[red]{e}[/red]")
+            continue
+        if targets:
+            break
 
-    # 3) Choose arch
-    console.print("Supported archs: x64, arm64, ia32, armv7l")
-    arch_choice = Prompt.ask("Which architecture", default="x64", choices=["x64", "arm64", "ia32", "arm7l"])
+    # 3) How many to build at once
+    workers = Prompt.ask("Parallel builds", default=str(min(len(targets), build_matrix.DEFAULT_WORKERS))).strip()
+    workers = int(workers) if workers.isdigit() else build_matrix.DEFAULT_WORKERS
 
     # Confirm
-    confirm_build = Confirm.ask(
-        f"Build for [cyan]{platform_choice}[/cyan] / [cyan]{arch_choice}[/cyan] in '{project_folder}'?",
-        default=True
-    )
+    target_list = ", ".join(f"[cyan]{platform}/{arch}[/cyan]" for platform, arch in targets)
+    confirm_build = Confirm.ask(f"Build for {target_list} in '{project_folder}'?", default=True)
     if not confirm_build:
         console.print("[yellow]Build canceled by user.[/yellow]")
         sys.exit(0)
 
+    # Optionally ship a pre-warmed asset cache inside the build
+    if Confirm.ask("Bundle a pre-warmed asset cache (first start loads the world from disk)?", default=False):
+        manifest = Prompt.ask("Asset manifest (optional; leave empty to crawl remoteUrl)", default="").strip()
+        try:
+            cache_tool.seed_command(argparse.Namespace(
+                project_folder=project_folder, remote_url=None, manifest=manifest or None,
+                jobs=cache_tool.PREWARM_JOBS, depth=None, refresh=False, user_agent=None,
+            ))
+        except SystemExit:
+            if not Confirm.ask("Some assets could not be seeded. Build anyway?", default=True):
+                raise
+    elif os.path.exists(os.path.join(project_folder, "package.json")):
+        cache_tool.set_seed_resource(project_folder, False)
 
-    # 4) Run electron-builder with a spinner
-    cmd = [
-        "npx", "electron-builder", 
-        f"--{platform_choice}",
-        f"--{arch_choice}"
-    ]
+    # 4) Run electron-builder for every target (unchanged ones are reused from dist/)
+    force = Confirm.ask("Rebuild targets whose inputs haven't changed?", default=False)
+    results = build_matrix.run_matrix_cli(project_folder, targets, workers, incremental=not force)
+    if not all(r.ok for r in results):
+        console.print("[red]Some builds failed; see their logs above.[/red]")
+        sys.exit(1)
 
-    console.print(f"[bold green]Building[/bold green] {project_folder} for [cyan]{platform_choice}[/cyan]/[cyan]{arch_choice}[/cyan]...")
+    console.print("[green]Build completed successfully![/green]")
+    console.print("Check your dist/<platform>-<arch>/ folders.")
 
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        transient=True
-    ) as progress:
-        task_id = progress.add_task("Building with electron-builder...", total=None)
+def prewarm_cache_tui():
+    """
+    Downloads a world's assets into a project's cache before its first launch,
+    using `cache_tool.py prewarm`.
+    """
+    console.rule("[bold green]Pre-warm Cache[/bold green]")
 
-        try:
-            subprocess.check_call(cmd, cwd=project_folder)
-        except Exception as e:
-            progress.stop_task(task_id)
-            console.print(f"[red]Build failed:\n{e}[/red]")
-            sys.exit(1)
+    project_folder = Prompt.ask("Path to your Electron project folder", default=".")
+    if not os.path.exists(project_folder):
+        console.print(f"[red]Error: '{project_folder}' does not exist.[/red]")
+        sys.exit(1)
+    cache_dir = os.path.join(project_folder, "cache")
 
-    console.print("[green]Build completed successfully![/green]")
-    console.print("Check your dist/ folder (or wherever electron-builder outputs).")
+    manifest = Prompt.ask("Asset manifest (optional; leave empty to crawl remoteUrl)", default="").strip()
+    remote_url = Prompt.ask("remoteUrl", default=cache_tool.default_remote_url(cache_dir) or "https://hyperfy.bitmato.dev").strip()
+    jobs = Prompt.ask("Parallel downloads", default=str(cache_tool.PREWARM_JOBS)).strip()
+    pack = Confirm.ask("Move the result into a packed store?", default=False)
+
+    cache_tool.prewarm_command(argparse.Namespace(
+        cache_dir=cache_dir,
+        remote_url=remote_url or None,
+        manifest=manifest or None,
+        jobs=int(jobs) if jobs.isdigit() else cache_tool.PREWARM_JOBS,
+        depth=None,
+        refresh=False,
+        user_agent=None,
+        pack=pack,
+    ))
 
 if __name__ == "__main__":
     main()